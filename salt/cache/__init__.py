@@ -181,6 +181,66 @@ class Cache(object):
         fun = "{0}.fetch".format(self.driver)
         return self.modules[fun](bank, key, **self._kwargs)
 
+    def fetch_many(self, bank_prefix, names, key):
+        """
+        Fetch the same key from several banks sharing a common prefix, using
+        a single bulk request when the driver supports it
+
+        :param bank_prefix:
+            The name of the bank holding the banks to fetch the key from, for
+            example ``minions``.
+
+        :param names:
+            The names of the banks inside ``bank_prefix`` to fetch the key
+            from, for example a list of minion IDs.
+
+        :param key:
+            The name of the key to fetch from each bank, for example ``data``.
+
+        :return:
+            Return a dict mapping each name to the data fetched from
+            ``<bank_prefix>/<name>``. Names whose bank doesn't hold the key
+            are left out.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        """
+        fun = "{0}.fetch_many".format(self.driver)
+        if fun in self.modules:
+            return self.modules[fun](bank_prefix, names, key, **self._kwargs)
+        ret = {}
+        for name in names:
+            data = self.fetch("{0}/{1}".format(bank_prefix, name), key)
+            if data:
+                ret[name] = data
+        return ret
+
+    def list_with_data(self, bank_prefix, key):
+        """
+        Iterate over the banks inside ``bank_prefix`` along with the data
+        they hold under ``key``, in as few requests as the driver allows
+
+        :param bank_prefix:
+            The name of the bank holding the banks to fetch the key from, for
+            example ``minions``.
+
+        :param key:
+            The name of the key to fetch from each bank, for example ``data``.
+
+        :return:
+            An iterator of ``(name, data)`` tuples. Banks which don't hold the
+            key are skipped.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        """
+        fun = "{0}.list_with_data".format(self.driver)
+        if fun in self.modules:
+            return self.modules[fun](bank_prefix, key, **self._kwargs)
+        return six.iteritems(self.fetch_many(bank_prefix, self.list(bank_prefix), key))
+
     def updated(self, bank, key):
         """
         Get the last updated epoch for the specified key
@@ -357,6 +417,35 @@ class MemCache(Cache):
                 self.storage.popitem(last=False)
         self.storage[(bank, key)] = [time.time(), data]
 
+    def fetch_many(self, bank_prefix, names, key):
+        now = time.time()
+        ret = {}
+        missing = []
+        for name in names:
+            bank = "{0}/{1}".format(bank_prefix, name)
+            record = self.storage.pop((bank, key), None)
+            # Have a cached value for the key, update atime
+            if record is not None and record[0] + self.expire >= now:
+                record[0] = now
+                self.storage[(bank, key)] = record
+                if record[1]:
+                    ret[name] = record[1]
+            else:
+                missing.append(name)
+        if missing:
+            fetched = super(MemCache, self).fetch_many(bank_prefix, missing, key)
+            for name in missing:
+                data = fetched.get(name, {})
+                bank = "{0}/{1}".format(bank_prefix, name)
+                if len(self.storage) >= self.max:
+                    if self.cleanup:
+                        MemCache.__cleanup(self.expire)
+                    if len(self.storage) >= self.max:
+                        self.storage.popitem(last=False)
+                self.storage[(bank, key)] = [now, data]
+            ret.update(fetched)
+        return ret
+
     def flush(self, bank, key=None):
         self.storage.pop((bank, key), None)
         super(MemCache, self).flush(bank, key)
@@ -132,6 +132,41 @@ def fetch(bank, key):
         )
 
 
+def fetch_many(bank_prefix, names, key):
+    """
+    Fetch the same key from several banks sharing a common prefix.
+    """
+    names = set(names)
+    return {
+        name: data for name, data in list_with_data(bank_prefix, key) if name in names
+    }
+
+
+def list_with_data(bank_prefix, key):
+    """
+    Iterate over the banks inside ``bank_prefix`` along with the data they
+    hold under ``key``, using a single recursive read of the prefix.
+    """
+    try:
+        _, values = api.kv.get(bank_prefix + "/", recurse=True)
+    except Exception as exc:  # pylint: disable=broad-except
+        raise SaltCacheError(
+            'There was an error reading the keys under "{0}": {1}'.format(
+                bank_prefix, exc
+            )
+        )
+    suffix = "/{0}".format(key)
+    for value in values or []:
+        name = value["Key"][len(bank_prefix) + 1 :]
+        if not name.endswith(suffix):
+            continue
+        name = name[: -len(suffix)]
+        if "/" in name or value["Value"] is None:
+            # Nested deeper than a direct sub-bank
+            continue
+        yield name, __context__["serial"].loads(value["Value"])
+
+
 def flush(bank, key=None):
     """
     Remove the key from the cache bank with all the key content.
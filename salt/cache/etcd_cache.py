@@ -157,6 +157,42 @@ def fetch(bank, key):
         )
 
 
+def fetch_many(bank_prefix, names, key):
+    """
+    Fetch the same key from several banks sharing a common prefix.
+    """
+    names = set(names)
+    return {
+        name: data for name, data in list_with_data(bank_prefix, key) if name in names
+    }
+
+
+def list_with_data(bank_prefix, key):
+    """
+    Iterate over the banks inside ``bank_prefix`` along with the data they
+    hold under ``key``, using a single recursive read of the prefix.
+    """
+    _init_client()
+    etcd_key = "{0}/{1}".format(path_prefix, bank_prefix)
+    try:
+        result = client.read(etcd_key, recursive=True)
+    except etcd.EtcdKeyNotFound:
+        return
+    except Exception as exc:  # pylint: disable=broad-except
+        raise SaltCacheError(
+            "There was an error reading the key, {0}: {1}".format(etcd_key, exc)
+        )
+    suffix = "/{0}".format(key)
+    for leaf in result.leaves:
+        if leaf.dir or not leaf.key.endswith(suffix):
+            continue
+        name = leaf.key[len(etcd_key) + 1 : -len(suffix)]
+        if not name or "/" in name:
+            # Nested deeper than a direct sub-bank
+            continue
+        yield name, __context__["serial"].loads(base64.b64decode(leaf.value))
+
+
 def flush(bank, key=None):
     """
     Remove the key from the cache bank with all the key content.
@@ -93,6 +93,61 @@ def fetch(bank, key, cachedir):
         )
 
 
+def fetch_many(bank_prefix, names, key, cachedir):
+    """
+    Fetch the same key from several banks sharing a common prefix.
+    """
+    base = os.path.join(cachedir, os.path.normpath(bank_prefix))
+    load = __context__["serial"].load
+    ret = {}
+    for name in names:
+        key_file = os.path.join(base, name, "{}.p".format(key))
+        try:
+            with salt.utils.files.fopen(key_file, "rb") as fh_:
+                ret[name] = load(fh_)
+        except OSError as exc:
+            if exc.errno in (errno.ENOENT, errno.ENOTDIR):
+                continue
+            raise SaltCacheError(
+                'There was an error reading the cache file "{}": {}'.format(
+                    key_file, exc
+                )
+            )
+    return ret
+
+
+def list_with_data(bank_prefix, key, cachedir):
+    """
+    Iterate over the banks inside ``bank_prefix`` along with the data they
+    hold under ``key``, reading the directory only once.
+    """
+    base = os.path.join(cachedir, os.path.normpath(bank_prefix))
+    key_name = "{}.p".format(key)
+    load = __context__["serial"].load
+    try:
+        entries = list(os.scandir(base))
+    except OSError as exc:
+        if exc.errno == errno.ENOENT:
+            return
+        raise SaltCacheError(
+            'There was an error accessing directory "{}": {}'.format(base, exc)
+        )
+    for entry in entries:
+        key_file = os.path.join(entry.path, key_name)
+        try:
+            with salt.utils.files.fopen(key_file, "rb") as fh_:
+                data = load(fh_)
+        except OSError as exc:
+            if exc.errno in (errno.ENOENT, errno.ENOTDIR):
+                continue
+            raise SaltCacheError(
+                'There was an error reading the cache file "{}": {}'.format(
+                    key_file, exc
+                )
+            )
+        yield entry.name, data
+
+
 def updated(bank, key, cachedir):
     """
     Return the epoch of the mtime for this cache file
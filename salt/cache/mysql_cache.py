@@ -215,6 +215,47 @@ def fetch(bank, key):
     return __context__["serial"].loads(r[0])
 
 
+def fetch_many(bank_prefix, names, key):
+    """
+    Fetch the same key from several banks sharing a common prefix, with a
+    single ``IN`` query.
+    """
+    _init_client()
+    banks = {"{0}/{1}".format(bank_prefix, name): name for name in names}
+    if not banks:
+        return {}
+    query = "SELECT bank, data FROM {0} WHERE etcd_key='{1}' AND bank IN ({2})".format(
+        _table_name, key, ", ".join("'{0}'".format(bank) for bank in banks)
+    )
+    cur, _ = run_query(client, query)
+    ret = {
+        banks[row[0]]: __context__["serial"].loads(row[1]) for row in cur.fetchall()
+    }
+    cur.close()
+    return ret
+
+
+def list_with_data(bank_prefix, key):
+    """
+    Iterate over the banks inside ``bank_prefix`` along with the data they
+    hold under ``key``, with a single query.
+    """
+    _init_client()
+    # Escape the LIKE wildcards found in the prefix itself
+    like_prefix = (
+        bank_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    )
+    query = (
+        "SELECT bank, data FROM {0} WHERE etcd_key='{1}' AND bank LIKE '{2}/%' "
+        "AND bank NOT LIKE '{2}/%/%'".format(_table_name, key, like_prefix)
+    )
+    cur, _ = run_query(client, query)
+    rows = cur.fetchall()
+    cur.close()
+    for bank, data in rows:
+        yield bank[len(bank_prefix) + 1 :], __context__["serial"].loads(data)
+
+
 def flush(bank, key=None):
     """
     Remove the key from the cache bank with all the key content.
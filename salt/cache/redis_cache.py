@@ -180,6 +180,8 @@ _BANK_PREFIX = "$BANK"
 _KEY_PREFIX = "$KEY"
 _BANK_KEYS_PREFIX = "$BANKEYS"
 _SEPARATOR = "_"
+# Number of keys requested per MGET by fetch_many
+_FETCH_MANY_CHUNK = 1000
 
 REDIS_SERVER = None
 
@@ -389,6 +391,46 @@ def fetch(bank, key):
     return __context__["serial"].loads(redis_value)
 
 
+def fetch_many(bank_prefix, names, key):
+    """
+    Fetch the same key from several banks sharing a common prefix, using one
+    ``MGET`` per chunk of ``_FETCH_MANY_CHUNK`` keys.
+    """
+    redis_server = _get_redis_server()
+    names = list(names)
+    ret = {}
+    for index in range(0, len(names), _FETCH_MANY_CHUNK):
+        chunk = names[index : index + _FETCH_MANY_CHUNK]
+        redis_keys = [
+            _get_key_redis_key("{0}/{1}".format(bank_prefix, name), key)
+            for name in chunk
+        ]
+        try:
+            redis_values = redis_server.mget(redis_keys)
+        except (RedisConnectionError, RedisResponseError) as rerr:
+            mesg = "Cannot fetch the Redis cache keys under {rbank}: {rerr}".format(
+                rbank=bank_prefix, rerr=rerr
+            )
+            log.error(mesg)
+            raise SaltCacheError(mesg)
+        for name, redis_value in zip(chunk, redis_values):
+            if redis_value is not None:
+                ret[name] = __context__["serial"].loads(redis_value)
+    return ret
+
+
+def list_with_data(bank_prefix, key):
+    """
+    Iterate over the banks inside ``bank_prefix`` along with the data they
+    hold under ``key``.
+    """
+    names = [
+        name.decode() if isinstance(name, bytes) else name
+        for name in list_(bank_prefix)
+    ]
+    return iter(fetch_many(bank_prefix, names, key).items())
+
+
 def flush(bank, key=None):
     """
     Remove the key from the cache bank with all the key content. If no key is specified, remove
@@ -0,0 +1,367 @@
+"""
+Minion data cache plugin for a local SQLite database.
+
+.. versionadded:: Aluminium
+
+Keeps every bank and key of the Salt cache in a single SQLite database file
+instead of one file per key like the ``localfs`` cache does. Writes are done
+in transactions and ``list``, ``contains`` and ``updated`` are served from
+indexed tables, which keeps the cache fast on masters with a large number of
+minions. The database is opened in WAL mode so the MWorkers of a master can
+read it while another one writes to it.
+
+SQLite ships with Python, so no additional library is needed. To use SQLite
+as the minion data cache backend, set the master ``cache`` config value to
+``sqlite``:
+
+.. code-block:: yaml
+
+    cache: sqlite
+
+Optionally, the following values could be set in the master config. These
+are the defaults:
+
+.. code-block:: yaml
+
+    sqlite_cache.database: /var/cache/salt/master/salt_cache.db
+    sqlite_cache.timeout: 30
+
+``sqlite_cache.timeout`` is the number of seconds to wait for a lock held by
+another process to be released before giving up.
+
+An existing ``localfs`` cache can be copied over with the :py:func:`cache.migrate
+<salt.runners.cache.migrate>` runner:
+
+.. code-block:: bash
+
+    salt-run cache.migrate source=localfs target=sqlite
+"""
+
+import errno
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import salt.syspaths
+from salt.exceptions import SaltCacheError
+
+log = logging.getLogger(__name__)
+
+_DEFAULT_DATABASE_NAME = "salt_cache.db"
+_DEFAULT_TIMEOUT = 30
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER
+_FETCH_MANY_CHUNK = 500
+
+# Connections are never shared between processes or threads, the MWorkers
+# are forked from the master and each one needs its own, and sqlite3 only
+# lets the thread which opened a connection use it.
+_connections = {}
+
+# Module properties
+
+__virtualname__ = "sqlite"
+__func_alias__ = {"list_": "list"}
+
+
+def __virtual__():
+    return __virtualname__
+
+
+def __cachedir(kwargs=None):
+    if kwargs and "cachedir" in kwargs:
+        return kwargs["cachedir"]
+    return __opts__.get("cachedir", salt.syspaths.CACHE_DIR)
+
+
+def init_kwargs(kwargs):
+    database = __opts__.get("sqlite_cache.database")
+    if not database:
+        database = os.path.join(__cachedir(kwargs), _DEFAULT_DATABASE_NAME)
+    return {"database": database}
+
+
+def get_storage_id(kwargs):
+    return ("sqlite", kwargs["database"])
+
+
+def _get_conn(database):
+    """
+    Return the connection to the cache database for the current process and
+    thread, creating the database on first use.
+    """
+    conn = _connections.get((os.getpid(), threading.get_ident(), database))
+    if conn is not None:
+        return conn
+    try:
+        os.makedirs(os.path.dirname(database))
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            raise SaltCacheError(
+                "The cache directory, {}, could not be created: {}".format(
+                    os.path.dirname(database), exc
+                )
+            )
+    try:
+        conn = sqlite3.connect(
+            database, timeout=__opts__.get("sqlite_cache.timeout", _DEFAULT_TIMEOUT)
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS banks ("
+                "parent TEXT NOT NULL, name TEXT NOT NULL, "
+                "PRIMARY KEY (parent, name))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "bank TEXT NOT NULL, key TEXT NOT NULL, data BLOB, "
+                "updated INTEGER NOT NULL, PRIMARY KEY (bank, key))"
+            )
+    except sqlite3.Error as exc:
+        raise SaltCacheError(
+            'There was an error opening the cache database "{}": {}'.format(
+                database, exc
+            )
+        )
+    _connections[(os.getpid(), threading.get_ident(), database)] = conn
+    return conn
+
+
+def _bank(bank):
+    """
+    Normalize a bank name, ``minions//foo/`` and ``minions/foo`` are the same
+    bank.
+    """
+    return "/".join(part for part in bank.split("/") if part)
+
+
+def _split(bank):
+    """
+    Return the parent and the name of a bank
+    """
+    parent, _, name = bank.rpartition("/")
+    return parent, name
+
+
+def _subbanks_range(bank):
+    """
+    Return the bounds of the ``cache.bank`` values of all the sub-banks of
+    ``bank``, so that they can be selected through the primary key index.
+    """
+    if not bank:
+        return "", "\U0010ffff"
+    # "0" is the character right after "/"
+    return bank + "/", bank + "0"
+
+
+def store(bank, key, data, database):
+    """
+    Store a key value.
+    """
+    bank = _bank(bank)
+    conn = _get_conn(database)
+    banks = []
+    parent = bank
+    while parent:
+        banks.append(_split(parent))
+        parent = banks[-1][0]
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO banks (parent, name) VALUES (?, ?)", banks
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (bank, key, data, updated) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    bank,
+                    key,
+                    sqlite3.Binary(__context__["serial"].dumps(data)),
+                    int(time.time()),
+                ),
+            )
+    except sqlite3.Error as exc:
+        raise SaltCacheError(
+            "There was an error writing the key, {}/{}: {}".format(bank, key, exc)
+        )
+
+
+def fetch(bank, key, database):
+    """
+    Fetch a key value.
+    """
+    bank = _bank(bank)
+    conn = _get_conn(database)
+    try:
+        row = conn.execute(
+            "SELECT data FROM cache WHERE bank = ? AND key = ?", (bank, key)
+        ).fetchone()
+    except sqlite3.Error as exc:
+        raise SaltCacheError(
+            "There was an error reading the key, {}/{}: {}".format(bank, key, exc)
+        )
+    if row is None:
+        return {}
+    return __context__["serial"].loads(bytes(row[0]))
+
+
+def fetch_many(bank_prefix, names, key, database):
+    """
+    Fetch the same key from several banks sharing a common prefix.
+    """
+    bank_prefix = _bank(bank_prefix)
+    conn = _get_conn(database)
+    loads = __context__["serial"].loads
+    names = list(names)
+    ret = {}
+    for idx in range(0, len(names), _FETCH_MANY_CHUNK):
+        chunk = [
+            "{}/{}".format(bank_prefix, name)
+            for name in names[idx : idx + _FETCH_MANY_CHUNK]
+        ]
+        query = "SELECT bank, data FROM cache WHERE key = ? AND bank IN ({})".format(
+            ", ".join("?" * len(chunk))
+        )
+        try:
+            rows = conn.execute(query, [key] + chunk).fetchall()
+        except sqlite3.Error as exc:
+            raise SaltCacheError(
+                "There was an error reading the key, {}/*/{}: {}".format(
+                    bank_prefix, key, exc
+                )
+            )
+        for bank, data in rows:
+            ret[_split(bank)[1]] = loads(bytes(data))
+    return ret
+
+
+def list_with_data(bank_prefix, key, database):
+    """
+    Iterate over the banks inside ``bank_prefix`` along with the data they
+    hold under ``key``, using a single range query.
+    """
+    bank_prefix = _bank(bank_prefix)
+    conn = _get_conn(database)
+    loads = __context__["serial"].loads
+    low, high = _subbanks_range(bank_prefix)
+    try:
+        rows = conn.execute(
+            "SELECT bank, data FROM cache WHERE bank >= ? AND bank < ? AND key = ?",
+            (low, high, key),
+        ).fetchall()
+    except sqlite3.Error as exc:
+        raise SaltCacheError(
+            "There was an error reading the key, {}/*/{}: {}".format(
+                bank_prefix, key, exc
+            )
+        )
+    for bank, data in rows:
+        name = bank[len(low) :]
+        if "/" not in name:
+            yield name, loads(bytes(data))
+
+
+def updated(bank, key, database):
+    """
+    Return the epoch of the last update of the key
+    """
+    bank = _bank(bank)
+    conn = _get_conn(database)
+    try:
+        row = conn.execute(
+            "SELECT updated FROM cache WHERE bank = ? AND key = ?", (bank, key)
+        ).fetchone()
+    except sqlite3.Error as exc:
+        raise SaltCacheError(
+            "There was an error reading the key, {}/{}: {}".format(bank, key, exc)
+        )
+    if row is None:
+        log.warning('Cache key "%s/%s" does not exist', bank, key)
+        return None
+    return row[0]
+
+
+def flush(bank, key=None, database=None):
+    """
+    Remove the key from the cache bank with all the key content.
+    """
+    bank = _bank(bank)
+    if database is None:
+        database = init_kwargs({})["database"]
+    conn = _get_conn(database)
+    try:
+        with conn:
+            if key is not None:
+                cur = conn.execute(
+                    "DELETE FROM cache WHERE bank = ? AND key = ?", (bank, key)
+                )
+                return cur.rowcount > 0
+            if not contains(bank, None, database):
+                return False
+            low, high = _subbanks_range(bank)
+            conn.execute(
+                "DELETE FROM cache WHERE bank = ? OR (bank >= ? AND bank < ?)",
+                (bank, low, high),
+            )
+            conn.execute(
+                "DELETE FROM banks WHERE parent = ? OR (parent >= ? AND parent < ?)",
+                (bank, low, high),
+            )
+            if bank:
+                conn.execute(
+                    "DELETE FROM banks WHERE parent = ? AND name = ?", _split(bank)
+                )
+    except sqlite3.Error as exc:
+        raise SaltCacheError(
+            'There was an error removing "{}": {}'.format(
+                bank if key is None else "{}/{}".format(bank, key), exc
+            )
+        )
+    return True
+
+
+def list_(bank, database):
+    """
+    Return an iterable object containing all entries stored in the specified
+    bank.
+    """
+    bank = _bank(bank)
+    conn = _get_conn(database)
+    try:
+        rows = conn.execute(
+            "SELECT name FROM banks WHERE parent = ? "
+            "UNION SELECT key FROM cache WHERE bank = ?",
+            (bank, bank),
+        ).fetchall()
+    except sqlite3.Error as exc:
+        raise SaltCacheError(
+            'There was an error listing the bank "{}": {}'.format(bank, exc)
+        )
+    return [row[0] for row in rows]
+
+
+def contains(bank, key, database):
+    """
+    Checks if the specified bank contains the specified key.
+    """
+    bank = _bank(bank)
+    conn = _get_conn(database)
+    try:
+        if key is None:
+            if not bank:
+                return True
+            row = conn.execute(
+                "SELECT 1 FROM banks WHERE parent = ? AND name = ?", _split(bank)
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT 1 FROM cache WHERE bank = ? AND key = ?", (bank, key)
+            ).fetchone()
+    except sqlite3.Error as exc:
+        raise SaltCacheError(
+            'There was an error accessing the bank "{}": {}'.format(bank, exc)
+        )
+    return row is not None
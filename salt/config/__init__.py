@@ -357,6 +357,12 @@ VALID_OPTS = immutabletypes.freeze(
         "enable_gpu_grains": bool,
         # Tell the loader to attempt to import *.zip archives
         "enable_zip_modules": bool,
+        # Keep an index of the module files under the cachedir so the loader does
+        # not list the module directories again while they are unchanged
+        "loader_file_mapping_cache": bool,
+        # Keep an index of the outcome of the __virtual__ functions under the
+        # cachedir so the loader does not import unavailable modules again
+        "loader_virtual_cache": bool,
         # Tell the client to show minions that have timed out
         "show_timeout": bool,
         # Tell the client to display the jid when a job is published
@@ -376,6 +382,10 @@ VALID_OPTS = immutabletypes.freeze(
         "state_auto_order": bool,
         # Fire events as state chunks are processed by the state compiler
         "state_events": bool,
+        # Cache the high data rendered from the SLS files under the cachedir
+        "state_render_cache": bool,
+        # The number of state chunks to run at the same time, 1 runs them one by one
+        "state_concurrency": int,
         # The number of seconds a minion should wait before retry when attempting authentication
         "acceptance_wait_time": float,
         # The number of seconds a minion should wait before giving up during authentication
@@ -423,6 +433,15 @@ VALID_OPTS = immutabletypes.freeze(
         "return_retry_timer_max": int,
         # Configures amount of return retries
         "return_retry_tries": int,
+        # The number of requests the request channel keeps in flight on a connection to
+        # the master. 1 sends them one at a time.
+        "request_channel_window": int,
+        # Keep the files fetched from the master in a cache keyed by their hash, and link
+        # the files of each saltenv to it
+        "content_addressed_file_cache": bool,
+        # Fetch the files of at least this size from the sendfile server of the master,
+        # when it serves them. 0 disables it.
+        "file_sendfile_min_size": int,
         # Specify one or more returners in which all events will be sent to. Requires that the returners
         # in question have an event_return(event) function!
         "event_return": (list, str),
@@ -439,6 +458,9 @@ VALID_OPTS = immutabletypes.freeze(
         "event_return_blacklist": list,
         # default match type for filtering events tags: startswith, endswith, find, regex, fnmatch
         "event_match_type": str,
+        # The number of events a SaltEvent keeps for each of its subscriptions
+        # while it is waiting for other events, 0 for no limit
+        "event_pending_queue_size": int,
         # This pidfile to write out to when a daemon starts
         "pidfile": str,
         # Used with the SECO range master tops system
@@ -480,6 +502,9 @@ VALID_OPTS = immutabletypes.freeze(
         # The number of MWorker processes for a master to startup. This number needs to scale up as
         # the number of connected minions increases.
         "worker_threads": int,
+        # Load the modules and the fileserver backends in the ReqServer before
+        # forking the MWorkers, so that they share them copy-on-write
+        "mworker_preload": bool,
         # The port for the master to listen to returns on. The minion needs to connect to this port
         # to send returns.
         "ret_port": int,
@@ -520,6 +545,12 @@ VALID_OPTS = immutabletypes.freeze(
         "proxy_keep_alive_interval": int,
         # Update intervals
         "roots_update_interval": int,
+        # Keep the file lists of the roots fileserver up to date from inotify
+        # events instead of walking the file_roots
+        "roots_watch": bool,
+        # Keep the hashes of the files of the roots fileserver in one index
+        # instead of one cache file per file
+        "roots_hash_index": bool,
         "azurefs_update_interval": int,
         "gitfs_update_interval": int,
         "git_pillar_update_interval": int,
@@ -560,6 +591,13 @@ VALID_OPTS = immutabletypes.freeze(
         "gitfs_ref_types": list,
         "gitfs_refspecs": list,
         "gitfs_disable_saltenv_mapping": bool,
+        # The number of gitfs, git_pillar and winrepo remotes fetched at once
+        "git_fetch_workers": int,
+        # Share the objects of the gitfs, git_pillar and winrepo remotes through a
+        # common object store
+        "git_shared_objects": bool,
+        # Serve gitfs files and file lists from an index of each tree
+        "gitfs_tree_index": bool,
         "hgfs_remotes": list,
         "hgfs_mountpoint": str,
         "hgfs_root": str,
@@ -601,6 +639,8 @@ VALID_OPTS = immutabletypes.freeze(
         # When creating a pillar, there are several strategies to choose from when
         # encountering duplicate values
         "pillar_source_merging_strategy": str,
+        # The number of external pillars which can be compiled at the same time
+        "ext_pillar_concurrency": int,
         # Recursively merge lists by aggregating them instead of replacing them.
         "pillar_merge_lists": bool,
         # If True, values from included pillar SLS targets will override
@@ -614,6 +654,8 @@ VALID_OPTS = immutabletypes.freeze(
         # The salt environment which provides the default top file when
         # top_file_merging_strategy is set to 'same'; defaults to 'base'
         "default_top": str,
+        # Cache the rendered top files and only render them again when they change
+        "top_file_cache": bool,
         "ping_on_rotate": bool,
         "peer": dict,
         "preserve_minion_cache": bool,
@@ -640,6 +682,11 @@ VALID_OPTS = immutabletypes.freeze(
         "fileserver_ignoresymlinks": bool,
         "fileserver_limit_traversal": bool,
         "fileserver_verify_config": bool,
+        # The globs of the files of each saltenv to stream to the minions from a
+        # dedicated TCP port with sendfile, instead of in chunks from the MWorkers
+        "fileserver_sendfile": dict,
+        # The port of the sendfile server of the master
+        "fileserver_sendfile_port": int,
         # Optionally apply '*' permissioins to any user. By default '*' is a fallback case that is
         # applied only if the user didn't matched by other matchers.
         "permissive_acl": bool,
@@ -681,6 +728,16 @@ VALID_OPTS = immutabletypes.freeze(
         # cachedir under the name of the minion and used to predetermine what minions are expected to
         # reply from executions.
         "minion_data_cache": bool,
+        # Keep the grains and pillar of the minion data cache indexed in memory in a dedicated
+        # master process, and use it for grain and pillar targeting.
+        "minion_data_index": bool,
+        # The number of seconds to wait for an answer of the minion data index before falling back
+        # to scanning the minion data cache.
+        "minion_data_index_timeout": int,
+        # Cache the minions matched by each term of compound targets until keys are accepted or deleted
+        # or the minion data cache is written, for at most compound_cache_ttl seconds.
+        "compound_cache": bool,
+        "compound_cache_ttl": int,
         # The number of seconds between AES key rotations on the master
         "publish_session": int,
         # Defines a salt reactor. See http://docs.saltstack.com/en/latest/topics/reactor/
@@ -822,6 +879,12 @@ VALID_OPTS = immutabletypes.freeze(
         "password": (type(None), str),
         # Use zmq.SUSCRIBE to limit listening sockets to only process messages bound for them
         "zmq_filtering": bool,
+        # Resolve glob, pcre and grain targets on the master and only send the publishes
+        # of the TCP transport to the matching minions
+        "tcp_pub_filtering": bool,
+        # The number of milliseconds the publisher waits to collect publishes into a single
+        # encrypted and signed payload. 0 disables batching.
+        "pub_batch_window": int,
         # Connection caching. Can greatly speed up salt performance.
         "con_cache": bool,
         "rotate_aes_key": bool,
@@ -1001,6 +1064,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "pillarenv_from_saltenv": False,
         "pillar_opts": False,
         "pillar_source_merging_strategy": "smart",
+        "ext_pillar_concurrency": 1,
         "pillar_merge_lists": False,
         "pillar_includes_override_sls": False,
         # ``pillar_cache``, ``pillar_cache_ttl``, ``pillar_cache_backend``,
@@ -1142,12 +1206,16 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "enable_fqdns_grains": _DFLT_FQDNS_GRAINS,
         "enable_gpu_grains": True,
         "enable_zip_modules": False,
+        "loader_file_mapping_cache": True,
+        "loader_virtual_cache": False,
         "state_verbose": True,
         "state_output": "full",
         "state_output_diff": False,
         "state_auto_order": True,
         "state_events": False,
         "state_aggregate": False,
+        "state_render_cache": False,
+        "state_concurrency": 1,
         "snapper_states": False,
         "snapper_states_config": "root",
         "acceptance_wait_time": 10,
@@ -1169,6 +1237,9 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "return_retry_timer": 5,
         "return_retry_timer_max": 10,
         "return_retry_tries": 3,
+        "request_channel_window": 1,
+        "content_addressed_file_cache": False,
+        "file_sendfile_min_size": 0,
         "random_reauth_delay": 10,
         "winrepo_source_dir": "salt://win/repo-ng/",
         "winrepo_dir": os.path.join(salt.syspaths.BASE_FILE_ROOTS_DIR, "win", "repo"),
@@ -1227,6 +1298,7 @@ DEFAULT_MINION_OPTS = immutabletypes.freeze(
         "http_request_timeout": 1 * 60 * 60.0,  # 1 hour
         "http_max_body": 100 * 1024 * 1024 * 1024,  # 100GB
         "event_match_type": "startswith",
+        "event_pending_queue_size": 100000,
         "minion_restart_command": [],
         "pub_ret": True,
         "proxy_host": "",
@@ -1259,6 +1331,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "auth_mode": 1,
         "user": _MASTER_USER,
         "worker_threads": 5,
+        "mworker_preload": False,
         "sock_dir": os.path.join(salt.syspaths.SOCK_DIR, "master"),
         "sock_pool_size": 1,
         "ret_port": 4506,
@@ -1287,6 +1360,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "thorium_roots": {"base": [salt.syspaths.BASE_THORIUM_ROOTS_DIR]},
         "top_file_merging_strategy": "merge",
         "env_order": [],
+        "top_file_cache": False,
         "saltenv": None,
         "lock_saltenv": False,
         "pillarenv": None,
@@ -1295,6 +1369,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "local": True,
         # Update intervals
         "roots_update_interval": DEFAULT_INTERVAL,
+        "roots_watch": False,
+        "roots_hash_index": False,
         "azurefs_update_interval": DEFAULT_INTERVAL,
         "gitfs_update_interval": DEFAULT_INTERVAL,
         "git_pillar_update_interval": DEFAULT_INTERVAL,
@@ -1337,6 +1413,9 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "gitfs_ref_types": ["branch", "tag", "sha"],
         "gitfs_refspecs": _DFLT_REFSPECS,
         "gitfs_disable_saltenv_mapping": False,
+        "git_fetch_workers": 1,
+        "git_shared_objects": False,
+        "gitfs_tree_index": False,
         "hgfs_remotes": [],
         "hgfs_mountpoint": "",
         "hgfs_root": "",
@@ -1367,6 +1446,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "pillar_opts": False,
         "pillar_safe_render_error": True,
         "pillar_source_merging_strategy": "smart",
+        "ext_pillar_concurrency": 1,
         "pillar_merge_lists": False,
         "pillar_includes_override_sls": False,
         "pillar_cache": False,
@@ -1409,6 +1489,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "fileserver_ignoresymlinks": False,
         "fileserver_limit_traversal": False,
         "fileserver_verify_config": True,
+        "fileserver_sendfile": {},
+        "fileserver_sendfile_port": 4507,
         "max_open_files": 100000,
         "hash_type": "sha256",
         "optimization_order": [0, 1, 2],
@@ -1429,6 +1511,10 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "master_job_cache": "local_cache",
         "job_cache_store_endtime": False,
         "minion_data_cache": True,
+        "minion_data_index": False,
+        "minion_data_index_timeout": 5,
+        "compound_cache": False,
+        "compound_cache_ttl": 60,
         "enforce_mine_cache": False,
         "ipc_mode": _DFLT_IPC_MODE,
         "ipc_write_buffer": _DFLT_IPC_WBUFFER,
@@ -1471,6 +1557,7 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "event_return_whitelist": [],
         "event_return_blacklist": [],
         "event_match_type": "startswith",
+        "event_pending_queue_size": 100000,
         "runner_returns": True,
         "serial": "msgpack",
         "test": False,
@@ -1487,6 +1574,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "ssh_use_home_key": False,
         "cython_enable": False,
         "enable_gpu_grains": False,
+        "loader_file_mapping_cache": True,
+        "loader_virtual_cache": False,
         # XXX: Remove 'key_logfile' support in 2014.1.0
         "key_logfile": os.path.join(salt.syspaths.LOGS_DIR, "key"),
         "verify_env": True,
@@ -1550,6 +1639,8 @@ DEFAULT_MASTER_OPTS = immutabletypes.freeze(
         "master_use_pubkey_signature": False,
         "zmq_filtering": False,
         "zmq_monitor": False,
+        "pub_batch_window": 0,
+        "tcp_pub_filtering": False,
         "con_cache": False,
         "rotate_aes_key": True,
         "cache_sreqs": True,
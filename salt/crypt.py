@@ -229,6 +229,13 @@ def sign_message(privkey_path, message, passphrase=None):
     Use Crypto.Signature.PKCS1_v1_5 to sign a message. Returns the signature.
     """
     key = get_rsa_key(privkey_path, passphrase)
+    return sign_message_with_key(key, message)
+
+
+def sign_message_with_key(key, message):
+    """
+    Sign a message with an already loaded private key. Returns the signature.
+    """
     log.debug("salt.crypt.sign_message: Signing message.")
     if HAS_M2:
         md = EVP.MessageDigest("sha1")
@@ -585,8 +585,9 @@ class RemoteFuncs:
         _res = checker.check_minions(load["tgt"], match_type, greedy=False)
         minions = _res["minions"]
         minion_side_acl = {}  # Cache minion-side ACL
+        cdata = self.cache.fetch_many("minions", minions, "mine")
         for minion in minions:
-            mine_data = self.cache.fetch("minions/{}".format(minion), "mine")
+            mine_data = cdata.get(minion)
             if not isinstance(mine_data, dict):
                 continue
             for function in functions_allowed:
@@ -748,14 +749,13 @@ class RemoteFuncs:
             load.get("ext"),
             self.mminion.functions,
             pillar_override=load.get("pillar_override", {}),
+            clean_cache=load.get("clean_cache"),
         )
         data = pillar.compile_pillar()
         if self.opts.get("minion_data_cache", False):
-            self.cache.store(
-                "minions/{}".format(load["id"]),
-                "data",
-                {"grains": load["grains"], "pillar": data},
-            )
+            mdata = {"grains": load["grains"], "pillar": data}
+            self.cache.store("minions/{}".format(load["id"]), "data", mdata)
+            self.ckminions.minion_data_updated(load["id"], mdata)
             if self.opts.get("minion_data_cache_events") is True:
                 self.event.fire_event(
                     {"comment": "Minion data cache refresh"},
@@ -5,10 +5,14 @@ Classes that manage file clients
 import contextlib
 import errno
 import ftplib
+import glob
+import hashlib
 import logging
 import os
 import shutil
+import socket
 import string
+import time
 
 import salt.client
 import salt.crypt
@@ -1126,6 +1130,7 @@ class RemoteClient(Client):
                 mode_server = None
         else:
             hash_server = self.hash_file(path, saltenv)
+            stat_server = None
             mode_server = None
 
         # Check if file exists on server, before creating files and
@@ -1203,6 +1208,42 @@ class RemoteClient(Client):
                             raise
                 else:
                     return False
+
+        try:
+            size_server = stat_server[6]
+        except (IndexError, TypeError):
+            size_server = None
+        cas_path = None
+        if self.opts.get("content_addressed_file_cache", False):
+            cas_path = self._cas_path(hash_server, cachedir)
+        fetch_dest = dest or dest2check
+        if cas_path and self._cas_get(
+            cas_path, fetch_dest, size_server, link=not dest
+        ):
+            log.debug("Found %s in the content addressed cache", path)
+            return fetch_dest
+        if size_server is not None and hash_server.get("hsum"):
+            # The files cached for the minion are only readable by the owner
+            umask = None if dest else 0o077
+            sendfile_min_size = self.opts.get("file_sendfile_min_size", 0)
+            if (
+                sendfile_min_size
+                and size_server >= sendfile_min_size
+                and self._get_file_sendfile(
+                    load, fetch_dest, size_server, hash_server, umask=umask
+                )
+            ) or self._get_file_windowed(
+                load, fetch_dest, size_server, hash_server, umask=umask
+            ):
+                log.info(
+                    "Fetching file from saltenv '%s', ** done ** '%s'", saltenv, path
+                )
+                if cas_path and not dest:
+                    self._cas_put(cas_path, fetch_dest, hash_server)
+                return fetch_dest
+        cache_fetch = not dest
+
+        if dest:
             # We need an open filehandle here, that's why we're not using a
             # with clause:
             # pylint: disable=resource-leakage
@@ -1297,6 +1338,8 @@ class RemoteClient(Client):
         if fn_:
             fn_.close()
             log.info("Fetching file from saltenv '%s', ** done ** '%s'", saltenv, path)
+            if cas_path and cache_fetch:
+                self._cas_put(cas_path, dest, hash_server)
         else:
             log.debug(
                 "In saltenv '%s', we are ** missing ** the file '%s'", saltenv, path
@@ -1304,6 +1347,283 @@ class RemoteClient(Client):
 
         return dest
 
+    def _cas_path(self, hash_server, cachedir=None):
+        """
+        Return the path of a file in the content addressed cache, from the
+        hash the master returned for it
+        """
+        try:
+            hsum = hash_server["hsum"]
+            hash_type = hash_server.get("hash_type", "md5")
+        except (KeyError, TypeError):
+            return None
+        if not hsum or not all(char in string.hexdigits for char in hsum):
+            return None
+        return os.path.join(
+            self.get_cachedir(cachedir), "files_cas", hash_type, hsum[:2], hsum
+        )
+
+    def _cas_get(self, cas_path, dest, size=None, link=True):
+        """
+        Put the file of the content addressed cache at cas_path in dest, as a
+        hard link when link is set and as a copy otherwise. Return False when
+        the cache holds no such file.
+        """
+        try:
+            cas_size = os.path.getsize(cas_path)
+        except OSError:
+            return False
+        if size is not None and cas_size != size:
+            return False
+        tmp_dest = "{}.cas-{}".format(dest, os.getpid())
+        try:
+            if link:
+                try:
+                    os.link(cas_path, tmp_dest)
+                except OSError:
+                    # Hard links are not supported there, copy instead
+                    shutil.copyfile(cas_path, tmp_dest)
+            else:
+                shutil.copyfile(cas_path, tmp_dest)
+            if os.path.isdir(dest):
+                salt.utils.files.rm_rf(dest)
+            os.replace(tmp_dest, dest)
+        except OSError as exc:
+            log.debug("Unable to use %s from the cache: %s", cas_path, exc)
+            try:
+                os.remove(tmp_dest)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def _cas_put(self, cas_path, path, hash_server=None):
+        """
+        Add a file fetched from the master to the content addressed cache, as
+        a hard link to it. When hash_server is passed the file is only added
+        if it has that hash.
+        """
+        if os.path.isfile(cas_path):
+            return
+        if hash_server is not None:
+            hash_type = hash_server.get("hash_type", "md5")
+            try:
+                hsum = salt.utils.hashutils.get_hash(path, hash_type)
+            except (OSError, ValueError):
+                return
+            if hsum != hash_server["hsum"]:
+                return
+        try:
+            with salt.utils.files.set_umask(0o077):
+                os.makedirs(os.path.dirname(cas_path), exist_ok=True)
+            try:
+                os.link(path, cas_path)
+            except OSError:
+                tmp_path = "{}.{}".format(cas_path, os.getpid())
+                shutil.copyfile(path, tmp_path)
+                os.replace(tmp_path, cas_path)
+        except OSError as exc:
+            log.debug("Unable to add %s to the content addressed cache: %s", path, exc)
+
+    def _get_file_windowed(self, load, dest, size, hash_server, umask=None):
+        """
+        Fetch a file of a known size, keeping a window of chunk requests in
+        flight. The chunks are written to a partial file under the cachedir,
+        which a later call resumes from if the transfer is interrupted. Return
+        False when the file has to be fetched one chunk at a time instead.
+        """
+        if not hasattr(hashlib, hash_server.get("hash_type", "md5")):
+            return False
+
+        max_window = max(self.opts.get("request_channel_window", 1), 1)
+        window = min(2, max_window)
+        rate = 0
+        chunk_size = None
+        transport_tries = 0
+        with self._partial(dest, size, hash_server, umask) as (partial, fn_, loc):
+            while loc < size:
+                if chunk_size is None:
+                    # The first chunk tells the file_buffer_size of the master
+                    locs = [loc]
+                else:
+                    locs = list(range(loc, size, chunk_size))[: window * 4]
+                start = time.time()
+                replies = self.channel.send_many(
+                    [dict(load, loc=chunk_loc) for chunk_loc in locs],
+                    raw=True,
+                    window=window,
+                )
+                elapsed = time.time() - start
+                for chunk_loc, data in zip(locs, replies):
+                    try:
+                        data = decode_dict_keys_to_str(data)
+                        chunk = data["data"]
+                        if chunk and data.get("gzip", None):
+                            chunk = salt.utils.gzip_util.uncompress(chunk)
+                        if isinstance(chunk, str):
+                            chunk = chunk.encode()
+                    except (AttributeError, TypeError, KeyError) as exc:
+                        transport_tries += 1
+                        log.warning(
+                            "Data transport is broken, got: %s, exception: %s, "
+                            "attempt %d of 3",
+                            data,
+                            exc,
+                            transport_tries,
+                        )
+                        self._refresh_channel()
+                        if transport_tries > 3:
+                            return False
+                        break
+                    if not chunk or (
+                        chunk_size is not None
+                        and len(chunk) != min(chunk_size, size - chunk_loc)
+                    ):
+                        # The file changed on the master since it was hashed
+                        os.remove(partial)
+                        return False
+                    if chunk_size is None:
+                        chunk_size = len(chunk)
+                    fn_.write(chunk)
+                    loc += len(chunk)
+                else:
+                    # Widen the window while it raises the rate of the chunks,
+                    # and narrow it down again when it does not
+                    if len(locs) > 1 and elapsed > 0:
+                        new_rate = len(locs) / elapsed
+                        if new_rate >= rate:
+                            window = min(window * 2, max_window)
+                        else:
+                            window = max(window // 2, 1)
+                        rate = new_rate
+
+            return self._install_partial(partial, fn_, dest, hash_server)
+
+    def _get_file_sendfile(self, load, dest, size, hash_server, umask=None):
+        """
+        Fetch a file from the sendfile server of the master, which streams it
+        on a dedicated connection instead of the request channel. The file is
+        written to the same partial file as _get_file_windowed, which resumes
+        it if the stream is interrupted. Return False when the master does not
+        stream the file or the stream did not complete.
+        """
+        if not hasattr(hashlib, hash_server.get("hash_type", "md5")):
+            return False
+        master_ip = self.opts.get("master_ip")
+        reply = self.channel.send(dict(load, cmd="_file_sendfile"))
+        if not master_ip or not isinstance(reply, dict) or not reply.get("token"):
+            return False
+
+        with self._partial(dest, size, hash_server, umask) as (partial, fn_, loc):
+            try:
+                with socket.create_connection(
+                    (master_ip, reply["port"]), timeout=60
+                ) as sock:
+                    sock.sendall(
+                        salt.utils.stringutils.to_bytes(
+                            "{} {}\n".format(reply["token"], loc)
+                        )
+                    )
+                    while loc < size:
+                        chunk = sock.recv(min(1048576, size - loc))
+                        if not chunk:
+                            break
+                        fn_.write(chunk)
+                        loc += len(chunk)
+            except OSError as exc:
+                log.warning(
+                    "Unable to stream %s from the master: %s", load["path"], exc
+                )
+            if loc < size:
+                return False
+            return self._install_partial(partial, fn_, dest, hash_server)
+
+    def _partial_path(self, dest, hash_server):
+        """
+        Return the partial file to download the version of dest with the hash
+        hash_server to, under the cachedir
+        """
+        return os.path.join(
+            self.opts["cachedir"],
+            "partial",
+            "{}-{}".format(
+                salt.utils.hashutils.sha256_digest(dest), hash_server["hsum"][:16]
+            ),
+        )
+
+    @contextlib.contextmanager
+    def _partial(self, dest, size, hash_server, umask=None):
+        """
+        Open the partial file to download dest to for appending, holding an
+        exclusive lock on it so that the concurrent downloads of dest wait for
+        each other. Yield its path, the file object and the size of the part
+        already downloaded.
+        """
+        partial = self._partial_path(dest, hash_server)
+        partial_dir = os.path.dirname(partial)
+        with salt.utils.files.set_umask(0o077):
+            os.makedirs(partial_dir, exist_ok=True)
+        # Drop the partial downloads of the former versions of the file
+        prefix = os.path.basename(partial).rsplit("-", 1)[0]
+        for stale in glob.glob(os.path.join(glob.escape(partial_dir), prefix + "-*")):
+            if stale != partial:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+        while True:
+            with salt.utils.files.set_umask(umask), salt.utils.files.flopen(
+                partial, "ab"
+            ) as fn_:
+                try:
+                    current = os.stat(partial).st_ino
+                except OSError:
+                    current = None
+                if current != os.fstat(fn_.fileno()).st_ino:
+                    # Another download completed the file while this one was
+                    # waiting for the lock, start over from a new file
+                    continue
+                loc = os.fstat(fn_.fileno()).st_size
+                if loc > size:
+                    fn_.truncate(0)
+                    loc = 0
+                elif loc:
+                    log.debug("Resuming the download of %s at %d", dest, loc)
+                yield partial, fn_, loc
+                return
+
+    def _install_partial(self, partial, fn_, dest, hash_server):
+        """
+        Move a complete partial file to dest if the hash of its content matches
+        the one of the master, or remove it
+        """
+        fn_.flush()
+        hsum = salt.utils.hashutils.get_hash(
+            partial, hash_server.get("hash_type", "md5")
+        )
+        if hsum != hash_server["hsum"]:
+            log.warning("Bad download of file %s", dest)
+            os.remove(partial)
+            return False
+        # If a directory was formerly cached at this path, then remove it to
+        # avoid a traceback trying to write the file
+        if os.path.isdir(dest):
+            salt.utils.files.rm_rf(dest)
+        try:
+            os.replace(partial, dest)
+        except OSError as exc:
+            if exc.errno != errno.EXDEV:
+                log.warning("Unable to move the download of %s: %s", dest, exc)
+                return False
+            # dest is on another filesystem than the cachedir
+            with salt.utils.files.fopen(
+                partial, "rb"
+            ) as ifile, salt.utils.atomicfile.atomic_open(dest, "wb") as ofile:
+                shutil.copyfileobj(ifile, ofile)
+            os.remove(partial)
+        return True
+
     def file_list(self, saltenv="base", prefix=""):
         """
         List the files on the master
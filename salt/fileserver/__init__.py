@@ -608,6 +608,37 @@ class Fileserver:
                     return fnd
         return fnd
 
+    def sendfile_path(self, load):
+        """
+        Return the local path of a file to stream with the sendfile server, or
+        an empty string if fileserver_sendfile does not match the file, or if
+        the file does not resolve inside the roots of its backend
+        """
+        if "path" not in load or "saltenv" not in load:
+            return ""
+        saltenv = str(load["saltenv"])
+        path = salt.utils.stringutils.to_unicode(load["path"])
+        if os.path.isabs(path) or ".." in path.replace("\\", "/").split("/"):
+            return ""
+        globs = self.opts.get("fileserver_sendfile", {}).get(saltenv, [])
+        if not any(fnmatch.fnmatch(path, glob) for glob in globs):
+            return ""
+        fnd = self.find_file(path, saltenv)
+        if not fnd.get("path"):
+            return ""
+        if fnd["back"] == "roots":
+            file_roots = self.opts["file_roots"]
+            roots = file_roots.get(saltenv, file_roots.get("__env__", []))
+        else:
+            # The other backends serve the files they cache
+            roots = [os.path.join(self.opts["cachedir"], fnd["back"])]
+        real_path = os.path.realpath(fnd["path"])
+        for root in roots:
+            root = os.path.realpath(root)
+            if os.path.commonpath([root, real_path]) == root:
+                return real_path
+        return ""
+
     def serve_file(self, load):
         """
         Serve up a chunk of a file
@@ -872,7 +903,7 @@ class FSChan:
                 self.opts["__fs_update"] = True
         else:
             self.fs.update()
-        self.cmd_stub = {"master_tops": {}, "ext_nodes": {}}
+        self.cmd_stub = {"master_tops": {}, "ext_nodes": {}, "file_sendfile": {}}
 
     def send(
         self, load, tries=None, timeout=None, raw=False
@@ -891,5 +922,13 @@ class FSChan:
             return {}
         return getattr(self.fs, cmd)(load)
 
+    def send_many(
+        self, loads, tries=None, timeout=None, raw=False, window=None
+    ):  # pylint: disable=unused-argument
+        """
+        Emulate the channel send_many method, the loads are sent one at a time
+        """
+        return [self.send(load, raw=raw) for load in loads]
+
     def close(self):
         pass
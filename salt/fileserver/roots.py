@@ -18,8 +18,12 @@ configuration option.
 import errno
 import logging
 import os
+import threading
+import time
 
 import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.event
 import salt.utils.files
 import salt.utils.gzip_util
@@ -29,8 +33,21 @@ import salt.utils.platform
 import salt.utils.stringutils
 import salt.utils.versions
 
+try:
+    import pyinotify
+
+    HAS_PYINOTIFY = True
+except ImportError:
+    HAS_PYINOTIFY = False
+
 log = logging.getLogger(__name__)
 
+# The watcher of the file_roots, started by watch()
+_WATCHER = None
+
+# The hash index written by update(), as loaded by this process
+_HASH_INDEX = {"mtime_ns": None, "checked": 0, "index": {}}
+
 
 def find_file(path, saltenv="base", **kwargs):
     """
@@ -152,7 +169,15 @@ def update():
     data = {"changed": False, "files": {"changed": []}, "backend": "roots"}
 
     # generate the new map
-    new_mtime_map = salt.fileserver.generate_mtime_map(__opts__, __opts__["file_roots"])
+    watcher = _WATCHER
+    if watcher is not None:
+        watcher.check_roots()
+    if watcher is not None and not watcher.failed:
+        new_mtime_map = watcher.mtime_map()
+    else:
+        new_mtime_map = salt.fileserver.generate_mtime_map(
+            __opts__, __opts__["file_roots"]
+        )
 
     old_mtime_map = {}
     # if you have an old map, load that
@@ -174,6 +199,9 @@ def update():
                         line,
                     )
 
+    if __opts__.get("roots_hash_index", False):
+        _update_hash_index(new_mtime_map)
+
     # compare the maps, set changed to the return value
     data["changed"] = salt.fileserver.diff_mtime_map(old_mtime_map, new_mtime_map)
 
@@ -183,15 +211,18 @@ def update():
     data["files"]["removed"] = list(old_files - new_files)
     data["files"]["added"] = list(new_files - old_files)
 
-    # write out the new map
-    mtime_map_path_dir = os.path.dirname(mtime_map_path)
-    if not os.path.exists(mtime_map_path_dir):
-        os.makedirs(mtime_map_path_dir)
-    with salt.utils.files.fopen(mtime_map_path, "wb") as fp_:
-        for file_path, mtime in new_mtime_map.items():
-            fp_.write(
-                salt.utils.stringutils.to_bytes("{}:{}\n".format(file_path, mtime))
-            )
+    # write out the new map, unless it is the same
+    if data["changed"] or not os.path.exists(mtime_map_path):
+        mtime_map_path_dir = os.path.dirname(mtime_map_path)
+        if not os.path.exists(mtime_map_path_dir):
+            os.makedirs(mtime_map_path_dir)
+        with salt.utils.files.fopen(mtime_map_path, "wb") as fp_:
+            for file_path, mtime in new_mtime_map.items():
+                fp_.write(
+                    salt.utils.stringutils.to_bytes(
+                        "{}:{}\n".format(file_path, mtime)
+                    )
+                )
 
     if __opts__.get("fileserver_events", False):
         # if there is a change, fire an event
@@ -233,6 +264,20 @@ def file_hash(load, fnd):
     # set the hash_type as it is determined by config-- so mechanism won't change that
     ret["hash_type"] = __opts__["hash_type"]
 
+    if __opts__.get("roots_hash_index", False):
+        # Only hash the file again if its size or mtime changed
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return {}
+        index = _load_hash_index()
+        entry = index.get(path)
+        if entry is None or list(entry[:2]) != [stat.st_size, stat.st_mtime_ns]:
+            hsum = salt.utils.hashutils.get_hash(path, __opts__["hash_type"])
+            entry = index[path] = [stat.st_size, stat.st_mtime_ns, hsum]
+        ret["hsum"] = entry[2]
+        return ret
+
     # check if the hash is cached
     # cache file's contents should be "hash:mtime"
     cache_path = os.path.join(
@@ -297,6 +342,132 @@ def file_hash(load, fnd):
     return ret
 
 
+def _hash_index_path():
+    """
+    Return the path of the hash index of the file_roots
+    """
+    return os.path.join(
+        __opts__["cachedir"], "roots", "hash_index.{}.p".format(__opts__["hash_type"])
+    )
+
+
+def _load_hash_index(refresh=False):
+    """
+    Return the hash index of the file_roots, a dict of path -> [size, mtime_ns,
+    hash]. The index is loaded again when update() wrote it, which is checked
+    at most once a second unless refresh is set.
+    """
+    now = time.time()
+    if refresh or now - _HASH_INDEX["checked"] >= 1:
+        _HASH_INDEX["checked"] = now
+        index_path = _hash_index_path()
+        try:
+            mtime_ns = os.stat(index_path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if mtime_ns != _HASH_INDEX["mtime_ns"]:
+            index = {}
+            if mtime_ns is not None:
+                try:
+                    with salt.utils.files.fopen(index_path, "rb") as fp_:
+                        index = salt.payload.Serial(__opts__).load(fp_)
+                except Exception:  # pylint: disable=broad-except
+                    log.debug("roots: Unable to read the hash index %s", index_path)
+            _HASH_INDEX.update(mtime_ns=mtime_ns, index=index)
+    return _HASH_INDEX["index"]
+
+
+def _update_hash_index(paths):
+    """
+    Hash the files whose size or mtime changed since the hash index was
+    written, and write the index again if anything changed
+    """
+    old_index = _load_hash_index(refresh=True)
+    index = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entry = old_index.get(path)
+        if entry is None or list(entry[:2]) != [stat.st_size, stat.st_mtime_ns]:
+            try:
+                hsum = salt.utils.hashutils.get_hash(path, __opts__["hash_type"])
+            except OSError:
+                continue
+            entry = [stat.st_size, stat.st_mtime_ns, hsum]
+        index[path] = entry
+    if index == old_index:
+        return
+    index_path = _hash_index_path()
+    index_dir = os.path.dirname(index_path)
+    if not os.path.isdir(index_dir):
+        os.makedirs(index_dir)
+    with salt.utils.atomicfile.atomic_open(index_path, "wb") as fp_:
+        fp_.write(salt.payload.Serial(__opts__).dumps(index))
+    _HASH_INDEX.update(mtime_ns=os.stat(index_path).st_mtime_ns, index=index)
+
+
+def _translate_sep(path):
+    """
+    Translate path separators for Windows masterless minions
+    """
+    return path.replace("\\", "/") if os.path.sep == "\\" else path
+
+
+def _add_to(opts, ret, tgt, fs_root, parent_dir, items):
+    """
+    Add the items of a directory to the target set of the file lists
+    """
+    for item in items:
+        abs_path = os.path.join(parent_dir, item)
+        log.trace("roots: Processing %s", abs_path)
+        is_link = salt.utils.path.islink(abs_path)
+        log.trace("roots: %s is %sa link", abs_path, "not " if not is_link else "")
+        if is_link and opts["fileserver_ignoresymlinks"]:
+            continue
+        rel_path = _translate_sep(os.path.relpath(abs_path, fs_root))
+        log.trace("roots: %s relative path is %s", abs_path, rel_path)
+        if salt.fileserver.is_file_ignored(opts, rel_path):
+            continue
+        tgt.add(rel_path)
+        try:
+            if not os.listdir(abs_path):
+                ret["empty_dirs"].add(rel_path)
+        except Exception:  # pylint: disable=broad-except
+            # Generic exception because running os.listdir() on a
+            # non-directory path raises an OSError on *NIX and a
+            # WindowsError on Windows.
+            pass
+        if is_link:
+            link_dest = salt.utils.path.readlink(abs_path)
+            log.trace("roots: %s symlink destination is %s", abs_path, link_dest)
+            if salt.utils.platform.is_windows() and link_dest.startswith("\\\\"):
+                # Symlink points to a network path. Since you can't
+                # join UNC and non-UNC paths, just assume the original
+                # path.
+                log.trace(
+                    "roots: %s is a UNC path, using %s instead", link_dest, abs_path
+                )
+                link_dest = abs_path
+            if link_dest.startswith(".."):
+                joined = os.path.join(abs_path, link_dest)
+            else:
+                joined = os.path.join(os.path.dirname(abs_path), link_dest)
+            rel_dest = _translate_sep(
+                os.path.relpath(
+                    os.path.realpath(os.path.normpath(joined)),
+                    os.path.realpath(fs_root),
+                )
+            )
+            log.trace("roots: %s relative path is %s", abs_path, rel_dest)
+            if not rel_dest.startswith(".."):
+                # Only count the link if it does not point
+                # outside of the root dir of the fileserver
+                # (i.e. the "path" variable)
+                ret["links"][rel_path] = link_dest
+
+
 def _file_lists(load, form):
     """
     Return a dict containing the file lists for files, dirs, emtydirs and symlinks
@@ -336,79 +507,12 @@ def _file_lists(load, form):
     if refresh_cache:
         ret = {"files": set(), "dirs": set(), "empty_dirs": set(), "links": {}}
 
-        def _add_to(tgt, fs_root, parent_dir, items):
-            """
-            Add the files to the target set
-            """
-
-            def _translate_sep(path):
-                """
-                Translate path separators for Windows masterless minions
-                """
-                return path.replace("\\", "/") if os.path.sep == "\\" else path
-
-            for item in items:
-                abs_path = os.path.join(parent_dir, item)
-                log.trace("roots: Processing %s", abs_path)
-                is_link = salt.utils.path.islink(abs_path)
-                log.trace(
-                    "roots: %s is %sa link", abs_path, "not " if not is_link else ""
-                )
-                if is_link and __opts__["fileserver_ignoresymlinks"]:
-                    continue
-                rel_path = _translate_sep(os.path.relpath(abs_path, fs_root))
-                log.trace("roots: %s relative path is %s", abs_path, rel_path)
-                if salt.fileserver.is_file_ignored(__opts__, rel_path):
-                    continue
-                tgt.add(rel_path)
-                try:
-                    if not os.listdir(abs_path):
-                        ret["empty_dirs"].add(rel_path)
-                except Exception:  # pylint: disable=broad-except
-                    # Generic exception because running os.listdir() on a
-                    # non-directory path raises an OSError on *NIX and a
-                    # WindowsError on Windows.
-                    pass
-                if is_link:
-                    link_dest = salt.utils.path.readlink(abs_path)
-                    log.trace(
-                        "roots: %s symlink destination is %s", abs_path, link_dest
-                    )
-                    if salt.utils.platform.is_windows() and link_dest.startswith(
-                        "\\\\"
-                    ):
-                        # Symlink points to a network path. Since you can't
-                        # join UNC and non-UNC paths, just assume the original
-                        # path.
-                        log.trace(
-                            "roots: %s is a UNC path, using %s instead",
-                            link_dest,
-                            abs_path,
-                        )
-                        link_dest = abs_path
-                    if link_dest.startswith(".."):
-                        joined = os.path.join(abs_path, link_dest)
-                    else:
-                        joined = os.path.join(os.path.dirname(abs_path), link_dest)
-                    rel_dest = _translate_sep(
-                        os.path.relpath(
-                            os.path.realpath(os.path.normpath(joined)),
-                            os.path.realpath(fs_root),
-                        )
-                    )
-                    log.trace("roots: %s relative path is %s", abs_path, rel_dest)
-                    if not rel_dest.startswith(".."):
-                        # Only count the link if it does not point
-                        # outside of the root dir of the fileserver
-                        # (i.e. the "path" variable)
-                        ret["links"][rel_path] = link_dest
-
         for path in __opts__["file_roots"][saltenv]:
             for root, dirs, files in salt.utils.path.os_walk(
                 path, followlinks=__opts__["fileserver_followsymlinks"]
             ):
-                _add_to(ret["dirs"], path, root, dirs)
-                _add_to(ret["files"], path, root, files)
+                _add_to(__opts__, ret, ret["dirs"], path, root, dirs)
+                _add_to(__opts__, ret, ret["files"], path, root, files)
 
         ret["files"] = sorted(ret["files"])
         ret["dirs"] = sorted(ret["dirs"])
@@ -425,6 +529,313 @@ def _file_lists(load, form):
     return []
 
 
+class _RootsWatcher(threading.Thread):
+    """
+    Keep the file lists and the mtime map of the file_roots up to date from the
+    inotify events of their directories, and write the file lists to the cache
+    the MWorkers read them from
+    """
+
+    def __init__(self, opts):
+        super().__init__(name="roots_watch")
+        self.daemon = True
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.lock = threading.Lock()
+        # root -> file lists of the root, and root -> {path: mtime}
+        self.lists = {}
+        self.mtimes = {}
+        # watch descriptor -> set of (root, watched directory)
+        self.watches = {}
+        self.dirty = set()
+        self.dirty_since = 0
+        self.written = 0
+        # Set when a directory could not be watched, the file lists can not
+        # be trusted anymore and the file_roots have to be walked again
+        self.failed = False
+        self.manager = pyinotify.WatchManager()
+        self.notifier = pyinotify.Notifier(
+            self.manager, default_proc_fun=self._process, timeout=1000
+        )
+        self.mask = (
+            pyinotify.IN_ATTRIB
+            | pyinotify.IN_CLOSE_WRITE
+            | pyinotify.IN_CREATE
+            | pyinotify.IN_DELETE
+            | pyinotify.IN_DELETE_SELF
+            | pyinotify.IN_MODIFY
+            | pyinotify.IN_MOVED_FROM
+            | pyinotify.IN_MOVED_TO
+        )
+        self.rescan()
+
+    def roots(self):
+        """
+        Return the directories of all the file_roots
+        """
+        roots = []
+        for paths in self.opts["file_roots"].values():
+            roots.extend(path for path in paths if path not in roots)
+        return roots
+
+    def rescan(self, roots=None):
+        """
+        Walk the passed roots, or all of them, again
+        """
+        for root in self.roots() if roots is None else roots:
+            self.lists[root] = {
+                "files": set(),
+                "dirs": set(),
+                "empty_dirs": set(),
+                "links": {},
+            }
+            self.mtimes[root] = {}
+            if os.path.isdir(root):
+                self._scan(root, root)
+            self._set_dirty(root)
+
+    def check_roots(self):
+        """
+        Walk the roots which did not exist when they were last walked
+        """
+        with self.lock:
+            watched = {root for dirs in self.watches.values() for root, _ in dirs}
+            self.rescan(
+                [
+                    root
+                    for root in self.roots()
+                    if root not in watched and os.path.isdir(root)
+                ]
+            )
+
+    def mtime_map(self):
+        """
+        Return the mtime map of the files of the file_roots
+        """
+        with self.lock:
+            ret = {}
+            for mtimes in self.mtimes.values():
+                ret.update(mtimes)
+            return ret
+
+    def file_lists(self, saltenv):
+        """
+        Return the file lists of a saltenv
+        """
+        ret = {"files": set(), "dirs": set(), "empty_dirs": set(), "links": {}}
+        for root in self.opts["file_roots"][saltenv]:
+            lists = self.lists.get(root)
+            if lists is None:
+                continue
+            for form in ("files", "dirs", "empty_dirs"):
+                ret[form].update(lists[form])
+            ret["links"].update(lists["links"])
+        for form in ("files", "dirs", "empty_dirs"):
+            ret[form] = sorted(ret[form])
+        return ret
+
+    def _set_dirty(self, root):
+        if not self.dirty:
+            self.dirty_since = time.time()
+        self.dirty.add(root)
+
+    def _watch(self, root, path):
+        wdd = self.manager.add_watch(path, self.mask, quiet=True)
+        wd = wdd.get(path, -1)
+        if wd < 0:
+            if not self.failed:
+                log.error(
+                    "roots: Unable to watch %s, fs.inotify.max_user_watches may "
+                    "be too low. The file_roots will be walked to update the "
+                    "file lists",
+                    path,
+                )
+            self.failed = True
+            return
+        self.watches.setdefault(wd, set()).add((root, path))
+
+    def stop(self):
+        """
+        Stop watching the file_roots, the file list cache then expires and the
+        file_roots are walked again
+        """
+        global _WATCHER
+        if _WATCHER is self:
+            _WATCHER = None
+        self.notifier.stop()
+
+    def _set_mtime(self, root, path):
+        try:
+            self.mtimes[root][path] = os.path.getmtime(path)
+        except OSError:
+            # skip dangling symlinks
+            pass
+
+    def _scan(self, root, top):
+        """
+        Add the items under a directory of a root to its file lists, and
+        watch the directories
+        """
+        lists = self.lists[root]
+        for parent, dirs, files in salt.utils.path.os_walk(
+            top, followlinks=self.opts["fileserver_followsymlinks"]
+        ):
+            self._watch(root, parent)
+            _add_to(self.opts, lists, lists["dirs"], root, parent, dirs)
+            _add_to(self.opts, lists, lists["files"], root, parent, files)
+            for item in files:
+                path = os.path.join(parent, item)
+                if _translate_sep(os.path.relpath(path, root)) in lists["files"]:
+                    self._set_mtime(root, path)
+
+    def _refresh(self, root, path):
+        """
+        Update the file lists of a root for a path which changed
+        """
+        lists = self.lists[root]
+        rel_path = _translate_sep(os.path.relpath(path, root))
+        if rel_path in lists["dirs"]:
+            # Drop the whole tree under the directory
+            prefix = rel_path + "/"
+            for form in ("files", "dirs", "empty_dirs"):
+                lists[form] = {
+                    item
+                    for item in lists[form]
+                    if item != rel_path and not item.startswith(prefix)
+                }
+            lists["links"] = {
+                item: dest
+                for item, dest in lists["links"].items()
+                if item != rel_path and not item.startswith(prefix)
+            }
+            path_prefix = os.path.join(path, "")
+            self.mtimes[root] = {
+                item: mtime
+                for item, mtime in self.mtimes[root].items()
+                if not item.startswith(path_prefix)
+            }
+        else:
+            for form in ("files", "dirs", "empty_dirs"):
+                lists[form].discard(rel_path)
+            lists["links"].pop(rel_path, None)
+            self.mtimes[root].pop(path, None)
+
+        if os.path.lexists(path):
+            parent, item = os.path.split(path)
+            if os.path.isdir(path):
+                _add_to(self.opts, lists, lists["dirs"], root, parent, [item])
+                if rel_path in lists["dirs"] and (
+                    self.opts["fileserver_followsymlinks"]
+                    or not salt.utils.path.islink(path)
+                ):
+                    self._scan(root, path)
+            else:
+                _add_to(self.opts, lists, lists["files"], root, parent, [item])
+                if rel_path in lists["files"]:
+                    self._set_mtime(root, path)
+
+        # The parent directory may have become empty, or not be empty anymore
+        parent_rel = os.path.dirname(rel_path)
+        if parent_rel in lists["dirs"]:
+            try:
+                if os.listdir(os.path.dirname(path)):
+                    lists["empty_dirs"].discard(parent_rel)
+                else:
+                    lists["empty_dirs"].add(parent_rel)
+            except OSError:
+                pass
+        self._set_dirty(root)
+
+    def _process(self, event):
+        """
+        Handle an inotify event
+        """
+        if event.mask & pyinotify.IN_Q_OVERFLOW:
+            log.warning("roots: Events were lost, walking the file_roots again")
+            self.rescan()
+            return
+        if event.mask & pyinotify.IN_IGNORED:
+            # The directory is gone, its parent got the event for it
+            for root, path in self.watches.pop(event.wd, ()):
+                if path == root:
+                    self.rescan([root])
+            return
+        if not event.name:
+            return
+        for root, parent in list(self.watches.get(event.wd, ())):
+            self._refresh(root, os.path.join(parent, event.name))
+
+    def write_file_lists(self, saltenvs):
+        """
+        Write the file lists of saltenvs to the file list cache
+        """
+        list_cachedir = os.path.join(self.opts["cachedir"], "file_lists", "roots")
+        if not os.path.isdir(list_cachedir):
+            os.makedirs(list_cachedir)
+        for saltenv in saltenvs:
+            list_cache = os.path.join(
+                list_cachedir,
+                "{}.p".format(salt.utils.files.safe_filename_leaf(saltenv)),
+            )
+            with salt.utils.atomicfile.atomic_open(list_cache, "wb") as fp_:
+                fp_.write(self.serial.dumps(self.file_lists(saltenv)))
+        self.written = time.time()
+
+    def run(self):
+        # The file lists are rewritten when they change, and often enough
+        # that the file list cache never expires, so the MWorkers never walk
+        # the file_roots themselves
+        refresh = self.opts.get("fileserver_list_cache_time", 20) / 2.0
+        while True:
+            try:
+                quiet = not self.notifier.check_events()
+                with self.lock:
+                    if not quiet:
+                        self.notifier.read_events()
+                        self.notifier.process_events()
+                    if self.failed:
+                        self.stop()
+                        return
+                    now = time.time()
+                    if self.dirty and (quiet or now - self.dirty_since > 5):
+                        saltenvs = [
+                            saltenv
+                            for saltenv, paths in self.opts["file_roots"].items()
+                            if self.dirty.intersection(paths)
+                        ]
+                        self.dirty = set()
+                        self.write_file_lists(saltenvs)
+                    elif now - self.written > refresh:
+                        self.write_file_lists(self.opts["file_roots"])
+            except Exception:  # pylint: disable=broad-except
+                log.exception("roots: Unable to update the file lists")
+                time.sleep(1)
+
+
+def watch():
+    """
+    Start watching the file_roots for changes when roots_watch is set, to keep
+    the file lists and the mtime map up to date without walking the file_roots
+    """
+    global _WATCHER
+    if not __opts__.get("roots_watch", False):
+        return False
+    if not HAS_PYINOTIFY or salt.utils.platform.is_windows():
+        log.warning(
+            "roots_watch requires the pyinotify Python module, the file_roots "
+            "will be walked to update the file lists"
+        )
+        return False
+    if _WATCHER is None:
+        watcher = _RootsWatcher(__opts__)
+        if watcher.failed:
+            watcher.notifier.stop()
+            return False
+        _WATCHER = watcher
+        _WATCHER.start()
+    return True
+
+
 def file_list(load):
     """
     Return a list of all files on the file server in a specified
@@ -24,6 +24,7 @@ import salt.utils.files
 import salt.utils.json
 import salt.utils.kinds
 import salt.utils.master
+import salt.utils.minions
 import salt.utils.sdb
 import salt.utils.stringutils
 import salt.utils.user
@@ -466,9 +467,16 @@ class Key:
             cache = salt.cache.factory(self.opts)
             clist = cache.list(self.ACC)
             if clist:
+                index = None
+                if self.opts.get("minion_data_index", False):
+                    index = salt.utils.minions.MinionDataIndexClient(self.opts)
                 for minion in clist:
                     if minion not in minions and minion not in preserve_minions:
                         cache.flush("{}/{}".format(self.ACC, minion))
+                        if index is not None:
+                            index.remove(minion)
+                if index is not None:
+                    index.destroy()
 
     def check_master(self):
         """
@@ -7,9 +7,11 @@ plugin interfaces used by Salt.
 import contextvars
 import copy
 import functools
+import hashlib
 import importlib.machinery  # pylint: disable=no-name-in-module,import-error
 import importlib.util  # pylint: disable=no-name-in-module,import-error
 import inspect
+import json
 import logging
 import os
 import re
@@ -28,16 +30,19 @@ import salt.defaults.exitcodes
 import salt.loader_context
 import salt.syspaths
 import salt.utils.args
+import salt.utils.atomicfile
 import salt.utils.context
 import salt.utils.data
 import salt.utils.dictupdate
 import salt.utils.event
 import salt.utils.files
 import salt.utils.lazy
+import salt.utils.msgpack
 import salt.utils.odict
 import salt.utils.platform
 import salt.utils.stringutils
 import salt.utils.versions
+import salt.version
 from salt.exceptions import LoaderError
 from salt.ext import six
 from salt.ext.six.moves import reload_module
@@ -92,6 +97,209 @@ LIBCLOUD_FUNCS_NOT_SUPPORTED = (
 pyximport = None
 
 
+def _dir_mtime(path):
+    """
+    Return the mtime of a directory in nanoseconds, or None if it does not
+    exist
+    """
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class LoaderIndex:
+    """
+    Base class of the indexes kept by the loaders in memory and under the
+    cachedir
+    """
+
+    filename = None
+
+    def __init__(self):
+        self.indexes = {}
+
+    def _path(self, opts):
+        if not opts.get("cachedir"):
+            return None
+        return os.path.join(opts["cachedir"], "loader", self.filename)
+
+    def _index(self, path):
+        """
+        Return the index stored at path, reading it on first use
+        """
+        if path not in self.indexes:
+            index = {}
+            if path is not None:
+                try:
+                    with salt.utils.files.fopen(path, "rb") as fp_:
+                        index = salt.utils.msgpack.unpackb(fp_.read(), raw=False)
+                except OSError:
+                    pass
+                except Exception as exc:  # pylint: disable=broad-except
+                    log.debug("Unable to read the loader index %s: %s", path, exc)
+                if not isinstance(index, dict):
+                    index = {}
+            self.indexes[path] = index
+        return self.indexes[path]
+
+    def _write(self, path):
+        if path is None:
+            return
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with salt.utils.atomicfile.atomic_open(path, "wb") as fp_:
+                fp_.write(
+                    salt.utils.msgpack.packb(self.indexes[path], use_bin_type=True)
+                )
+        except OSError as exc:
+            log.debug("Unable to write the loader index %s: %s", path, exc)
+
+
+class FileMappingIndex(LoaderIndex):
+    """
+    Index of the file mappings built by the loaders, so that building a
+    loader does not list the module directories again while they are
+    unchanged. A file mapping is used as long as the mtimes of the
+    directories it was built from are the same.
+    """
+
+    filename = "file_mapping.p"
+    max_entries = 64
+    # The mtime of a directory modified less than this many seconds before it
+    # is listed could be the same after another change, depending on the
+    # resolution of the filesystem, the file mappings built from such
+    # directories are not indexed.
+    racy_window = 2
+
+    def get(self, opts, key):
+        """
+        Return the file mapping indexed under key, or None if it is missing
+        or outdated
+        """
+        entry = self._index(self._path(opts)).get(key)
+        if entry is None:
+            return None
+        for path, mtime in entry["dirs"].items():
+            if _dir_mtime(path) != mtime:
+                return None
+        return salt.utils.odict.OrderedDict(
+            (value[0], tuple(value[1:])) for value in entry["mapping"]
+        )
+
+    def store(self, opts, key, dirs, mapping, scan_time):
+        """
+        Index the file mapping built from the directories with the given
+        mtimes, listed at scan_time
+        """
+        racy = (scan_time - self.racy_window) * 1e9
+        if any(mtime is not None and mtime >= racy for mtime in dirs.values()):
+            return
+        path = self._path(opts)
+        index = self._index(path)
+        index.pop(key, None)
+        while len(index) >= self.max_entries:
+            index.pop(next(iter(index)))
+        index[key] = {
+            "dirs": dirs,
+            "mapping": [[name] + list(value) for name, value in mapping.items()],
+        }
+        self._write(path)
+
+
+class VirtualIndex(LoaderIndex):
+    """
+    Index of the outcome of the ``__virtual__`` functions of the modules, so
+    that the modules which are not available are not imported again while
+    the module file and the environment they were loaded in are unchanged.
+    The entries are keyed per loader tag and module path, and hold the key
+    they are valid for, whether the module is available, its virtual name
+    and the reason it is not available.
+    """
+
+    filename = "virtual.p"
+
+    def __init__(self):
+        super().__init__()
+        self.dirty = set()
+
+    def get(self, opts, tag, fpath, key):
+        """
+        Return the availability, the virtual name and the error of a module,
+        or None if they are not indexed for the key
+        """
+        entry = self._index(self._path(opts)).get(tag, {}).get(fpath)
+        if entry is None or entry[0] != key:
+            return None
+        return entry[1:]
+
+    def names(self, opts, tag):
+        """
+        Return the virtual names of the available modules by path, as they
+        were last seen
+        """
+        return {
+            fpath: entry[2]
+            for fpath, entry in self._index(self._path(opts)).get(tag, {}).items()
+            if entry[1]
+        }
+
+    def store(self, opts, tag, fpath, key, available, name, error):
+        """
+        Index the outcome of the ``__virtual__`` function of a module
+        """
+        path = self._path(opts)
+        if error is not None:
+            error = str(error)
+        self._index(path).setdefault(tag, {})[fpath] = [key, available, name, error]
+        self.dirty.add(path)
+
+    def flush(self, opts):
+        """
+        Write the index to the cachedir if it changed
+        """
+        path = self._path(opts)
+        if path in self.dirty:
+            self.dirty.discard(path)
+            self._write(path)
+
+
+FILE_MAPPING_INDEX = FileMappingIndex()
+VIRTUAL_INDEX = VirtualIndex()
+
+
+def _virtual_fingerprint(opts, tag):
+    """
+    Return the fingerprint of what the ``__virtual__`` functions of the
+    modules of a loader depend on besides the modules: the grains, the config
+    files and the mtimes of the directories of the executables and of the
+    python libraries, which change when software is installed.
+    """
+    grains = opts.get("grains", {})
+    if isinstance(grains, salt.loader_context.NamedLoaderContext):
+        grains = grains.value()
+    dirs = os.environ.get("PATH", "").split(os.pathsep) + sys.path
+    if opts.get("conf_file"):
+        dirs.extend((opts["conf_file"], opts["conf_file"] + ".d"))
+    try:
+        data = json.dumps(
+            [
+                salt.version.__version__,
+                sys.version,
+                tag,
+                grains,
+                [(path, _dir_mtime(path)) for path in dirs if path],
+            ],
+            sort_keys=True,
+            default=repr,
+        )
+    except (TypeError, ValueError) as exc:
+        log.debug("Unable to fingerprint the grains: %s", exc)
+        return None
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
 def static_loader(
     opts,
     ext_type,
@@ -1430,6 +1638,48 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         # The files are added in order of priority, so order *must* be retained.
         self.file_mapping = salt.utils.odict.OrderedDict()
 
+        self._virtual_fingerprint = self._virtual_names = None
+
+        index_key = mapping = None
+        if self.opts.get("loader_file_mapping_cache", True):
+            index_key = self._file_mapping_index_key()
+            mapping = FILE_MAPPING_INDEX.get(self.opts, index_key)
+        if mapping is not None:
+            self.file_mapping.update(mapping)
+        else:
+            scan_time = time.time()
+            scanned_dirs = self._walk_module_dirs()
+            if index_key is not None:
+                FILE_MAPPING_INDEX.store(
+                    self.opts, index_key, scanned_dirs, self.file_mapping, scan_time
+                )
+        for smod in self.static_modules:
+            f_noext = smod.split(".")[-1]
+            self.file_mapping[f_noext] = (smod, ".o", 0)
+
+    def _file_mapping_index_key(self):
+        """
+        Return the key of the file mapping of this loader in the file mapping
+        index, made of everything the mapping depends on besides the content
+        of the module directories
+        """
+        key = [
+            salt.version.__version__,
+            list(sys.version_info[:2]),
+            list(self.module_dirs),
+            list(self.suffix_order),
+            sorted(self.suffix_map),
+            sorted(self.disabled),
+            list(self.opts.get("optimization_order") or []),
+        ]
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def _walk_module_dirs(self):
+        """
+        Fill the file mapping from the files of the module directories, and
+        return the mtimes of the directories listed to build it
+        """
+        scanned_dirs = {}
         opt_match = []
 
         def _replace_pre_ext(obj):
@@ -1443,6 +1693,11 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             return ""
 
         for mod_dir in self.module_dirs:
+            # Get the mtimes before listing, a change made in between is then
+            # caught when validating the file mapping index
+            scanned_dirs[mod_dir] = _dir_mtime(mod_dir)
+            pycache_dir = os.path.join(mod_dir, "__pycache__")
+            scanned_dirs[pycache_dir] = _dir_mtime(pycache_dir)
             try:
                 # Make sure we have a sorted listdir in order to have
                 # expectable override results
@@ -1452,7 +1707,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             try:
                 pycache_files = [
                     os.path.join("__pycache__", x)
-                    for x in sorted(os.listdir(os.path.join(mod_dir, "__pycache__")))
+                    for x in sorted(os.listdir(pycache_dir))
                 ]
             except OSError:
                 pass
@@ -1500,6 +1755,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     # if its a directory, lets allow us to load that
                     if ext == "":
                         # is there something __init__?
+                        scanned_dirs[fpath] = _dir_mtime(fpath)
                         subfiles = os.listdir(fpath)
                         for suffix in self.suffix_order:
                             if "" == suffix:
@@ -1547,9 +1803,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
 
                 except OSError:
                     continue
-        for smod in self.static_modules:
-            f_noext = smod.split(".")[-1]
-            self.file_mapping[f_noext] = (smod, ".o", 0)
+        return scanned_dirs
 
     def clear(self):
         """
@@ -1603,6 +1857,11 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         if mod_name in self.file_mapping:
             yield mod_name
 
+        # do we know the module by its virtual name?
+        if self.opts.get("loader_virtual_cache", False):
+            for k in self._get_virtual_names().get(mod_name, ()):
+                yield k
+
         # do we have a partial match?
         for k in self.file_mapping:
             if mod_name in k:
@@ -1613,6 +1872,37 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             if mod_name not in k:
                 yield k
 
+    def _get_virtual_names(self):
+        """
+        Return the files of the file mapping by the virtual name their
+        modules were last loaded as, according to the virtual index
+        """
+        if self._virtual_names is None:
+            names = VIRTUAL_INDEX.names(self.opts, self.tag)
+            self._virtual_names = {}
+            for name, (fpath, _, _) in self.file_mapping.items():
+                if fpath in names:
+                    self._virtual_names.setdefault(names[fpath], []).append(name)
+        return self._virtual_names
+
+    def _get_virtual_key(self, fpath):
+        """
+        Return the key of the outcome of the ``__virtual__`` function of the
+        module at fpath in the virtual index, or None if it cannot be indexed
+        """
+        if self._virtual_fingerprint is None:
+            self._virtual_fingerprint = _virtual_fingerprint(self.opts, self.tag)
+            if self._virtual_fingerprint is None:
+                return None
+        try:
+            with salt.utils.files.fopen(fpath, "rb") as fp_:
+                digest = hashlib.sha1(fp_.read())
+        except OSError:
+            # Packages are not indexed
+            return None
+        digest.update(self._virtual_fingerprint.encode())
+        return digest.hexdigest()
+
     def _reload_submodules(self, mod):
         submodules = (
             getattr(mod, sname)
@@ -1683,6 +1973,28 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             pass
 
         self.loaded_files.add(name)
+
+        virtual_key = None
+        if (
+            self.virtual_enable
+            and suffix not in ("", ".o")
+            and self.opts.get("loader_virtual_cache", False)
+        ):
+            virtual_key = self._get_virtual_key(fpath)
+            virtual = VIRTUAL_INDEX.get(self.opts, self.tag, fpath, virtual_key)
+            if virtual is not None and not virtual[0]:
+                # The module was not available in the same environment, don't
+                # import it again
+                log.trace(
+                    "Skipping %s.%s, it is not available: %s",
+                    self.tag,
+                    name,
+                    virtual[2],
+                )
+                self.missing_modules[virtual[1]] = virtual[2]
+                self.missing_modules[name] = virtual[2]
+                return False
+
         fpath_dirname = os.path.dirname(fpath)
         try:
             self.__populate_sys_path()
@@ -1914,7 +2226,21 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     # If a module has information about why it could not be loaded, record it
                     self.missing_modules[module_name] = virtual_err
                     self.missing_modules[name] = virtual_err
+                    if virtual_key is not None:
+                        VIRTUAL_INDEX.store(
+                            self.opts,
+                            self.tag,
+                            fpath,
+                            virtual_key,
+                            False,
+                            module_name,
+                            virtual_err,
+                        )
                     return False
+            if virtual_key is not None:
+                VIRTUAL_INDEX.store(
+                    self.opts, self.tag, fpath, virtual_key, True, module_name, None
+                )
         else:
             virtual_aliases = ()
 
@@ -2044,6 +2370,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                         self._refresh_file_mapping()
                         reloaded = True
                     continue
+            VIRTUAL_INDEX.flush(self.opts)
 
         return ret
 
@@ -2058,6 +2385,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 self._load_module(name)
 
             self.loaded = True
+            VIRTUAL_INDEX.flush(self.opts)
 
     def reload_modules(self):
         with self._lock:
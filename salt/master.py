@@ -7,6 +7,7 @@ import collections
 import copy
 import ctypes
 import functools
+import gc
 import logging
 import multiprocessing
 import os
@@ -28,6 +29,7 @@ import salt.engines
 import salt.exceptions
 import salt.ext.tornado.gen
 import salt.key
+import salt.loader
 import salt.log.setup
 import salt.minion
 import salt.payload
@@ -78,6 +80,13 @@ except ImportError:
     # resource is not available on windows
     HAS_RESOURCE = False
 
+try:
+    import salt.utils.psutil_compat as psutil
+
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
 log = logging.getLogger(__name__)
 
 
@@ -504,6 +513,15 @@ class FileserverUpdate(salt.utils.process.SignalHandlingProcess):
         # Clean out the fileserver backend cache
         salt.daemons.masterapi.clean_fsbackend(self.opts)
 
+        # Start watching the backends which can follow their changes
+        for backend in self.fileserver.backends():
+            fstr = "{}.watch".format(backend)
+            if fstr in self.fileserver.servers:
+                try:
+                    self.fileserver.servers[fstr]()
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("Unable to watch the %s fileserver backend", backend)
+
         for interval in self.buckets:
             self.update_threads[interval] = threading.Thread(
                 target=self.update_fileserver, args=(interval, self.buckets[interval]),
@@ -698,6 +716,17 @@ class Master(SMaster):
                 ),
                 "reload": salt.crypt.Crypticle.generate_key_string,
             }
+            if self.opts["fileserver_sendfile"]:
+                # Signs the sendfile tokens, never sent to the minions
+                SMaster.secrets["sendfile"] = {
+                    "secret": multiprocessing.Array(
+                        ctypes.c_char,
+                        salt.utils.stringutils.to_bytes(
+                            salt.crypt.Crypticle.generate_key_string()
+                        ),
+                    ),
+                    "reload": salt.crypt.Crypticle.generate_key_string,
+                }
             log.info("Creating master process manager")
             # Since there are children having their own ProcessManager we should wait for kill more time.
             self.process_manager = salt.utils.process.ProcessManager(wait_for_kill=5)
@@ -780,6 +809,28 @@ class Master(SMaster):
 
             self.process_manager.add_process(FileserverUpdate, args=(self.opts,))
 
+            if self.opts["fileserver_sendfile"]:
+                log.info("Creating master fileserver sendfile process")
+                self.process_manager.add_process(
+                    salt.utils.master.FileserverSendfile,
+                    args=(self.opts, SMaster.secrets),
+                )
+
+            if self.opts["minion_data_index"] and self.opts["minion_data_cache"]:
+                log.info("Creating master minion data index process")
+                self.process_manager.add_process(
+                    salt.utils.master.MinionDataIndexServer, args=(self.opts,)
+                )
+
+            if (
+                self.opts["pillar_cache"]
+                and self.opts["pillar_cache_backend"] == "shared"
+            ):
+                log.info("Creating master shared pillar cache process")
+                self.process_manager.add_process(
+                    salt.utils.master.SharedPillarCache, args=(self.opts,)
+                )
+
             # Fire up SSDP discovery publisher
             if self.opts["discovery"]:
                 if salt.utils.ssdp.SSDPDiscoveryServer.is_available():
@@ -919,6 +970,9 @@ class ReqServer(salt.utils.process.SignalHandlingProcess):
             )
             os.nice(self.opts["req_server_niceness"])
 
+        if self.opts["mworker_preload"] and not salt.utils.platform.is_windows():
+            kwargs["preloaded"] = self._preload()
+
         # Reset signals to default ones before adding processes to the process
         # manager. We don't want the processes being started to inherit those
         # signal handlers
@@ -933,6 +987,40 @@ class ReqServer(salt.utils.process.SignalHandlingProcess):
                 )
         self.process_manager.run()
 
+    def _preload(self):
+        """
+        Build the master minion and the fileserver before the MWorkers are
+        forked, so that they share the loaded modules copy-on-write
+        instead of importing them again each.
+
+        :rtype: dict
+        :returns: The master minion and the fileserver to be used by the
+                  MWorkers
+        """
+        # Avoid circular import
+        import salt.fileserver
+
+        start = time.time()
+        mminion = salt.minion.MasterMinion(
+            self.opts, states=False, rend=False, ignore_config_errors=True
+        )
+        fileserver = salt.fileserver.Fileserver(self.opts)
+        for loader in (
+            mminion.functions,
+            mminion.returners,
+            mminion.utils,
+            fileserver.servers,
+        ):
+            loader._load_all()
+        # Move the objects built so far out of the reach of the garbage
+        # collector, its passes would otherwise write to their pages and
+        # unshare them from the MWorkers
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+        log.info("Preloaded the MWorker state in %.2fs", time.time() - start)
+        return {"mminion": mminion, "fileserver": fileserver}
+
     def run(self):
         """
         Start up the ReqServer
@@ -958,13 +1046,15 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
     salt master.
     """
 
-    def __init__(self, opts, mkey, key, req_channels, name, **kwargs):
+    def __init__(self, opts, mkey, key, req_channels, name, preloaded=None, **kwargs):
         """
         Create a salt master worker process
 
         :param dict opts: The salt options
         :param dict mkey: The user running the salt master and the AES key
         :param dict key: The user running the salt master and the RSA key
+        :param dict preloaded: The master minion and the fileserver built by
+                               the ReqServer before forking
 
         :rtype: MWorker
         :return: Master worker
@@ -974,6 +1064,7 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         super().__init__(**kwargs)
         self.opts = opts
         self.req_channels = req_channels
+        self.preloaded = preloaded or {}
 
         self.mkey = mkey
         self.key = key
@@ -992,6 +1083,7 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
         )
         self.opts = state["opts"]
         self.req_channels = state["req_channels"]
+        self.preloaded = {}
         self.mkey = state["mkey"]
         self.key = state["key"]
         self.k_mtime = state["k_mtime"]
@@ -1076,12 +1168,36 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
                     "time": end - self.stat_clock,
                     "worker": self.name,
                     "stats": self.stats,
+                    "memory": self._memory_stats(),
                 },
                 tagify(self.name, "stats"),
             )
             self.stats = collections.defaultdict(lambda: {"mean": 0, "runs": 0})
             self.stat_clock = end
 
+    def _memory_stats(self):
+        """
+        Return the resident and the shared memory of the worker in bytes, the
+        unique and proportional set sizes are included where they are
+        available
+        """
+        if not HAS_PSUTIL:
+            return {}
+        try:
+            proc = psutil.Process(os.getpid())
+            try:
+                info = proc.memory_full_info()
+            except (AttributeError, psutil.AccessDenied):
+                info = proc.memory_info()
+        except psutil.Error as exc:
+            log.debug("Unable to get the memory usage of %s: %s", self.name, exc)
+            return {}
+        return {
+            field: getattr(info, field)
+            for field in ("rss", "shared", "uss", "pss")
+            if hasattr(info, field)
+        }
+
     def _handle_clear(self, load):
         """
         Process a cleartext command
@@ -1168,7 +1284,11 @@ class MWorker(salt.utils.process.SignalHandlingProcess):
                 os.nice(self.opts["mworker_niceness"])
 
         self.clear_funcs = ClearFuncs(self.opts, self.key,)
-        self.aes_funcs = AESFuncs(self.opts)
+        self.aes_funcs = AESFuncs(
+            self.opts,
+            mminion=self.preloaded.get("mminion"),
+            fileserver=self.preloaded.get("fileserver"),
+        )
         salt.utils.crypt.reinit_crypto()
         self.__bind()
 
@@ -1225,6 +1345,7 @@ class AESFuncs(TransportMethods):
         "_file_find",
         "_file_hash",
         "_file_hash_and_stat",
+        "_file_sendfile",
         "_file_list",
         "_file_list_emptydirs",
         "_dir_list",
@@ -1232,11 +1353,13 @@ class AESFuncs(TransportMethods):
         "_file_envs",
     )
 
-    def __init__(self, opts):
+    def __init__(self, opts, mminion=None, fileserver=None):
         """
         Create a new AESFuncs
 
         :param dict opts: The salt options
+        :param MasterMinion mminion: An already built master minion
+        :param Fileserver fileserver: An already built fileserver
 
         :rtype: AESFuncs
         :returns: Instance for handling AES operations
@@ -1250,20 +1373,24 @@ class AESFuncs(TransportMethods):
         # Make a client
         self.local = salt.client.get_local_client(self.opts["conf_file"])
         # Create the master minion to access the external job cache
-        self.mminion = salt.minion.MasterMinion(
-            self.opts, states=False, rend=False, ignore_config_errors=True
-        )
-        self.__setup_fileserver()
+        if mminion is None:
+            mminion = salt.minion.MasterMinion(
+                self.opts, states=False, rend=False, ignore_config_errors=True
+            )
+        self.mminion = mminion
+        self.__setup_fileserver(fileserver)
         self.masterapi = salt.daemons.masterapi.RemoteFuncs(opts)
 
-    def __setup_fileserver(self):
+    def __setup_fileserver(self, fileserver=None):
         """
         Set the local file objects from the file server interface
         """
         # Avoid circular import
         import salt.fileserver
 
-        self.fs_ = salt.fileserver.Fileserver(self.opts)
+        if fileserver is None:
+            fileserver = salt.fileserver.Fileserver(self.opts)
+        self.fs_ = fileserver
         self._serve_file = self.fs_.serve_file
         self._file_find = self.fs_._find_file
         self._file_hash = self.fs_.file_hash
@@ -1274,6 +1401,30 @@ class AESFuncs(TransportMethods):
         self._symlink_list = self.fs_.symlink_list
         self._file_envs = self.fs_.file_envs
 
+    def _file_sendfile(self, load):
+        """
+        Return a token to fetch a file from the sendfile server of the master,
+        or an empty dict if the file is not served by it
+
+        :param dict load: The minion payload, with the path and saltenv
+
+        :rtype: dict
+        :return: The token and the port of the sendfile server
+        """
+        if not self.opts["fileserver_sendfile"]:
+            return {}
+        path = self.fs_.sendfile_path(load)
+        if not path:
+            return {}
+        return {
+            "token": salt.utils.master.sendfile_token(
+                SMaster.secrets["sendfile"]["secret"].value,
+                str(load["saltenv"]),
+                salt.utils.stringutils.to_unicode(load["path"]),
+            ),
+            "port": self.opts["fileserver_sendfile_port"],
+        }
+
     def __verify_minion(self, id_, token):
         """
         Take a minion id and a string signed with the minion private key
@@ -1632,15 +1783,14 @@ class AESFuncs(TransportMethods):
             pillar_override=load.get("pillar_override", {}),
             pillarenv=load.get("pillarenv"),
             extra_minion_data=load.get("extra_minion_data"),
+            clean_cache=load.get("clean_cache"),
         )
         data = pillar.compile_pillar()
         self.fs_.update_opts()
         if self.opts.get("minion_data_cache", False):
-            self.masterapi.cache.store(
-                "minions/{}".format(load["id"]),
-                "data",
-                {"grains": load["grains"], "pillar": data},
-            )
+            mdata = {"grains": load["grains"], "pillar": data}
+            self.masterapi.cache.store("minions/{}".format(load["id"]), "data", mdata)
+            self.ckminions.minion_data_updated(load["id"], mdata)
             if self.opts.get("minion_data_cache_events") is True:
                 self.event.fire_event(
                     {"Minion data cache refresh": load["id"]},
@@ -2459,12 +2459,15 @@ def event(
 
         salt-call --local state.event pretty=True
     """
+    # Only have the events that can match sent by the event publisher
+    prefix = salt.utils.event.tagmatch_prefix(tagmatch)
     with salt.utils.event.get_event(
         node,
         sock_dir or __opts__["sock_dir"],
         __opts__["transport"],
         opts=__opts__,
         listen=True,
+        tag_filters=[prefix] if prefix else None,
     ) as sevent:
 
         while True:
@@ -10,7 +10,9 @@ import inspect
 import logging
 import os
 import sys
+import time
 import traceback
+from multiprocessing.pool import ThreadPool
 
 import salt.ext.tornado.gen
 import salt.fileclient
@@ -22,6 +24,7 @@ import salt.utils.cache
 import salt.utils.crypt
 import salt.utils.data
 import salt.utils.dictupdate
+import salt.utils.event
 import salt.utils.url
 from salt.exceptions import SaltClientError
 from salt.ext import six
@@ -47,6 +50,7 @@ def get_pillar(
     pillar_override=None,
     pillarenv=None,
     extra_minion_data=None,
+    clean_cache=False,
 ):
     """
     Return the correct pillar driver based on the file_client option
@@ -81,7 +85,12 @@ def get_pillar(
             functions=funcs,
             pillar_override=pillar_override,
             pillarenv=pillarenv,
+            clean_cache=clean_cache,
         )
+    kwargs = {}
+    if ptype is RemotePillar:
+        # Ask the master to drop its cached pillar
+        kwargs["clean_cache"] = clean_cache
     return ptype(
         opts,
         grains,
@@ -92,6 +101,7 @@ def get_pillar(
         pillar_override=pillar_override,
         pillarenv=pillarenv,
         extra_minion_data=extra_minion_data,
+        **kwargs
     )
 
 
@@ -106,6 +116,7 @@ def get_async_pillar(
     pillar_override=None,
     pillarenv=None,
     extra_minion_data=None,
+    clean_cache=False,
 ):
     """
     Return the correct pillar driver based on the file_client option
@@ -118,6 +129,10 @@ def get_async_pillar(
     ptype = {"remote": AsyncRemotePillar, "local": AsyncPillar}.get(
         file_client, AsyncPillar
     )
+    kwargs = {}
+    if ptype is AsyncRemotePillar:
+        # Ask the master to drop its cached pillar
+        kwargs["clean_cache"] = clean_cache
     return ptype(
         opts,
         grains,
@@ -128,6 +143,7 @@ def get_async_pillar(
         pillar_override=pillar_override,
         pillarenv=pillarenv,
         extra_minion_data=extra_minion_data,
+        **kwargs
     )
 
 
@@ -196,10 +212,12 @@ class AsyncRemotePillar(RemotePillarMixin):
         pillar_override=None,
         pillarenv=None,
         extra_minion_data=None,
+        clean_cache=False,
     ):
         self.opts = opts
         self.opts["saltenv"] = saltenv
         self.ext = ext
+        self.clean_cache = clean_cache
         self.grains = grains
         self.minion_id = minion_id
         self.channel = salt.transport.client.AsyncReqChannel.factory(opts)
@@ -238,6 +256,8 @@ class AsyncRemotePillar(RemotePillarMixin):
         }
         if self.ext:
             load["ext"] = self.ext
+        if self.clean_cache:
+            load["clean_cache"] = True
         try:
             ret_pillar = yield self.channel.crypted_transfer_decode_dictentry(
                 load, dictkey="pillar",
@@ -285,10 +305,12 @@ class RemotePillar(RemotePillarMixin):
         pillar_override=None,
         pillarenv=None,
         extra_minion_data=None,
+        clean_cache=False,
     ):
         self.opts = opts
         self.opts["saltenv"] = saltenv
         self.ext = ext
+        self.clean_cache = clean_cache
         self.grains = grains
         self.minion_id = minion_id
         self.channel = salt.transport.client.ReqChannel.factory(opts)
@@ -326,6 +348,8 @@ class RemotePillar(RemotePillarMixin):
         }
         if self.ext:
             load["ext"] = self.ext
+        if self.clean_cache:
+            load["clean_cache"] = True
         ret_pillar = self.channel.crypted_transfer_decode_dictentry(
             load, dictkey="pillar",
         )
@@ -380,6 +404,7 @@ class PillarCache:
         pillar_override=None,
         pillarenv=None,
         extra_minion_data=None,
+        clean_cache=False,
     ):
         # Yes, we need all of these because we need to route to the Pillar object
         # if we have no cache. This is another refactor target.
@@ -392,6 +417,7 @@ class PillarCache:
         self.functions = functions
         self.pillar_override = pillar_override
         self.pillarenv = pillarenv
+        self.clean_cache = clean_cache
 
         if saltenv is None:
             self.saltenv = "base"
@@ -399,11 +425,14 @@ class PillarCache:
             self.saltenv = saltenv
 
         # Determine caching backend
-        self.cache = salt.utils.cache.CacheFactory.factory(
-            self.opts["pillar_cache_backend"],
-            self.opts["pillar_cache_ttl"],
-            minion_cache_path=self._minion_cache_path(minion_id),
-        )
+        if self.opts["pillar_cache_backend"] == "shared":
+            self.cache = salt.utils.cache.SharedPillarCacheCli(self.opts)
+        else:
+            self.cache = salt.utils.cache.CacheFactory.factory(
+                self.opts["pillar_cache_backend"],
+                self.opts["pillar_cache_ttl"],
+                minion_cache_path=self._minion_cache_path(minion_id),
+            )
 
     def _minion_cache_path(self, minion_id):
         """
@@ -431,12 +460,42 @@ class PillarCache:
         )
         return fresh_pillar.compile_pillar()
 
+    def compile_shared_pillar(self):
+        """
+        Look the pillar up in the master-wide pillar cache, compile and store
+        it there on a miss.
+        """
+        if self.clean_cache:
+            self.cache.flush(self.minion_id)
+        else:
+            pillar = self.cache.get(self.minion_id, self.saltenv, self.pillarenv)
+            if pillar is not None:
+                log.debug(
+                    "Shared pillar cache hit for minion %s and pillarenv %s",
+                    self.minion_id,
+                    self.pillarenv,
+                )
+                return pillar
+        log.debug(
+            "Shared pillar cache miss for minion %s and pillarenv %s",
+            self.minion_id,
+            self.pillarenv,
+        )
+        fresh_pillar = self.fetch_pillar()
+        self.cache.put(self.minion_id, self.saltenv, self.pillarenv, fresh_pillar)
+        return fresh_pillar
+
     def compile_pillar(self, *args, **kwargs):  # Will likely just be pillar_dirs
+        if self.opts["pillar_cache_backend"] == "shared":
+            return self.compile_shared_pillar()
         log.debug(
             "Scanning pillar cache for information about minion %s and pillarenv %s",
             self.minion_id,
             self.pillarenv,
         )
+        if self.clean_cache and self.minion_id in self.cache:
+            log.debug("Clearing the pillar cache of minion %s", self.minion_id)
+            del self.cache[self.minion_id]
         if self.opts["pillar_cache_backend"] == "memory":
             cache_dict = self.cache
         else:
@@ -541,6 +600,7 @@ class Pillar:
         if not isinstance(self.extra_minion_data, dict):
             self.extra_minion_data = {}
             log.error("Extra minion data must be a dictionary")
+        self.top_cache = None
         self._closing = False
 
     def __valid_on_demand_ext_pillar(self, opts):
@@ -664,6 +724,8 @@ class Pillar:
                     saltenvs &= {self.saltenv or "base"}
 
             for saltenv in saltenvs:
+                if self.top_cache is not None:
+                    self.top_cache.track(self.opts["state_top"], saltenv)
                 top = self.client.cache_file(self.opts["state_top"], saltenv)
                 if top:
                     tops[saltenv].append(
@@ -702,9 +764,12 @@ class Pillar:
                     if sls in done[saltenv]:
                         continue
                     try:
+                        state = self.client.get_state(sls, saltenv)
+                        if self.top_cache is not None:
+                            self.top_cache.track(state.get("source"), saltenv)
                         tops[saltenv].append(
                             compile_template(
-                                self.client.get_state(sls, saltenv).get("dest", False),
+                                state.get("dest", False),
                                 self.rend,
                                 self.opts["renderer"],
                                 self.opts["renderer_blacklist"],
@@ -783,12 +848,32 @@ class Pillar:
         """
         Returns the high data derived from the top file
         """
+        if self.opts.get("top_file_cache"):
+            self.top_cache = salt.utils.cache.TopFileCache(self.client)
+            cache_key = (
+                "pillar",
+                self.opts["state_top"],
+                self.opts["pillarenv"],
+                self.saltenv,
+                self.opts.get("pillar_source_merging_strategy"),
+                tuple(sorted(self._get_envs())),
+            )
+            cached = self.top_cache.get(cache_key)
+            if cached is not None:
+                merged_tops, ignored_pillars = cached
+                for saltenv, states in ignored_pillars.items():
+                    self.ignored_pillars.setdefault(saltenv, []).extend(states)
+                return merged_tops, []
         tops, errors = self.get_tops()
         try:
             merged_tops = self.merge_tops(tops)
         except TypeError as err:
             merged_tops = OrderedDict()
             errors.append("Error encountered while rendering pillar top file.")
+        if self.top_cache is not None:
+            if not errors:
+                self.top_cache.store(cache_key, (merged_tops, self.ignored_pillars))
+            self.top_cache = None
         return merged_tops, errors
 
     def top_matches(self, top, reload=False):
@@ -1085,6 +1170,105 @@ class Pillar:
                 ext = self.ext_pillars[key](self.minion_id, pillar, val)
         return ext
 
+    def _call_ext_pillar(self, pillar, val, key):
+        """
+        Run a single external pillar, return its data, the error message if
+        it failed and the time it took
+        """
+        ext = error = None
+        start = time.time()
+        try:
+            ext = self._external_pillar_data(pillar, val, key)
+        except Exception as exc:  # pylint: disable=broad-except
+            error = "Failed to load ext_pillar {}: {}".format(key, exc.__str__(),)
+            log.error(
+                "Exception caught loading ext_pillar '%s':\n%s",
+                key,
+                "".join(traceback.format_tb(sys.exc_info()[2])),
+            )
+        duration = time.time() - start
+        log.debug(
+            "ext_pillar '%s' for minion %s took %.3f seconds",
+            key,
+            self.minion_id,
+            duration,
+        )
+        return ext, error, duration
+
+    def _fire_ext_pillar_event(self, timings):
+        """
+        Fire an event with the time each external pillar took
+        """
+        try:
+            with salt.utils.event.get_event(
+                self.opts.get("__role", "master"),
+                self.opts["sock_dir"],
+                self.opts.get("transport", "zeromq"),
+                opts=self.opts,
+                listen=False,
+            ) as event:
+                event.fire_event(
+                    {"minion_id": self.minion_id, "ext_pillars": timings},
+                    salt.utils.event.tagify([self.minion_id, "ext_pillar"], "pillar"),
+                )
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Unable to fire the ext_pillar timing event: %s", exc)
+
+    def _concurrent_ext_pillar(self, pillar, errors, concurrency):
+        """
+        Run the external pillars in a pool of threads and merge their data in
+        the configured order
+        """
+        calls = []
+        for run in self.opts["ext_pillar"]:
+            if not isinstance(run, dict):
+                errors.append('The "ext_pillar" option is malformed')
+                log.critical(errors[-1])
+                return {}, errors
+            if next(iter(run.keys())) in self.opts.get("exclude_ext_pillar", []):
+                continue
+            for key, val in run.items():
+                if key not in self.ext_pillars:
+                    log.critical(
+                        "Specified ext_pillar interface %s is unavailable", key
+                    )
+                    continue
+                calls.append((key, val))
+        if not calls:
+            return pillar, errors
+
+        # The external pillars all get the pillar data compiled before them,
+        # not the data of the external pillars configured above them.
+        pool = ThreadPool(min(concurrency, len(calls)))
+        try:
+            results = pool.map(
+                lambda call: self._call_ext_pillar(
+                    copy.deepcopy(pillar), call[1], call[0]
+                ),
+                calls,
+            )
+        finally:
+            pool.close()
+            pool.join()
+
+        timings = []
+        for (key, _), (ext, error, duration) in zip(calls, results):
+            timings.append(
+                {"ext_pillar": key, "duration": duration, "success": error is None}
+            )
+            if error:
+                errors.append(error)
+            if ext:
+                pillar = merge(
+                    pillar,
+                    ext,
+                    self.merge_strategy,
+                    self.opts.get("renderer", "yaml"),
+                    self.opts.get("pillar_merge_lists", False),
+                )
+        self._fire_ext_pillar_event(timings)
+        return pillar, errors
+
     def ext_pillar(self, pillar, errors=None):
         """
         Render the external pillar data
@@ -1128,6 +1312,10 @@ class Pillar:
                 self.opts.get("pillar_merge_lists", False),
             )
 
+        concurrency = self.opts.get("ext_pillar_concurrency", 1)
+        if concurrency > 1:
+            return self._concurrent_ext_pillar(pillar, errors, concurrency)
+
         for run in self.opts["ext_pillar"]:
             if not isinstance(run, dict):
                 errors.append('The "ext_pillar" option is malformed')
@@ -1141,17 +1329,9 @@ class Pillar:
                         "Specified ext_pillar interface %s is unavailable", key
                     )
                     continue
-                try:
-                    ext = self._external_pillar_data(pillar, val, key)
-                except Exception as exc:  # pylint: disable=broad-except
-                    errors.append(
-                        "Failed to load ext_pillar {}: {}".format(key, exc.__str__(),)
-                    )
-                    log.error(
-                        "Exception caught loading ext_pillar '%s':\n%s",
-                        key,
-                        "".join(traceback.format_tb(sys.exc_info()[2])),
-                    )
+                ext, error, _ = self._call_ext_pillar(pillar, val, key)
+                if error:
+                    errors.append(error)
             if ext:
                 pillar = merge(
                     pillar,
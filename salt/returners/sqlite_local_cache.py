@@ -0,0 +1,402 @@
+"""
+Use a local SQLite database for the master job cache.
+
+.. versionadded:: Aluminium
+
+The :mod:`local_cache <salt.returners.local_cache>` job cache keeps one
+directory per job, so listing the jobs and removing the expired ones means
+walking the whole tree. This job cache keeps the loads, the minion lists and
+the returns of the jobs in a single SQLite database instead. The jobs are
+keyed by JID and indexed by creation time and function, so listing jobs,
+searching them by function or start time, and expiring old jobs are all
+index range queries.
+
+SQLite ships with Python, so no additional library is needed. To enable it,
+set the following in the master config:
+
+.. code-block:: yaml
+
+    master_job_cache: sqlite_local_cache
+
+Optionally, the following values could be set in the master config. These
+are the defaults:
+
+.. code-block:: yaml
+
+    master_job_cache.sqlite.database: /var/cache/salt/master/jobs.db
+    master_job_cache.sqlite.timeout: 30
+
+``master_job_cache.sqlite.timeout`` is the number of seconds to wait for a
+lock held by another process to be released before giving up.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import salt.exceptions
+import salt.payload
+import salt.utils.jid
+import salt.utils.minions
+
+log = logging.getLogger(__name__)
+
+__virtualname__ = "sqlite_local_cache"
+
+_DEFAULT_DATABASE_NAME = "jobs.db"
+_DEFAULT_TIMEOUT = 30
+
+# Connections are never shared between processes or threads, the MWorkers
+# are forked from the master and each one needs its own, and sqlite3 only
+# lets the thread which opened a connection use it.
+_connections = {}
+
+
+def __virtual__():
+    return __virtualname__
+
+
+def _get_conn():
+    """
+    Return the connection to the job cache database for the current process
+    and thread, creating the database on first use.
+    """
+    database = __opts__.get("master_job_cache.sqlite.database") or os.path.join(
+        __opts__["cachedir"], _DEFAULT_DATABASE_NAME
+    )
+    conn = _connections.get((os.getpid(), threading.get_ident(), database))
+    if conn is not None:
+        return conn
+    if not os.path.isdir(os.path.dirname(database)):
+        os.makedirs(os.path.dirname(database))
+    try:
+        conn = sqlite3.connect(
+            database,
+            timeout=__opts__.get("master_job_cache.sqlite.timeout", _DEFAULT_TIMEOUT),
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jids ("
+                "jid TEXT PRIMARY KEY, created REAL NOT NULL, "
+                "nocache INTEGER NOT NULL DEFAULT 0, "
+                "fun TEXT, load BLOB, endtime TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jids_created ON jids (created)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jids_fun ON jids (fun)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS minions ("
+                "jid TEXT NOT NULL, syndic_id TEXT NOT NULL, minions BLOB, "
+                "PRIMARY KEY (jid, syndic_id))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS returns ("
+                "jid TEXT NOT NULL, id TEXT NOT NULL, ret BLOB, out BLOB, "
+                "PRIMARY KEY (jid, id))"
+            )
+    except sqlite3.Error as exc:
+        raise salt.exceptions.SaltCacheError(
+            'There was an error opening the job cache database "{}": {}'.format(
+                database, exc
+            )
+        )
+    _connections[(os.getpid(), threading.get_ident(), database)] = conn
+    return conn
+
+
+def _dumps(data):
+    return sqlite3.Binary(salt.payload.Serial(__opts__).dumps(data))
+
+
+def _loads(data):
+    return salt.payload.Serial(__opts__).loads(bytes(data))
+
+
+def prep_jid(nocache=False, passed_jid=None, recurse_count=0):
+    """
+    Return a job id and register it in the job cache.
+
+    This is the function responsible for making sure jids don't collide (unless
+    it is passed a jid).
+    """
+    if recurse_count >= 5:
+        err = "prep_jid could not store a jid after {} tries.".format(recurse_count)
+        log.error(err)
+        raise salt.exceptions.SaltCacheError(err)
+    if passed_jid is None:  # this can be a None or an empty string.
+        jid = salt.utils.jid.gen_jid(__opts__)
+    else:
+        jid = passed_jid
+
+    conn = _get_conn()
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO jids (jid, created, nocache) VALUES (?, ?, ?)",
+                (jid, time.time(), int(bool(nocache))),
+            )
+            created = cur.rowcount > 0
+            if not created and passed_jid is not None and nocache:
+                conn.execute("UPDATE jids SET nocache = 1 WHERE jid = ?", (jid,))
+    except sqlite3.Error as exc:
+        log.warning("Could not store jid %s: %s. Retrying.", jid, exc)
+        time.sleep(0.1)
+        return prep_jid(
+            passed_jid=passed_jid, nocache=nocache, recurse_count=recurse_count + 1
+        )
+    if not created and passed_jid is None:
+        # Someone else is using it, meaning we need a new jid
+        return prep_jid(nocache=nocache, recurse_count=recurse_count + 1)
+    return jid
+
+
+def returner(load):
+    """
+    Return data to the sqlite job cache
+    """
+    # if a minion is returning a standalone job, get a jobid
+    if load["jid"] == "req":
+        load["jid"] = prep_jid(nocache=load.get("nocache", False))
+
+    conn = _get_conn()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO jids (jid, created) VALUES (?, ?)",
+            (load["jid"], time.time()),
+        )
+        row = conn.execute(
+            "SELECT nocache FROM jids WHERE jid = ?", (load["jid"],)
+        ).fetchone()
+        if row[0]:
+            return
+        try:
+            conn.execute(
+                "INSERT INTO returns (jid, id, ret, out) VALUES (?, ?, ?, ?)",
+                (
+                    load["jid"],
+                    load["id"],
+                    _dumps(
+                        dict(
+                            (key, load[key])
+                            for key in ["return", "retcode", "success"]
+                            if key in load
+                        )
+                    ),
+                    _dumps(load["out"]) if "out" in load else None,
+                ),
+            )
+        except sqlite3.IntegrityError:
+            # Minion has already returned this jid and it should be dropped
+            log.error(
+                "An extra return was detected from minion %s, please verify "
+                "the minion, this could be a replay attack",
+                load["id"],
+            )
+            return False
+
+
+def save_load(jid, clear_load, minions=None):
+    """
+    Save the load to the specified jid
+
+    minions argument is to provide a pre-computed list of matched minions for
+    the job, for cases when this function can't compute that list itself (such
+    as for salt-ssh)
+    """
+    fun = clear_load.get("fun")
+    if isinstance(fun, list):
+        # Multi-function jobs
+        fun = ",".join(fun)
+    conn = _get_conn()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO jids (jid, created) VALUES (?, ?)",
+            (jid, time.time()),
+        )
+        conn.execute(
+            "UPDATE jids SET fun = ?, load = ? WHERE jid = ?",
+            (fun, _dumps(clear_load), jid),
+        )
+
+    # if you have a tgt, save that for the UI etc
+    if "tgt" in clear_load and clear_load["tgt"] != "":
+        if minions is None:
+            ckminions = salt.utils.minions.CkMinions(__opts__)
+            # Retrieve the minions list
+            _res = ckminions.check_minions(
+                clear_load["tgt"], clear_load.get("tgt_type", "glob")
+            )
+            minions = _res["minions"]
+        # save the minions to a cache so we can see in the UI
+        save_minions(jid, minions)
+
+
+def save_minions(jid, minions, syndic_id=None):
+    """
+    Save/update the list of minions for a given job
+    """
+    # Ensure we have a list for Python 3 compatibility
+    minions = list(minions)
+
+    log.debug(
+        "Adding minions for job %s%s: %s",
+        jid,
+        " from syndic master '{}'".format(syndic_id) if syndic_id else "",
+        minions,
+    )
+    conn = _get_conn()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO minions (jid, syndic_id, minions) "
+            "VALUES (?, ?, ?)",
+            (jid, syndic_id or "", _dumps(minions)),
+        )
+
+
+def get_load(jid):
+    """
+    Return the load data that marks a specified jid
+    """
+    conn = _get_conn()
+    row = conn.execute("SELECT load FROM jids WHERE jid = ?", (jid,)).fetchone()
+    if row is None or row[0] is None:
+        return {}
+    ret = _loads(row[0]) or {}
+    all_minions = set()
+    for (minions,) in conn.execute(
+        "SELECT minions FROM minions WHERE jid = ?", (jid,)
+    ):
+        all_minions.update(_loads(minions))
+    if all_minions:
+        ret["Minions"] = sorted(all_minions)
+    return ret
+
+
+def get_jid(jid):
+    """
+    Return the information returned when the specified job id was executed
+    """
+    ret = {}
+    conn = _get_conn()
+    for minion_id, ret_data, out in conn.execute(
+        "SELECT id, ret, out FROM returns WHERE jid = ?", (jid,)
+    ):
+        ret[minion_id] = _loads(ret_data)
+        if out is not None:
+            ret[minion_id]["out"] = _loads(out)
+    return ret
+
+
+def _format_jids(rows, formatter):
+    ret = []
+    for jid, load, endtime in rows:
+        job = _loads(load)
+        if not job:
+            continue
+        job = formatter(jid, job)
+        if endtime and __opts__.get("job_cache_store_endtime"):
+            job["EndTime"] = endtime
+        ret.append((jid, job))
+    return ret
+
+
+def get_jids():
+    """
+    Return a dict mapping all job ids to job information
+    """
+    rows = _get_conn().execute(
+        "SELECT jid, load, endtime FROM jids WHERE load IS NOT NULL"
+    )
+    return dict(_format_jids(rows, salt.utils.jid.format_jid_instance))
+
+
+def get_jids_filter(count, filter_find_job=True):
+    """
+    Return a list of all jobs information filtered by the given criteria.
+    :param int count: show not more than the count of most recent jobs
+    :param bool filter_find_jobs: filter out 'saltutil.find_job' jobs
+    """
+    query = "SELECT jid, load, endtime FROM jids WHERE load IS NOT NULL"
+    if filter_find_job:
+        query += " AND fun IS NOT 'saltutil.find_job'"
+    query += " ORDER BY jid DESC LIMIT ?"
+    rows = _get_conn().execute(query, (count,)).fetchall()
+    rows.reverse()
+    return [
+        job
+        for _, job in _format_jids(rows, salt.utils.jid.format_jid_instance_ext)
+    ]
+
+
+def get_jids_search(functions=None, start_jid=None, end_jid=None):
+    """
+    Return a dict mapping the job ids to job information, for the jobs
+    running one of ``functions`` (glob patterns) and with a jid within
+    ``start_jid`` (included) and ``end_jid`` (excluded). This lets the
+    ``jobs.list_jobs`` runner filter the jobs in the database instead of
+    loading all of them.
+    """
+    query = "SELECT jid, load, endtime FROM jids WHERE load IS NOT NULL"
+    params = []
+    if start_jid is not None:
+        query += " AND jid >= ?"
+        params.append(start_jid)
+    if end_jid is not None:
+        query += " AND jid < ?"
+        params.append(end_jid)
+    if functions:
+        query += " AND ({})".format(" OR ".join(["fun GLOB ?"] * len(functions)))
+        # fnmatch negates character sets with "[!", sqlite with "[^"
+        params.extend(fun.replace("[!", "[^") for fun in functions)
+    rows = _get_conn().execute(query, params)
+    return dict(_format_jids(rows, salt.utils.jid.format_jid_instance))
+
+
+def clean_old_jobs():
+    """
+    Clean out the old jobs from the job cache
+    """
+    if __opts__["keep_jobs"] != 0:
+        cutoff = time.time() - __opts__["keep_jobs"] * 3600
+        conn = _get_conn()
+        with conn:
+            expired = "SELECT jid FROM jids WHERE created < ?"
+            conn.execute(
+                "DELETE FROM returns WHERE jid IN ({})".format(expired), (cutoff,)
+            )
+            conn.execute(
+                "DELETE FROM minions WHERE jid IN ({})".format(expired), (cutoff,)
+            )
+            conn.execute("DELETE FROM jids WHERE created < ?", (cutoff,))
+
+
+def update_endtime(jid, time):
+    """
+    Update (or store) the end time for a given job
+    """
+    conn = _get_conn()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO jids (jid, created) VALUES (?, strftime('%s'))",
+            (jid,),
+        )
+        conn.execute("UPDATE jids SET endtime = ? WHERE jid = ?", (str(time), jid))
+
+
+def get_endtime(jid):
+    """
+    Retrieve the stored endtime for a given job
+
+    Returns False if no endtime is present
+    """
+    row = (
+        _get_conn()
+        .execute("SELECT endtime FROM jids WHERE jid = ?", (jid,))
+        .fetchone()
+    )
+    if row is None or row[0] is None:
+        return False
+    return row[0]
@@ -472,3 +472,60 @@ def flush(bank, key=None, cachedir=None):
     except TypeError:
         cache = salt.cache.Cache(__opts__)
     return cache.flush(bank, key)
+
+
+def migrate(source="localfs", target=None, bank="minions", cachedir=None):
+    """
+    .. versionadded:: Aluminium
+
+    Copy the banks and keys stored under ``bank`` from one cache driver to
+    another, for instance to move an existing ``localfs`` minion data cache to
+    the ``sqlite`` cache before switching the master ``cache`` option.
+
+    source : localfs
+        The cache driver to read the data from.
+
+    target
+        The cache driver to copy the data to. Defaults to the ``cache`` option
+        of the master.
+
+    bank : minions
+        The bank to copy, along with all its sub-banks.
+
+    cachedir
+        The cache directory used by both cache drivers. Defaults to the
+        ``cachedir`` option of the master.
+
+    Returns the number of keys copied.
+
+    CLI Examples:
+
+    .. code-block:: bash
+
+        salt-run cache.migrate target=sqlite
+        salt-run cache.migrate source=localfs target=sqlite bank=cloud
+    """
+    if cachedir is None:
+        cachedir = __opts__["cachedir"]
+    if target is None:
+        target = __opts__["cache"]
+    if source == target:
+        raise SaltInvocationError("The source and target cache must differ")
+
+    src = salt.cache.Cache(dict(__opts__, cache=source), cachedir=cachedir)
+    dst = salt.cache.Cache(dict(__opts__, cache=target), cachedir=cachedir)
+
+    count = 0
+    banks = [bank]
+    while banks:
+        current = banks.pop()
+        for name in src.list(current):
+            if src.contains(current, name):
+                dst.store(current, name, src.fetch(current, name))
+                count += 1
+            else:
+                banks.append("{0}/{1}".format(current, name))
+    log.info(
+        "Migrated %d keys from the %s cache to the %s cache", count, source, target
+    )
+    return count
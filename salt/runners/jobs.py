@@ -2,6 +2,7 @@
 A convenience system to manage jobs, both active and already run
 """
 
+import datetime
 import fnmatch
 import logging
 import os
@@ -310,7 +311,26 @@ def list_jobs(
         )
     mminion = salt.minion.MasterMinion(__opts__)
 
-    ret = mminion.returners["{}.get_jids".format(returner)]()
+    fun = "{}.get_jids_search".format(returner)
+    if fun in mminion.returners:
+        # Let the job cache narrow down the jobs it returns, the filters below
+        # still apply on top of that.
+        search = {}
+        if search_function:
+            search["functions"] = salt.utils.args.split_input(search_function)
+        if DATEUTIL_SUPPORT:
+            if start_time:
+                search["start_jid"] = "{:%Y%m%d%H%M%S%f}".format(
+                    dateutil_parser.parse(start_time)
+                )
+            if end_time:
+                search["end_jid"] = "{:%Y%m%d%H%M%S%f}".format(
+                    dateutil_parser.parse(end_time)
+                    + datetime.timedelta(microseconds=1)
+                )
+        ret = mminion.returners[fun](**search)
+    else:
+        ret = mminion.returners["{}.get_jids".format(returner)]()
 
     mret = {}
     for item in ret:
@@ -12,9 +12,11 @@ The data sent to the state calls is as follows:
 """
 
 
+import collections
 import copy
 import datetime
 import fnmatch
+import itertools
 import logging
 import os
 import random
@@ -29,8 +31,11 @@ import salt.loader
 import salt.minion
 import salt.pillar
 import salt.syspaths as syspaths
+import salt.template
 import salt.transport.client
 import salt.utils.args
+import salt.utils.atomicfile
+import salt.utils.cache
 import salt.utils.crypt
 import salt.utils.data
 import salt.utils.decorators.state
@@ -39,10 +44,12 @@ import salt.utils.event
 import salt.utils.files
 import salt.utils.hashutils
 import salt.utils.immutabletypes as immutabletypes
+import salt.utils.jinja
 import salt.utils.msgpack
 import salt.utils.platform
 import salt.utils.process
 import salt.utils.url
+import salt.version
 
 # Explicit late import to avoid circular import. DO NOT MOVE THIS.
 import salt.utils.yamlloader as yamlloader
@@ -127,6 +134,35 @@ STATE_INTERNAL_KEYWORDS = STATE_REQUISITE_KEYWORDS.union(
     STATE_REQUISITE_IN_KEYWORDS
 ).union(STATE_RUNTIME_KEYWORDS)
 
+# The requisites which make a chunk wait for other chunks with
+# state_concurrency
+CONCURRENCY_REQUISITES = (
+    "require",
+    "require_any",
+    "watch",
+    "watch_any",
+    "onfail",
+    "onfail_any",
+    "onfail_all",
+    "onchanges",
+    "onchanges_any",
+    "prerequired",
+)
+# The chunks with these keywords are never run in a separate process with
+# state_concurrency
+CONCURRENCY_INLINE_KEYWORDS = (
+    "prereq",
+    "prerequired",
+    "__prereq__",
+    "__prerequired__",
+    "watch",
+    "watch_any",
+    "retry",
+    "reload_modules",
+    "reload_grains",
+    "reload_pillar",
+)
+
 
 def _odict_hashable(self):
     return id(self)
@@ -778,6 +814,9 @@ class State:
         self.instance_id = str(id(self))
         self.inject_globals = {}
         self.mocked = mocked
+        # The id and state module of the chunks whose order was not set by
+        # the user
+        self.auto_orders = set()
 
     def _gather_pillar(self):
         """
@@ -1512,6 +1551,7 @@ class State:
         for chunk in chunks:
             if "order" not in chunk:
                 chunk["order"] = cap
+                self.auto_orders.add((chunk["__id__"], chunk["state"]))
                 continue
 
             if not isinstance(chunk["order"], (int, float)):
@@ -2464,20 +2504,24 @@ class State:
                         chunks.remove(low)
                         break
         running = {}
-        for low in chunks:
-            if "__FAILHARD__" in running:
-                running.pop("__FAILHARD__")
-                return running
-            tag = _gen_tag(low)
-            if tag not in running:
-                # Check if this low chunk is paused
-                action = self.check_pause(low)
-                if action == "kill":
-                    break
-                running = self.call_chunk(low, running, chunks)
-                if self.check_failhard(low, running):
+        concurrency = self.opts.get("state_concurrency", 1)
+        if concurrency > 1 and self.jid:
+            running = self.call_chunks_concurrently(chunks, running, concurrency)
+        else:
+            for low in chunks:
+                if "__FAILHARD__" in running:
+                    running.pop("__FAILHARD__")
                     return running
-            self.active = set()
+                tag = _gen_tag(low)
+                if tag not in running:
+                    # Check if this low chunk is paused
+                    action = self.check_pause(low)
+                    if action == "kill":
+                        break
+                    running = self.call_chunk(low, running, chunks)
+                    if self.check_failhard(low, running):
+                        return running
+                self.active = set()
         while True:
             if self.reconcile_procs(running):
                 break
@@ -2485,6 +2529,143 @@ class State:
         ret = dict(list(disabled.items()) + list(running.items()))
         return ret
 
+    def _chunk_dependencies(self, chunks):
+        """
+        Build the dependency graph of the chunks from their requisites, map
+        the tag of each chunk to the tags of the chunks which have to be run
+        before it
+        """
+        by_id = collections.defaultdict(list)
+        by_name = collections.defaultdict(list)
+        for chunk in chunks:
+            by_id[chunk["__id__"]].append(chunk)
+            by_name[chunk["name"]].append(chunk)
+        deps = {}
+        for low in chunks:
+            tag = _gen_tag(low)
+            deps[tag] = set()
+            for r_state in CONCURRENCY_REQUISITES:
+                for req in low.get(r_state) or ():
+                    if isinstance(req, str):
+                        req = {"id": req}
+                    if not isinstance(req, dict) or not req:
+                        continue
+                    req = trim_req(req)
+                    req_key = next(iter(req))
+                    req_val = req[req_key]
+                    if not isinstance(req_val, str):
+                        continue
+                    if req_key == "sls":
+                        found = [
+                            chunk
+                            for chunk in chunks
+                            if fnmatch.fnmatch(chunk["__sls__"], req_val)
+                        ]
+                    elif any(char in req_val for char in "*?["):
+                        found = [
+                            chunk
+                            for chunk in chunks
+                            if fnmatch.fnmatch(str(chunk["name"]), req_val)
+                            or fnmatch.fnmatch(chunk["__id__"], req_val)
+                        ]
+                    else:
+                        found = by_id.get(req_val, []) + by_name.get(req_val, [])
+                        if req_key != "id":
+                            found = [
+                                chunk for chunk in found if chunk["state"] == req_key
+                            ]
+                    deps[tag].update(_gen_tag(chunk) for chunk in found)
+            deps[tag].discard(tag)
+        return deps
+
+    def _run_chunk_concurrently(self, low):
+        """
+        Check if the chunk can be run in a separate process while other
+        chunks run, the chunks which need to run inline are the ones whose
+        requisites or options depend on the state of this process
+        """
+        if low.get("parallel") is False:
+            return False
+        if low.get("failhard", self.opts["failhard"]):
+            return False
+        return not any(low.get(key) for key in CONCURRENCY_INLINE_KEYWORDS)
+
+    def _wait_for_procs(self, running):
+        while not self.reconcile_procs(running):
+            time.sleep(0.01)
+
+    def call_chunks_concurrently(self, chunks, running, concurrency):
+        """
+        Call the chunks as soon as the chunks they depend on are done, running
+        up to ``concurrency`` of them at the same time in separate processes.
+
+        The orders set by the user, including ``first`` and ``last``, are
+        barriers: all the chunks before an order are done before its chunks
+        are started, and its chunks are done before the chunks after them are
+        started. The orders set by ``state_auto_order`` only decide which of
+        the ready chunks are started first. The chunks with failhard, prereq,
+        watch, retry or reload options are called inline, like in a
+        sequential run.
+        """
+        deps = self._chunk_dependencies(chunks)
+
+        def _barrier(low):
+            if (low["__id__"], low["state"]) in self.auto_orders:
+                return None
+            try:
+                return int(low.get("order", 0))
+            except (TypeError, ValueError):
+                return 0
+
+        for _, group in itertools.groupby(chunks, key=_barrier):
+            pending = list(group)
+            while pending:
+                self.reconcile_procs(running)
+                procs = sum(1 for ret in running.values() if "proc" in ret)
+                started = False
+                for low in list(pending):
+                    tag = _gen_tag(low)
+                    if tag in running:
+                        # Already called as the requisite of another chunk
+                        pending.remove(low)
+                        continue
+                    if any(
+                        dep not in running or "proc" in running[dep]
+                        for dep in deps[tag]
+                    ):
+                        continue
+                    concurrent = self._run_chunk_concurrently(low)
+                    if concurrent and procs >= concurrency:
+                        continue
+                    break
+                else:
+                    low = None
+                if low is None and not procs and pending:
+                    # The remaining chunks require chunks of a later order,
+                    # or each other, resolve them like a sequential run does
+                    low = pending[0]
+                    concurrent = False
+                if low is not None:
+                    pending.remove(low)
+                    if self.check_pause(low) == "kill":
+                        self._wait_for_procs(running)
+                        return running
+                    if concurrent:
+                        low["parallel"] = True
+                    running = self.call_chunk(low, running, chunks)
+                    self.active = set()
+                    started = True
+                    if "__FAILHARD__" in running or self.check_failhard(
+                        low, running
+                    ):
+                        running.pop("__FAILHARD__", None)
+                        self._wait_for_procs(running)
+                        return running
+                if not started:
+                    time.sleep(0.01)
+            self._wait_for_procs(running)
+        return running
+
     def check_failhard(self, low, running):
         """
         Check if the low data chunk should send a failhard signal
@@ -3403,6 +3584,176 @@ class LazyAvailStates:
         return ret
 
 
+class SLSRenderCache:
+    """
+    Cache of the high data rendered from the SLS files, kept under the
+    cachedir of the minion. A rendering is reused as long as the SLS file,
+    the templates it loaded, the grains and the pillar of the minion and the
+    render options are the same. Files rendered with a renderer which is not
+    in ``deterministic_renderers`` are always rendered again.
+    """
+
+    # Renderers whose output only depends on the template and its context,
+    # and whose template imports are tracked
+    deterministic_renderers = ("jinja", "yaml", "json", "yamlex")
+
+    def __init__(self, highstate):
+        self.client = highstate.client
+        self.state = highstate.state
+        self.cachedir = os.path.join(highstate.opts["cachedir"], "sls_cache")
+        self._context_digest = None
+
+    def _get_context_digest(self):
+        """
+        Return the digest of the template context shared by all the SLS files
+        """
+        if self._context_digest is None:
+            opts = self.state.opts
+            context = [
+                salt.version.__version__,
+                opts.get("id"),
+                opts["renderer"],
+                opts.get("grains", {}),
+                opts.get("pillar", {}),
+            ]
+            context.extend(
+                opts.get(key)
+                for key in (
+                    "jinja_env",
+                    "jinja_sls_env",
+                    "jinja_lstrip_blocks",
+                    "jinja_trim_blocks",
+                )
+            )
+            self._context_digest = salt.utils.hashutils.sha256_digest(
+                salt.utils.msgpack.packb(context, use_bin_type=True)
+            )
+        return self._context_digest
+
+    def _get_key(self, fn_, saltenv, sls, context):
+        """
+        Return the cache key of a rendering, or ``None`` if it can't be
+        cached
+        """
+        render_pipe = salt.template.template_shebang(
+            fn_,
+            self.state.rend,
+            self.state.opts["renderer"],
+            self.state.opts["renderer_blacklist"],
+            self.state.opts["renderer_whitelist"],
+            "",
+        )
+        for render, _ in render_pipe:
+            if render.__module__.split(".")[-1] not in self.deterministic_renderers:
+                return None
+        try:
+            return salt.utils.hashutils.sha256_digest(
+                salt.utils.msgpack.packb(
+                    [
+                        self._get_context_digest(),
+                        salt.utils.hashutils.get_hash(fn_, "sha256"),
+                        saltenv,
+                        sls,
+                        context,
+                    ],
+                    use_bin_type=True,
+                )
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Unable to cache the rendering of %s: %s", sls, exc)
+            return None
+
+    def _hash_templates(self, templates):
+        """
+        Return the templates along with their hash on the file server
+        """
+        ret = []
+        for url, saltenv in (template[:2] for template in templates):
+            hsum = self.client.hash_file(url, saltenv)
+            ret.append([url, saltenv, hsum.get("hsum") if hsum else None])
+        return ret
+
+    def _load(self, path):
+        try:
+            with salt.utils.files.fopen(path, "rb") as fp_:
+                return salt.utils.msgpack.unpackb(
+                    fp_.read(), object_pairs_hook=OrderedDict, raw=False
+                )
+        except (OSError, IOError):
+            return None
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Unable to read the SLS render cache %s: %s", path, exc)
+            return None
+
+    def _store(self, path, entry):
+        try:
+            data = salt.utils.msgpack.packb(entry, use_bin_type=True)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug("Unable to cache the rendering of %s: %s", path, exc)
+            return
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with salt.utils.atomicfile.atomic_open(path, "wb") as fp_:
+                fp_.write(data)
+        except (OSError, IOError) as exc:
+            log.warning("Unable to write the SLS render cache %s: %s", path, exc)
+
+    def render(self, fn_, saltenv, sls, mods=None, context=None):
+        """
+        Return the high data of an SLS file, from the cache if possible
+        """
+        key = self._get_key(fn_, saltenv, sls, context)
+        if key is None:
+            return compile_template(
+                fn_,
+                self.state.rend,
+                self.state.opts["renderer"],
+                self.state.opts["renderer_blacklist"],
+                self.state.opts["renderer_whitelist"],
+                saltenv,
+                sls,
+                rendered_sls=mods,
+                context=context,
+            )
+        path = os.path.join(self.cachedir, saltenv, "{}.p".format(sls))
+        entry = self._load(path)
+        if (
+            isinstance(entry, dict)
+            and entry.get("key") == key
+            and self._hash_templates(entry["templates"]) == entry["templates"]
+        ):
+            log.debug("Using the cached rendering of SLS %s:%s", saltenv, sls)
+            return entry["data"]
+
+        loaded_templates = salt.utils.jinja.SaltCacheLoader.loaded_templates
+        salt.utils.jinja.SaltCacheLoader.loaded_templates = templates = []
+        try:
+            state = compile_template(
+                fn_,
+                self.state.rend,
+                self.state.opts["renderer"],
+                self.state.opts["renderer_blacklist"],
+                self.state.opts["renderer_whitelist"],
+                saltenv,
+                sls,
+                rendered_sls=mods,
+                context=context,
+            )
+        finally:
+            salt.utils.jinja.SaltCacheLoader.loaded_templates = loaded_templates
+        if isinstance(state, dict):
+            self._store(
+                path,
+                {
+                    "key": key,
+                    "templates": self._hash_templates(templates),
+                    "data": state,
+                },
+            )
+        return state
+
+
 class BaseHighState:
     """
     The BaseHighState is an abstract base class that is the foundation of
@@ -3415,9 +3766,13 @@ class BaseHighState:
     def __init__(self, opts):
         self.opts = self.__gen_opts(opts)
         self.iorder = 10000
+        # The id and state module of the declarations ordered by iorder
+        self.auto_orders = set()
         self.avail = self.__gather_avail()
         self.serial = salt.payload.Serial(self.opts)
         self.building_highstate = OrderedDict()
+        self.top_cache = None
+        self.render_cache = None
 
     def __gather_avail(self):
         """
@@ -3516,6 +3871,8 @@ class BaseHighState:
                 )
 
         if self.opts["saltenv"]:
+            if self.top_cache is not None:
+                self.top_cache.track(self.opts["state_top"], self.opts["saltenv"])
             contents = self.client.cache_file(
                 self.opts["state_top"], self.opts["saltenv"]
             )
@@ -3543,6 +3900,8 @@ class BaseHighState:
             for saltenv in (
                 [state_top_saltenv] if state_top_saltenv else self._get_envs()
             ):
+                if self.top_cache is not None:
+                    self.top_cache.track(self.opts["state_top"], saltenv)
                 contents = self.client.cache_file(self.opts["state_top"], saltenv)
                 if contents:
                     found = found + 1
@@ -3602,9 +3961,12 @@ class BaseHighState:
                     for sls in fnmatch.filter(self.avail[saltenv], sls_match):
                         if sls in done[saltenv]:
                             continue
+                        state = self.client.get_state(sls, saltenv)
+                        if self.top_cache is not None:
+                            self.top_cache.track(state.get("source"), saltenv)
                         tops[saltenv].append(
                             compile_template(
-                                self.client.get_state(sls, saltenv).get("dest", False),
+                                state.get("dest", False),
                                 self.state.rend,
                                 self.state.opts["renderer"],
                                 self.state.opts["renderer_blacklist"],
@@ -3862,12 +4224,31 @@ class BaseHighState:
         """
         Returns the high data derived from the top file
         """
+        if self.opts.get("top_file_cache"):
+            self.top_cache = salt.utils.cache.TopFileCache(self.client)
+            cache_key = (
+                "state",
+                self.opts["state_top"],
+                self.opts["saltenv"],
+                self.opts.get("state_top_saltenv"),
+                self.opts["top_file_merging_strategy"],
+                self.opts["default_top"],
+                tuple(self._get_envs()),
+            )
+            cached = self.top_cache.get(cache_key)
+            if cached is not None:
+                return cached
         try:
             tops = self.get_tops()
         except SaltRenderError as err:
             log.error("Unable to render top file: %s", err.error)
             return {}
-        return self.merge_tops(tops)
+        finally:
+            top_cache, self.top_cache = self.top_cache, None
+        top = self.merge_tops(tops)
+        if top_cache is not None:
+            top_cache.store(cache_key, top)
+        return top
 
     def top_matches(self, top):
         """
@@ -3965,17 +4346,24 @@ class BaseHighState:
             )
         else:
             try:
-                state = compile_template(
-                    fn_,
-                    self.state.rend,
-                    self.state.opts["renderer"],
-                    self.state.opts["renderer_blacklist"],
-                    self.state.opts["renderer_whitelist"],
-                    saltenv,
-                    sls,
-                    rendered_sls=mods,
-                    context=context,
-                )
+                if self.opts.get("state_render_cache") and not local:
+                    if self.render_cache is None:
+                        self.render_cache = SLSRenderCache(self)
+                    state = self.render_cache.render(
+                        fn_, saltenv, sls, mods=mods, context=context
+                    )
+                else:
+                    state = compile_template(
+                        fn_,
+                        self.state.rend,
+                        self.state.opts["renderer"],
+                        self.state.opts["renderer_blacklist"],
+                        self.state.opts["renderer_whitelist"],
+                        saltenv,
+                        sls,
+                        rendered_sls=mods,
+                        context=context,
+                    )
             except SaltRenderError as exc:
                 msg = "Rendering SLS '{}:{}' failed: {}".format(saltenv, sls, exc)
                 log.critical(msg)
@@ -4166,7 +4554,10 @@ class BaseHighState:
                             # quite certainly a syntax error, managed elsewhere
                             continue
                         state[name][s_dec].append({"order": self.iorder})
+                        self.auto_orders.add((name, s_dec.split(".")[0]))
                         self.iorder += 1
+                    else:
+                        self.auto_orders.discard((name, s_dec.split(".")[0]))
         return state
 
     def _handle_state_decls(self, state, sls, saltenv, errors):
@@ -4597,6 +4988,7 @@ class HighState(BaseHighState):
             loader=loader,
             initial_pillar=initial_pillar,
         )
+        self.state.auto_orders = self.auto_orders
         self.matchers = salt.loader.matchers(self.opts)
         self.proxy = proxy
 
@@ -7,6 +7,8 @@ This includes client side transport, for the ReqServer and the Publisher
 
 import logging
 
+import salt.ext.tornado.gen
+import salt.ext.tornado.locks
 from salt.utils.asynchronous import SyncWrapper
 
 log = logging.getLogger(__name__)
@@ -36,6 +38,26 @@ class ReqChannel:
         """
         raise NotImplementedError()
 
+    @salt.ext.tornado.gen.coroutine
+    def send_many(self, loads, tries=3, timeout=60, raw=False, window=None):
+        """
+        Send several loads to the master, with up to "window" of them in flight
+        at once, and return the replies in the order of the loads. The window
+        defaults to request_channel_window.
+        """
+        if window is None:
+            window = self.opts.get("request_channel_window", 1)
+        semaphore = salt.ext.tornado.locks.Semaphore(max(window, 1))
+
+        @salt.ext.tornado.gen.coroutine
+        def _send(load):
+            with (yield semaphore.acquire()):
+                ret = yield self.send(load, tries=tries, timeout=timeout, raw=raw)
+            raise salt.ext.tornado.gen.Return(ret)
+
+        ret = yield [_send(load) for load in loads]
+        raise salt.ext.tornado.gen.Return(ret)
+
     def crypted_transfer_decode_dictentry(
         self, load, dictkey=None, tries=3, timeout=60
     ):
@@ -335,6 +335,7 @@ class IPCClient:
             try:
                 log.trace("IPCClient: Connecting to socket: %s", self.socket_path)
                 yield self.stream.connect(sock_addr)
+                yield self._on_connect()
                 self._connecting_future.set_result(True)
                 break
             except Exception as e:  # pylint: disable=broad-except
@@ -350,6 +351,13 @@ class IPCClient:
 
                 yield salt.ext.tornado.gen.sleep(1)
 
+    @salt.ext.tornado.gen.coroutine
+    def _on_connect(self):
+        """
+        Override this to send data to the server once the socket is connected,
+        before the connection is reported as established
+        """
+
     def close(self):
         """
         Routines to handle any cleanup before the instance shuts down.
@@ -510,6 +518,9 @@ class IPCMessagePublisher:
         self.io_loop = io_loop or IOLoop.current()
         self._closing = False
         self.streams = set()
+        # The tag prefixes registered by the subscribers which only want
+        # the messages published with a matching tag
+        self.stream_filters = {}
 
     def start(self):
         """
@@ -542,15 +553,57 @@ class IPCMessagePublisher:
         except StreamClosedError:
             log.trace("Client disconnected from IPC %s", self.socket_path)
             self.streams.discard(stream)
+            self.stream_filters.pop(stream, None)
         except Exception as exc:  # pylint: disable=broad-except
             log.error("Exception occurred while handling stream: %s", exc)
             if not stream.closed():
                 stream.close()
             self.streams.discard(stream)
+            self.stream_filters.pop(stream, None)
 
-    def publish(self, msg):
+    @salt.ext.tornado.gen.coroutine
+    def _read_filters(self, stream):
+        """
+        Read the tag filters sent by a subscriber
+        """
+        # msgpack deprecated `encoding` starting with version 0.5.2
+        if salt.utils.msgpack.version >= (0, 5, 2):
+            msgpack_kwargs = {"raw": False}
+        else:
+            msgpack_kwargs = {"encoding": "utf-8"}
+        unpacker = salt.utils.msgpack.Unpacker(**msgpack_kwargs)
+        while not stream.closed():
+            try:
+                wire_bytes = yield stream.read_bytes(4096, partial=True)
+                unpacker.feed(wire_bytes)
+                for framed_msg in unpacker:
+                    body = framed_msg["body"]
+                    tag_filters = None
+                    if isinstance(body, dict):
+                        tag_filters = body.get("tag_filters")
+                    if tag_filters:
+                        log.trace(
+                            "Filtering the messages published on IPC %s by tag: %s",
+                            self.socket_path,
+                            tag_filters,
+                        )
+                        self.stream_filters[stream] = tuple(tag_filters)
+                    else:
+                        self.stream_filters.pop(stream, None)
+            except StreamClosedError:
+                break
+            except Exception as exc:  # pylint: disable=broad-except
+                log.error("Exception occurred while reading tag filters: %s", exc)
+                self.stream_filters.pop(stream, None)
+                break
+
+    def publish(self, msg, tag=None):
         """
         Send message to all connected sockets
+
+        :param str tag: The tag of the message, the subscribers which
+                        registered tag filters only receive the messages
+                        with a tag starting with one of them
         """
         if not self.streams:
             return
@@ -558,6 +611,9 @@ class IPCMessagePublisher:
         pack = salt.transport.frame.frame_msg_ipc(msg, raw_body=True)
 
         for stream in self.streams:
+            if tag is not None and stream in self.stream_filters:
+                if not tag.startswith(self.stream_filters[stream]):
+                    continue
             self.io_loop.spawn_callback(self._write, stream, pack)
 
     def handle_connection(self, connection, address):
@@ -576,8 +632,10 @@ class IPCMessagePublisher:
 
             def discard_after_closed():
                 self.streams.discard(stream)
+                self.stream_filters.pop(stream, None)
 
             stream.set_close_callback(discard_after_closed)
+            self.io_loop.spawn_callback(self._read_filters, stream)
         except Exception as exc:  # pylint: disable=broad-except
             log.error("IPC streaming error: %s", exc)
 
@@ -593,6 +651,7 @@ class IPCMessagePublisher:
         for stream in self.streams:
             stream.close()
         self.streams.clear()
+        self.stream_filters.clear()
         if hasattr(self.sock, "close"):
             self.sock.close()
 
@@ -637,12 +696,31 @@ class IPCMessageSubscriber(IPCClient):
     package = ipc_subscriber.read_sync()
     """
 
-    def __init__(self, socket_path, io_loop=None):
+    def __init__(self, socket_path, io_loop=None, tag_filters=None):
+        """
+        :param list tag_filters: The tag prefixes of the messages to receive,
+                                 sent to the publisher on connection so that
+                                 it only publishes those. All the messages
+                                 are received when not set.
+        """
         super().__init__(socket_path, io_loop=io_loop)
+        self.tag_filters = tag_filters
         self._read_stream_future = None
         self._saved_data = []
         self._read_in_progress = Lock()
 
+    @salt.ext.tornado.gen.coroutine
+    def _on_connect(self):
+        """
+        Register the tag filters with the publisher
+        """
+        if self.tag_filters:
+            yield self.stream.write(
+                salt.transport.frame.frame_msg_ipc(
+                    {"tag_filters": list(self.tag_filters)}
+                )
+            )
+
     @salt.ext.tornado.gen.coroutine
     def _read(self, timeout, callback=None):
         try:
@@ -74,6 +74,68 @@ class AESPubClientMixin(object):
 
         raise salt.ext.tornado.gen.Return(payload)
 
+    def _split_payload(self, payload):
+        """
+        Return the payloads of the loads batched by the master in a decoded
+        payload, or the payload itself if it holds a single load
+        """
+        load = payload.get("load")
+        if isinstance(load, dict) and "__batch__" in load:
+            return [dict(payload, load=batched) for batched in load["__batch__"]]
+        return [payload]
+
+
+class AESPubServerMixin(object):
+    """
+    Mixin to house the master-side crypto of the publish channels
+    """
+
+    # The crypticle of the current AES key and the loaded master key, kept on
+    # the class since a publish channel is created for each publish
+    _crypticle = None
+    _signing_key = None
+
+    def _get_crypticle(self):
+        """
+        Return the crypticle of the current AES key, built again when the key
+        is rotated
+        """
+        aes = salt.master.SMaster.secrets["aes"]["secret"].value
+        crypticle = AESPubServerMixin._crypticle
+        if crypticle is None or crypticle.key_string != aes:
+            crypticle = AESPubServerMixin._crypticle = salt.crypt.Crypticle(
+                self.opts, aes
+            )
+        return crypticle
+
+    def _sign_pub(self, data):
+        """
+        Sign data with the master key, loaded once per process
+        """
+        master_pem_path = os.path.join(self.opts["pki_dir"], "master.pem")
+        if (
+            AESPubServerMixin._signing_key is None
+            or AESPubServerMixin._signing_key[0] != master_pem_path
+        ):
+            AESPubServerMixin._signing_key = (
+                master_pem_path,
+                salt.crypt.get_rsa_key(master_pem_path, None),
+            )
+        return salt.crypt.sign_message_with_key(
+            AESPubServerMixin._signing_key[1], data
+        )
+
+    def _package_pub(self, load):
+        """
+        Encrypt, and sign when sign_pub_messages is set, a load to publish
+        """
+        payload = {"enc": "aes"}
+        payload["load"] = self._get_crypticle().dumps(load)
+        if self.opts["sign_pub_messages"]:
+            log.debug("Signing data packet")
+            payload["sig"] = self._sign_pub(payload["load"])
+        return payload
+
 
 # TODO: rename?
 class AESReqServerMixin(object):
@@ -35,6 +35,7 @@ import salt.transport.server
 import salt.utils.asynchronous
 import salt.utils.event
 import salt.utils.files
+import salt.utils.minions
 import salt.utils.msgpack
 import salt.utils.platform
 import salt.utils.process
@@ -231,6 +232,7 @@ class AsyncTCPReqChannel(salt.transport.client.ReqChannel):
         "_crypted_transfer",
         "_uncrypted_transfer",
         "send",
+        "send_many",
     ]
     close_methods = [
         "close",
@@ -1618,7 +1620,10 @@ class PubServer(salt.ext.tornado.tcpserver.TCPServer):
         log.trace("TCP PubServer finished publishing payload")
 
 
-class TCPPubServerChannel(salt.transport.server.PubServerChannel):
+class TCPPubServerChannel(
+    salt.transport.mixins.auth.AESPubServerMixin,
+    salt.transport.server.PubServerChannel,
+):
     # TODO: opts!
     # Based on default used in salt.ext.tornado.netutil.bind_sockets()
     backlog = 128
@@ -1696,20 +1701,46 @@ class TCPPubServerChannel(salt.transport.server.PubServerChannel):
         """
         process_manager.add_process(self._publish_daemon, kwargs=kwargs)
 
+    def _publish_targets(self, load):
+        """
+        Return the ids of the minions a load is published to, or None when it
+        is broadcast to every connected minion
+        """
+        if self.opts.get("order_masters", False):
+            # The syndics need every publish
+            return None
+        tgt_type = load["tgt_type"]
+        if tgt_type == "list":
+            if not isinstance(load["tgt"], str):
+                return load["tgt"]
+        elif not self.opts.get("tcp_pub_filtering", False):
+            return None
+        elif tgt_type in ("grain", "grain_pcre"):
+            if not self.opts.get("minion_data_cache", False):
+                # The grains of the minions are only known from the cache
+                return None
+        elif tgt_type not in ("glob", "pcre"):
+            return None
+        kwargs = {}
+        if "delimiter" in load:
+            kwargs["delimiter"] = load["delimiter"]
+        # Fetch a list of minions that match. The minions missing from the
+        # minion data cache are matched greedily and so still get the publish.
+        match_ids = self.ckminions.check_minions(
+            load["tgt"], tgt_type=tgt_type, **kwargs
+        )["minions"]
+        log.debug("Publish Side Match: %s", match_ids)
+        if not match_ids and tgt_type != "list":
+            # No match may as well be a failure to match, broadcast so that
+            # the minions decide for themselves
+            return None
+        return match_ids
+
     def publish(self, load):
         """
         Publish "load" to minions
         """
-        payload = {"enc": "aes"}
-
-        crypticle = salt.crypt.Crypticle(
-            self.opts, salt.master.SMaster.secrets["aes"]["secret"].value
-        )
-        payload["load"] = crypticle.dumps(load)
-        if self.opts["sign_pub_messages"]:
-            master_pem_path = os.path.join(self.opts["pki_dir"], "master.pem")
-            log.debug("Signing data packet")
-            payload["sig"] = salt.crypt.sign_message(master_pem_path, payload["load"])
+        payload = self._package_pub(load)
         # Use the Salt IPC server
         if self.opts.get("ipc_mode", "") == "tcp":
             pull_uri = int(self.opts.get("tcp_master_publish_pull", 4514))
@@ -1724,19 +1755,9 @@ class TCPPubServerChannel(salt.transport.server.PubServerChannel):
 
         int_payload = {"payload": self.serial.dumps(payload)}
 
-        # add some targeting stuff for lists only (for now)
-        if load["tgt_type"] == "list" and not self.opts.get("order_masters", False):
-            if isinstance(load["tgt"], str):
-                # Fetch a list of minions that match
-                _res = self.ckminions.check_minions(
-                    load["tgt"], tgt_type=load["tgt_type"]
-                )
-                match_ids = _res["minions"]
-
-                log.debug("Publish Side Match: %s", match_ids)
-                # Send list of miions thru so zmq can target them
-                int_payload["topic_lst"] = match_ids
-            else:
-                int_payload["topic_lst"] = load["tgt"]
+        topic_lst = self._publish_targets(load)
+        if topic_lst is not None:
+            # Send list of minions thru so the PubServer can target them
+            int_payload["topic_lst"] = topic_lst
         # Send it over IPC!
         pub_sock.send(int_payload)
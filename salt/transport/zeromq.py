@@ -1,6 +1,7 @@
 """
 Zeromq transport classes
 """
+import collections
 import copy
 import errno
 import hashlib
@@ -9,6 +10,7 @@ import os
 import signal
 import sys
 import threading
+import time
 import weakref
 from random import randint
 
@@ -26,6 +28,7 @@ import salt.transport.server
 import salt.utils.event
 import salt.utils.files
 import salt.utils.minions
+import salt.utils.platform
 import salt.utils.process
 import salt.utils.stringutils
 import salt.utils.verify
@@ -137,6 +140,7 @@ class AsyncZeroMQReqChannel(salt.transport.client.ReqChannel):
         "_do_transfer",
         "_uncrypted_transfer",
         "send",
+        "send_many",
     ]
     close_methods = [
         "close",
@@ -663,7 +667,8 @@ class AsyncZeroMQPubChannel(
         def wrap_callback(messages):
             payload = yield self._decode_messages(messages)
             if payload is not None:
-                callback(payload)
+                for load_payload in self._split_payload(payload):
+                    callback(load_payload)
 
         return self.stream.on_recv(wrap_callback)
 
@@ -936,7 +941,10 @@ def _set_tcp_keepalive(zmq_socket, opts):
             zmq_socket.setsockopt(zmq.TCP_KEEPALIVE_INTVL, opts["tcp_keepalive_intvl"])
 
 
-class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
+class ZeroMQPubServerChannel(
+    salt.transport.mixins.auth.AESPubServerMixin,
+    salt.transport.server.PubServerChannel,
+):
     """
     Encapsulate synchronous operations for a publisher channel
     """
@@ -1020,51 +1028,25 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
                     package = pull_sock.recv()
                     log.debug("Publish daemon received payload. size=%d", len(package))
 
-                    unpacked_package = salt.payload.unpackage(package)
-                    unpacked_package = salt.transport.frame.decode_embedded_strs(
-                        unpacked_package
-                    )
-                    payload = unpacked_package["payload"]
+                    unpacked_package = self._unpack_package(package)
                     log.trace("Accepted unpacked package from puller")
-                    if self.opts["zmq_filtering"]:
-                        # if you have a specific topic list, use that
-                        if "topic_lst" in unpacked_package:
-                            for topic in unpacked_package["topic_lst"]:
-                                log.trace(
-                                    "Sending filtered data over publisher %s", pub_uri
-                                )
-                                # zmq filters are substring match, hash the topic
-                                # to avoid collisions
-                                htopic = salt.utils.stringutils.to_bytes(
-                                    hashlib.sha1(
-                                        salt.utils.stringutils.to_bytes(topic)
-                                    ).hexdigest()
-                                )
-                                pub_sock.send(htopic, flags=zmq.SNDMORE)
-                                pub_sock.send(payload)
-                                log.trace("Filtered data has been sent")
-
-                            # Syndic broadcast
-                            if self.opts.get("order_masters"):
-                                log.trace("Sending filtered data to syndic")
-                                pub_sock.send(b"syndic", flags=zmq.SNDMORE)
-                                pub_sock.send(payload)
-                                log.trace("Filtered data has been sent to syndic")
-                        # otherwise its a broadcast
-                        else:
-                            # TODO: constants file for "broadcast"
-                            log.trace(
-                                "Sending broadcasted data over publisher %s", pub_uri
-                            )
-                            pub_sock.send(b"broadcast", flags=zmq.SNDMORE)
-                            pub_sock.send(payload)
-                            log.trace("Broadcasted data has been sent")
-                    else:
-                        log.trace(
-                            "Sending ZMQ-unfiltered data over publisher %s", pub_uri
+                    if "load" in unpacked_package:
+                        packages = [unpacked_package]
+                        # Wait for the other publishes of the batch
+                        batch_end = (
+                            time.time() + self.opts["pub_batch_window"] / 1000.0
                         )
-                        pub_sock.send(payload)
-                        log.trace("Unfiltered data has been sent")
+                        while True:
+                            timeout = batch_end - time.time()
+                            if timeout <= 0 or not pull_sock.poll(timeout * 1000):
+                                break
+                            packages.append(self._unpack_package(pull_sock.recv()))
+                        log.debug("Publish daemon batching %d payloads", len(packages))
+                        unpacked_packages = self._batch_packages(packages)
+                    else:
+                        unpacked_packages = [unpacked_package]
+                    for unpacked_package in unpacked_packages:
+                        self._send_package(pub_sock, pub_uri, unpacked_package)
                 except zmq.ZMQError as exc:
                     if exc.errno == errno.EINTR:
                         continue
@@ -1080,6 +1062,80 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
         if context.closed is False:
             context.term()
 
+    def _unpack_package(self, package):
+        """
+        Unpack a package received by the publish daemon
+        """
+        unpacked_package = salt.payload.unpackage(package)
+        return salt.transport.frame.decode_embedded_strs(unpacked_package)
+
+    def _batch_packages(self, packages):
+        """
+        Group the loads of the packages received within pub_batch_window by
+        target, and return a package with a single encrypted and signed
+        payload for each target
+        """
+        batches = collections.OrderedDict()
+        for package in packages:
+            if "load" not in package:
+                batches[id(package)] = package
+                continue
+            topic_lst = package.get("topic_lst")
+            key = tuple(topic_lst) if topic_lst is not None else None
+            batches.setdefault(key, {"loads": [], "topic_lst": topic_lst})
+            batches[key]["loads"].append(package["load"])
+        ret = []
+        for batch in batches.values():
+            if "loads" not in batch:
+                ret.append(batch)
+                continue
+            if len(batch["loads"]) == 1:
+                load = batch["loads"][0]
+            else:
+                load = {"__batch__": batch["loads"]}
+            package = {"payload": self.serial.dumps(self._package_pub(load))}
+            if batch["topic_lst"] is not None:
+                package["topic_lst"] = batch["topic_lst"]
+            ret.append(package)
+        return ret
+
+    def _send_package(self, pub_sock, pub_uri, unpacked_package):
+        """
+        Send the payload of a package to the minions
+        """
+        payload = unpacked_package["payload"]
+        if self.opts["zmq_filtering"]:
+            # if you have a specific topic list, use that
+            if "topic_lst" in unpacked_package:
+                for topic in unpacked_package["topic_lst"]:
+                    log.trace("Sending filtered data over publisher %s", pub_uri)
+                    # zmq filters are substring match, hash the topic
+                    # to avoid collisions
+                    htopic = salt.utils.stringutils.to_bytes(
+                        hashlib.sha1(salt.utils.stringutils.to_bytes(topic)).hexdigest()
+                    )
+                    pub_sock.send(htopic, flags=zmq.SNDMORE)
+                    pub_sock.send(payload)
+                    log.trace("Filtered data has been sent")
+
+                # Syndic broadcast
+                if self.opts.get("order_masters"):
+                    log.trace("Sending filtered data to syndic")
+                    pub_sock.send(b"syndic", flags=zmq.SNDMORE)
+                    pub_sock.send(payload)
+                    log.trace("Filtered data has been sent to syndic")
+            # otherwise its a broadcast
+            else:
+                # TODO: constants file for "broadcast"
+                log.trace("Sending broadcasted data over publisher %s", pub_uri)
+                pub_sock.send(b"broadcast", flags=zmq.SNDMORE)
+                pub_sock.send(payload)
+                log.trace("Broadcasted data has been sent")
+        else:
+            log.trace("Sending ZMQ-unfiltered data over publisher %s", pub_uri)
+            pub_sock.send(payload)
+            log.trace("Unfiltered data has been sent")
+
     def pre_fork(self, process_manager, kwargs=None):
         """
         Do anything necessary pre-fork. Since this is on the master side this will
@@ -1141,16 +1197,11 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
 
         :param dict load: A load to be sent across the wire to minions
         """
-        payload = {"enc": "aes"}
-        crypticle = salt.crypt.Crypticle(
-            self.opts, salt.master.SMaster.secrets["aes"]["secret"].value
-        )
-        payload["load"] = crypticle.dumps(load)
-        if self.opts["sign_pub_messages"]:
-            master_pem_path = os.path.join(self.opts["pki_dir"], "master.pem")
-            log.debug("Signing data packet")
-            payload["sig"] = salt.crypt.sign_message(master_pem_path, payload["load"])
-        int_payload = {"payload": self.serial.dumps(payload)}
+        if self.opts["pub_batch_window"] and not salt.utils.platform.is_windows():
+            # The publish daemon encrypts and signs the loads it batches
+            int_payload = {"load": load}
+        else:
+            int_payload = {"payload": self.serial.dumps(self._package_pub(load))}
 
         # add some targeting stuff for lists only (for now)
         if load["tgt_type"] == "list":
@@ -1213,8 +1264,8 @@ class AsyncReqMessageClient:
     This class wraps the underlying zeromq REQ socket and gives a future-based
     interface to sending and recieving messages. This works around the primary
     limitation of serialized send/recv on the underlying socket by queueing the
-    message sends in this class. In the future if we decide to attempt to multiplex
-    we can manage a pool of REQ/REP sockets-- but for now we'll just do them in serial
+    message sends in this class. When request_channel_window is above 1 a DEALER
+    socket is used instead, and the messages are multiplexed on it with message ids
     """
 
     def __init__(self, opts, addr, linger=0, io_loop=None):
@@ -1238,6 +1289,11 @@ class AsyncReqMessageClient:
         self.serial = salt.payload.Serial(self.opts)
         self.context = zmq.Context()
 
+        # Keep several requests in flight on a DEALER socket, rather than
+        # one at a time on a REQ socket
+        self.pipeline = self.opts.get("request_channel_window", 1) > 1
+        self._message_id = 0
+
         # wire up sockets
         self._init_socket()
 
@@ -1288,7 +1344,13 @@ class AsyncReqMessageClient:
             del self.stream
             del self.socket
 
-        self.socket = self.context.socket(zmq.REQ)
+        if self.pipeline:
+            # The id frame sent in front of the empty delimiter frame is part
+            # of the envelope the REP socket of the MWorker sends back with
+            # its reply, which correlates the replies with the requests
+            self.socket = self.context.socket(zmq.DEALER)
+        else:
+            self.socket = self.context.socket(zmq.REQ)
 
         # socket options
         if hasattr(zmq, "RECONNECT_IVL_MAX"):
@@ -1307,6 +1369,40 @@ class AsyncReqMessageClient:
         self.stream = zmq.eventloop.zmqstream.ZMQStream(
             self.socket, io_loop=self.io_loop
         )
+        if self.pipeline:
+            self.stream.on_recv(self._handle_reply)
+
+    def _handle_reply(self, msg):
+        """
+        Complete the future of the request a reply received on the DEALER
+        socket answers
+        """
+        message_id = msg[0]
+        future = self.send_future_map.pop(message_id, None)
+        if future is None:
+            # Timedout
+            return
+        self.send_queue.remove(message_id)
+        self.remove_message_timeout(message_id)
+        if not future.done():
+            future.set_result(self.serial.loads(msg[-1]))
+
+    def _send_pipelined(self, message, timeout, future):
+        """
+        Send a message on the DEALER socket without waiting for the replies
+        to the messages already in flight
+        """
+        self._message_id += 1
+        message_id = salt.utils.stringutils.to_bytes(str(self._message_id))
+        self.send_future_map[message_id] = future
+        if timeout is not None:
+            send_timeout = self.io_loop.call_later(
+                timeout, self.timeout_message, message, message_id
+            )
+            self.send_timeout_map[message_id] = send_timeout
+        self.send_queue.append(message_id)
+        self.stream.send_multipart([message_id, b"", message])
+        return future
 
     @salt.ext.tornado.gen.coroutine
     def _internal_send_recv(self):
@@ -1346,18 +1442,22 @@ class AsyncReqMessageClient:
             # Hasn't been already timedout
             self.io_loop.remove_timeout(timeout)
 
-    def timeout_message(self, message):
+    def timeout_message(self, message, message_id=None):
         """
         Handle a message timeout by removing it from the sending queue
         and informing the caller
 
         :raises: SaltReqTimeoutError
         """
-        future = self.send_future_map.pop(message, None)
+        # The pipelined messages are tracked by message id
+        key = message if message_id is None else message_id
+        future = self.send_future_map.pop(key, None)
         # In a race condition the message might have been sent by the time
         # we're timing it out. Make sure the future is not None
         if future is not None:
-            del self.send_timeout_map[message]
+            del self.send_timeout_map[key]
+            if message_id is not None:
+                self.send_queue.remove(message_id)
             if future.attempts < future.tries:
                 future.attempts += 1
                 log.debug(
@@ -1392,12 +1492,16 @@ class AsyncReqMessageClient:
                 self.io_loop.add_callback(callback, response)
 
             future.add_done_callback(handle_future)
-        # Add this future to the mapping
-        self.send_future_map[message] = future
 
         if self.opts.get("detect_mode") is True:
             timeout = 1
 
+        if self.pipeline:
+            return self._send_pipelined(message, timeout, future)
+
+        # Add this future to the mapping
+        self.send_future_map[message] = future
+
         if timeout is not None:
             send_timeout = self.io_loop.call_later(
                 timeout, self.timeout_message, message
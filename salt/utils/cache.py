@@ -5,6 +5,7 @@ In-memory caching used by Salt
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
 
+import copy
 import logging
 import os
 import re
@@ -213,6 +214,137 @@ class CacheCli(object):
         return min_list
 
 
+class SharedPillarCacheCli(object):
+    """
+    Connection client for the master-wide pillar cache
+    (:py:class:`salt.utils.master.SharedPillarCache`). Should be used by
+    all the MWorkers so that a pillar compiled by one of them is served to
+    all the others.
+    """
+
+    # Seconds to wait for an answer before compiling the pillar locally
+    timeout = 5
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(self.opts.get("serial", ""))
+        self.cache_sock = os.path.join(self.opts["sock_dir"], "pillar_cache.ipc")
+
+    def _request(self, *frames):
+        """
+        Send a request to the pillar cache, return the frames of the reply or
+        ``None`` if the pillar cache isn't available.
+        """
+        if zmq is None or not os.path.exists(self.cache_sock):
+            return None
+        sock = zmq.Context.instance().socket(zmq.REQ)
+        sock.setsockopt(zmq.LINGER, 0)
+        try:
+            sock.connect("ipc://" + self.cache_sock)
+            sock.send_multipart(frames)
+            if not sock.poll(self.timeout * 1000):
+                log.warning("Timed out waiting for the shared pillar cache")
+                return None
+            return sock.recv_multipart()
+        except zmq.ZMQError as exc:
+            log.error("Error talking to the shared pillar cache: %s", exc)
+            return None
+        finally:
+            sock.close()
+
+    def get(self, minion_id, saltenv, pillarenv):
+        """
+        Return the cached pillar of the minion for the given environments, or
+        ``None`` if it isn't cached.
+        """
+        ret = self._request(
+            self.serial.dumps({"cmd": "get", "key": [minion_id, saltenv, pillarenv]})
+        )
+        if not ret or not ret[0]:
+            return None
+        return self.serial.loads(ret[0])
+
+    def put(self, minion_id, saltenv, pillarenv, pillar):
+        """
+        Cache the pillar of the minion for the given environments
+        """
+        self._request(
+            self.serial.dumps({"cmd": "put", "key": [minion_id, saltenv, pillarenv]}),
+            self.serial.dumps(pillar),
+        )
+
+    def flush(self, minion_id):
+        """
+        Drop all the cached pillars of the minion
+        """
+        self._request(self.serial.dumps({"cmd": "flush", "id": minion_id}))
+
+
+class TopFileCache(object):
+    """
+    Cache of the rendered and merged top files, shared by all the pillar and
+    highstate objects of a process so that the top files are not rendered
+    again for every minion. An entry is only used while the files it was
+    rendered from keep the same hashes on the file server.
+
+    The files are tracked with :py:meth:`track` while the top files are
+    rendered, and the result is stored with :py:meth:`store`.
+    """
+
+    # (kind, options...) -> (sources, data)
+    entries = {}
+    max_entries = 100
+
+    def __init__(self, client):
+        self.client = client
+        self.sources = []
+
+    def _hash(self, url, saltenv):
+        ret = self.client.hash_file(url, saltenv)
+        if not isinstance(ret, dict):
+            return None
+        return ret.get("hsum")
+
+    def track(self, url, saltenv):
+        """
+        Record the hash of a file the top data is rendered from. Top data
+        rendered from a file which can't be located is never cached.
+        """
+        if self.sources is None:
+            return
+        if not url:
+            self.sources = None
+            return
+        self.sources.append((url, saltenv, self._hash(url, saltenv)))
+
+    def get(self, key):
+        """
+        Return a copy of the cached top data, or ``None`` if it is not cached
+        or one of its files changed.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        sources, data = entry
+        for url, saltenv, hsum in sources:
+            if self._hash(url, saltenv) != hsum:
+                log.debug("Top file %s changed in saltenv %s", url, saltenv)
+                self.entries.pop(key, None)
+                return None
+        return copy.deepcopy(data)
+
+    def store(self, key, data):
+        """
+        Cache the top data rendered from the tracked files
+        """
+        if self.sources is None:
+            return
+        if len(self.entries) >= self.max_entries:
+            self.entries.clear()
+        self.entries[key] = (self.sources, copy.deepcopy(data))
+        self.sources = []
+
+
 class CacheRegex(object):
     """
     Create a regular expression object cache for the most frequently
@@ -50,6 +50,7 @@ Namespaced tag
 """
 
 import atexit
+import collections
 import contextlib
 import datetime
 import fnmatch
@@ -99,6 +100,7 @@ TAGS = {
     "cloud": "cloud",  # prefix for all salt/cloud events
     "fileserver": "fileserver",  # prefix for all salt/fileserver events
     "queue": "queue",  # prefix for all salt/queue events
+    "pillar": "pillar",  # prefix for all salt/pillar events
 }
 
 
@@ -111,6 +113,7 @@ def get_event(
     io_loop=None,
     keep_loop=False,
     raise_errors=False,
+    tag_filters=None,
 ):
     """
     Return an event object suitable for the named transport
@@ -119,6 +122,8 @@ def get_event(
                            operation for obtaining events. Eg use of
                            set_event_handler() API. Otherwise, operation
                            will be synchronous.
+    :param list tag_filters: The tag prefixes of the events to listen to, the
+                             event publisher does not send the other events.
     """
     sock_dir = sock_dir or opts["sock_dir"]
     # TODO: AIO core is separate from transport
@@ -130,6 +135,7 @@ def get_event(
             io_loop=io_loop,
             keep_loop=keep_loop,
             raise_errors=raise_errors,
+            tag_filters=tag_filters,
         )
     return SaltEvent(
         node,
@@ -139,17 +145,25 @@ def get_event(
         io_loop=io_loop,
         keep_loop=keep_loop,
         raise_errors=raise_errors,
+        tag_filters=tag_filters,
     )
 
 
-def get_master_event(opts, sock_dir, listen=True, io_loop=None, raise_errors=False):
+def get_master_event(
+    opts, sock_dir, listen=True, io_loop=None, raise_errors=False, tag_filters=None
+):
     """
     Return an event object suitable for the named transport
     """
     # TODO: AIO core is separate from transport
     if opts["transport"] in ("zeromq", "tcp", "detect"):
         return MasterEvent(
-            sock_dir, opts, listen=listen, io_loop=io_loop, raise_errors=raise_errors
+            sock_dir,
+            opts,
+            listen=listen,
+            io_loop=io_loop,
+            raise_errors=raise_errors,
+            tag_filters=tag_filters,
         )
 
 
@@ -199,6 +213,222 @@ def tagify(suffix="", prefix="", base=SALT):
     return TAGPARTER.join([part for part in parts if part])
 
 
+def tagmatch_prefix(tagmatch):
+    """
+    Return the prefix of all the tags matched by a glob or a regular
+    expression as used by salt.utils.stringutils.expr_match, to be passed in
+    the tag_filters of an event listener. An empty string is returned when the
+    expression does not start with a literal prefix.
+    """
+    if "|" in tagmatch:
+        # The alternatives of a regular expression don't share a prefix
+        return ""
+    prefix = []
+    for char in tagmatch:
+        if char in "*?+{[]}()^$.\\":
+            if char in "*?+{" and prefix:
+                # The quantifiers of a regular expression apply to the
+                # previous character
+                prefix.pop()
+            break
+        prefix.append(char)
+    return "".join(prefix)
+
+
+def _event_tag(package):
+    """
+    Return the tag of a packed event without unpacking its data, or None if
+    the package has no tag
+    """
+    if not isinstance(package, bytes):
+        return None
+    mtag, sep, _ = package.partition(salt.utils.stringutils.to_bytes(TAGEND))
+    if not sep:
+        return None
+    try:
+        return salt.utils.stringutils.to_str(mtag)
+    except UnicodeDecodeError:
+        return None
+
+
+class PendingEvents:
+    """
+    The events received by a SaltEvent while it was waiting for other events,
+    kept for the subscriptions they match.
+
+    Each subscription, a search tag and a match function, has its own queue of
+    events, so that an event is checked once against the subscriptions when it
+    is received and a get_event for a subscribed tag takes the first event of
+    its queue. The tags of the ``startswith`` subscriptions are indexed by
+    length, the prefixes of that length of an event tag are looked up in the
+    index instead of matching the event tag against each subscription.
+
+    :param function startswith: The match function of the ``startswith``
+                                subscriptions
+    :param int queue_size: The number of events kept for each subscription,
+                           the oldest events are dropped beyond it. No limit
+                           when 0.
+    """
+
+    def __init__(self, startswith, queue_size=0):
+        self.startswith = startswith
+        self.queue_size = queue_size
+        # The number of times each subscription was made, the sequence
+        # numbers of its events and how many of them are still pending
+        self.subscriptions = {}
+        # The tags of the startswith subscriptions by length
+        self.prefixes = {}
+        # The other subscriptions
+        self.others = []
+        # The pending events by sequence number, with the subscriptions they
+        # are kept for
+        self.events = collections.OrderedDict()
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        for evt, _ in self.events.values():
+            yield evt
+
+    def subscribe(self, tag, match_func):
+        """
+        Add a subscription, a subscription made several times must be
+        removed as many times
+        """
+        key = (tag, match_func)
+        if key in self.subscriptions:
+            self.subscriptions[key][0] += 1
+            return
+        self.subscriptions[key] = [1, collections.deque(), 0]
+        if match_func == self.startswith:
+            self.prefixes.setdefault(len(tag), set()).add(tag)
+        else:
+            self.others.append(key)
+
+    def unsubscribe(self, tag, match_func):
+        """
+        Remove a subscription, the events only kept for it are dropped
+        """
+        key = (tag, match_func)
+        if key not in self.subscriptions:
+            return
+        self.subscriptions[key][0] -= 1
+        if self.subscriptions[key][0] > 0:
+            return
+        _, queue, _ = self.subscriptions.pop(key)
+        if match_func == self.startswith:
+            self.prefixes[len(tag)].discard(tag)
+            if not self.prefixes[len(tag)]:
+                del self.prefixes[len(tag)]
+        else:
+            self.others.remove(key)
+        for seq in queue:
+            if seq in self.events:
+                self._release(seq, key)
+
+    def _release(self, seq, key):
+        """
+        Stop keeping an event for a subscription, the event is dropped when it
+        is not kept for any other
+        """
+        evt, keys = self.events[seq]
+        keys.remove(key)
+        if key in self.subscriptions:
+            self.subscriptions[key][2] -= 1
+        if not keys:
+            log.trace(
+                "get_event() discarding cached event that no longer has any subscriptions = %s",
+                evt,
+            )
+            del self.events[seq]
+
+    def _take(self, seq):
+        """
+        Remove and return a pending event
+        """
+        evt, keys = self.events.pop(seq)
+        for key in keys:
+            subscription = self.subscriptions[key]
+            subscription[2] -= 1
+            # Drop the sequence numbers of the events taken through other
+            # subscriptions once they outnumber the pending ones
+            if len(subscription[1]) > 2 * subscription[2] + 16:
+                subscription[1] = collections.deque(
+                    seq for seq in subscription[1] if seq in self.events
+                )
+        return evt
+
+    def _match(self, tag):
+        """
+        Return the subscriptions matching an event tag
+        """
+        keys = []
+        for length, tags in self.prefixes.items():
+            if tag[:length] in tags:
+                keys.append((tag[:length], self.startswith))
+        for key in self.others:
+            if key[1](tag, key[0]):
+                keys.append(key)
+        return keys
+
+    def add(self, evt):
+        """
+        Keep an event for the subscriptions it matches, return False if it
+        does not match any
+        """
+        keys = self._match(evt["tag"])
+        if not keys:
+            return False
+        self.seq += 1
+        self.events[self.seq] = [evt, keys]
+        for key in keys:
+            subscription = self.subscriptions[key]
+            if self.queue_size and subscription[2] >= self.queue_size:
+                log.warning(
+                    "Dropping the oldest event pending for the subscription to %s, "
+                    "%d events are pending for it",
+                    key[0],
+                    self.queue_size,
+                )
+                seq = subscription[1].popleft()
+                while seq not in self.events:
+                    seq = subscription[1].popleft()
+                self._release(seq, key)
+            subscription[1].append(self.seq)
+            subscription[2] += 1
+        return True
+
+    def pop(self, tag, match_func):
+        """
+        Remove and return the first pending event matching the tag, or None
+        """
+        key = (tag, match_func)
+        if key in self.subscriptions:
+            queue = self.subscriptions[key][1]
+            while queue:
+                seq = queue.popleft()
+                if seq in self.events:
+                    self.events[seq][1].remove(key)
+                    self.subscriptions[key][2] -= 1
+                    return self._take(seq)
+            return None
+        for seq, (evt, _) in self.events.items():
+            if match_func(evt["tag"], tag):
+                return self._take(seq)
+        return None
+
+    def clear(self):
+        """
+        Drop the pending events, the subscriptions are kept
+        """
+        self.events.clear()
+        for subscription in self.subscriptions.values():
+            subscription[1].clear()
+            subscription[2] = 0
+
+
 class SaltEvent:
     """
     Warning! Use the get_event function or the code will not be
@@ -215,6 +445,7 @@ class SaltEvent:
         io_loop=None,
         keep_loop=False,
         raise_errors=False,
+        tag_filters=None,
     ):
         """
         :param IOLoop io_loop: Pass in an io_loop if you want asynchronous
@@ -225,6 +456,11 @@ class SaltEvent:
                                the io loop or destroy it when the event handle
                                is destroyed. This is useful when using event
                                loops from within third party asynchronous code
+        :param list tag_filters: The tag prefixes of the events to listen to,
+                                 registered with the event publisher when
+                                 connecting so that it does not send the other
+                                 events. All the events are received when not
+                                 set.
         """
         self.serial = salt.payload.Serial({"serial": "msgpack"})
         self.keep_loop = keep_loop
@@ -239,6 +475,7 @@ class SaltEvent:
         self.subscriber = None
         self.pusher = None
         self.raise_errors = raise_errors
+        self.tag_filters = tag_filters
 
         if opts is None:
             opts = {}
@@ -256,8 +493,9 @@ class SaltEvent:
         if salt.utils.platform.is_windows() and "ipc_mode" not in opts:
             self.opts["ipc_mode"] = "tcp"
         self.puburi, self.pulluri = self.__load_uri(sock_dir, node)
-        self.pending_tags = []
-        self.pending_events = []
+        self.pending_events = PendingEvents(
+            self._match_tag_startswith, self.opts["event_pending_queue_size"]
+        )
         self.__load_cache_regex()
         if listen and not self.cpub:
             # Only connect to the publisher at initialization time if
@@ -325,7 +563,7 @@ class SaltEvent:
         if tag is None:
             return
         match_func = self._get_match_func(match_type)
-        self.pending_tags.append([tag, match_func])
+        self.pending_events.subscribe(tag, match_func)
 
     def unsubscribe(self, tag, match_type=None):
         """
@@ -334,19 +572,7 @@ class SaltEvent:
         if tag is None:
             return
         match_func = self._get_match_func(match_type)
-
-        try:
-            self.pending_tags.remove([tag, match_func])
-        except ValueError:
-            pass
-
-        old_events = self.pending_events
-        self.pending_events = []
-        for evt in old_events:
-            if any(
-                pmatch_func(evt["tag"], ptag) for ptag, pmatch_func in self.pending_tags
-            ):
-                self.pending_events.append(evt)
+        self.pending_events.unsubscribe(tag, match_func)
 
     def connect_pub(self, timeout=None):
         """
@@ -359,7 +585,7 @@ class SaltEvent:
             with salt.utils.asynchronous.current_ioloop(self.io_loop):
                 if self.subscriber is None:
                     self.subscriber = salt.transport.ipc.IPCMessageSubscriber(
-                        self.puburi, io_loop=self.io_loop
+                        self.puburi, io_loop=self.io_loop, tag_filters=self.tag_filters
                     )
                 try:
                     self.io_loop.run_sync(
@@ -371,7 +597,7 @@ class SaltEvent:
         else:
             if self.subscriber is None:
                 self.subscriber = salt.transport.ipc.IPCMessageSubscriber(
-                    self.puburi, io_loop=self.io_loop
+                    self.puburi, io_loop=self.io_loop, tag_filters=self.tag_filters
                 )
 
             # For the asynchronous case, the connect will be defered to when
@@ -388,7 +614,7 @@ class SaltEvent:
 
         self.subscriber.close()
         self.subscriber = None
-        self.pending_events = []
+        self.pending_events.clear()
         self.cpub = False
 
     def connect_pull(self, timeout=1):
@@ -449,7 +675,7 @@ class SaltEvent:
         return getattr(self, "_match_tag_{}".format(match_type), None)
 
     def _check_pending(self, tag, match_func=None):
-        """Check the pending_events list for events that match the tag
+        """Check the pending_events for an event that matches the tag
 
         :param tag: The tag to search for
         :type tag: str
@@ -459,25 +685,9 @@ class SaltEvent:
         """
         if match_func is None:
             match_func = self._get_match_func()
-        old_events = self.pending_events
-        self.pending_events = []
-        ret = None
-        for evt in old_events:
-            if match_func(evt["tag"], tag):
-                if ret is None:
-                    ret = evt
-                    log.trace("get_event() returning cached event = %s", ret)
-                else:
-                    self.pending_events.append(evt)
-            elif any(
-                pmatch_func(evt["tag"], ptag) for ptag, pmatch_func in self.pending_tags
-            ):
-                self.pending_events.append(evt)
-            else:
-                log.trace(
-                    "get_event() discarding cached event that no longer has any subscriptions = %s",
-                    evt,
-                )
+        ret = self.pending_events.pop(tag, match_func)
+        if ret is not None:
+            log.trace("get_event() returning cached event = %s", ret)
         return ret
 
     @staticmethod
@@ -568,12 +778,8 @@ class SaltEvent:
 
             if not match_func(ret["tag"], tag) or not self._subproxy_match(ret["data"]):
                 # tag not match
-                if any(
-                    pmatch_func(ret["tag"], ptag)
-                    for ptag, pmatch_func in self.pending_tags
-                ):
+                if self.pending_events.add(ret):
                     log.trace("get_event() caching unwanted event = %s", ret)
-                    self.pending_events.append(ret)
                 if wait:  # only update the wait timeout if we had one
                     wait = timeout_at - time.time()
                 continue
@@ -909,6 +1115,7 @@ class MasterEvent(SaltEvent):
         io_loop=None,
         keep_loop=False,
         raise_errors=False,
+        tag_filters=None,
     ):
         super().__init__(
             "master",
@@ -918,6 +1125,7 @@ class MasterEvent(SaltEvent):
             io_loop=io_loop,
             keep_loop=keep_loop,
             raise_errors=raise_errors,
+            tag_filters=tag_filters,
         )
 
 
@@ -1057,7 +1265,7 @@ class AsyncEventPublisher:
         Get something from epull, publish it out epub, and return the package (or None)
         """
         try:
-            self.publisher.publish(package)
+            self.publisher.publish(package, tag=_event_tag(package))
             return package
         # Add an extra fallback in case a forked process leeks through
         except Exception:  # pylint: disable=broad-except
@@ -1164,7 +1372,7 @@ class EventPublisher(salt.utils.process.SignalHandlingProcess):
         Get something from epull, publish it out epub, and return the package (or None)
         """
         try:
-            self.publisher.publish(package)
+            self.publisher.publish(package, tag=_event_tag(package))
             return package
         # Add an extra fallback in case a forked process leeks through
         except Exception:  # pylint: disable=broad-except
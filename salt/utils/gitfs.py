@@ -11,16 +11,20 @@ import glob
 import hashlib
 import logging
 import os
+import posixpath
 import shlex
 import shutil
 import stat
 import subprocess
 import time
 import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import salt.ext.tornado.ioloop
 import salt.fileserver
+import salt.payload
+import salt.utils.atomicfile
 import salt.utils.configparser
 import salt.utils.data
 import salt.utils.files
@@ -51,6 +55,9 @@ GLOBAL_ONLY = ()
 
 SYMLINK_RECURSE_DEPTH = 100
 
+# The number of tree indexes each remote keeps in memory
+TREE_INDEX_CACHE_SIZE = 16
+
 # Auth support (auth params can be global or per-remote, too)
 AUTH_PROVIDERS = ("pygit2",)
 AUTH_PARAMS = ("user", "password", "pubkey", "privkey", "passphrase", "insecure_auth")
@@ -473,6 +480,24 @@ class GitProvider:
             log.critical(msg, exc_info=True)
             failhard(self.role)
 
+        self.shared_objects = None
+        if self.opts.get("git_shared_objects", False) and getattr(
+            self, "gitdir", None
+        ):
+            try:
+                if self.init_shared_objects():
+                    # Attach to the repo again so that it sees the shared objects
+                    self.init_remote()
+            except OSError as exc:
+                log.error(
+                    "Unable to use the shared git object store for %s remote "
+                    "'%s': %s",
+                    self.role,
+                    self.id,
+                    exc,
+                )
+                self.shared_objects = None
+
     def _get_envs_from_ref_paths(self, refs):
         """
         Return the names of remote refs (stripped of the remote name) and tags
@@ -659,6 +684,99 @@ class GitProvider:
                 )
         return cleaned
 
+    def _git(self, *args, **kwargs):
+        """
+        Run a git command in the repo, or in the directory passed as cwd, and
+        return its return code and output
+        """
+        env = os.environ.copy()
+        if not salt.utils.platform.is_windows():
+            env[b"LANGUAGE"] = b"C"
+            env[b"LC_ALL"] = b"C"
+        cmd = subprocess.Popen(
+            ("git",) + args,
+            close_fds=not salt.utils.platform.is_windows(),
+            cwd=kwargs.get("cwd", os.path.dirname(self.gitdir)),
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        output = cmd.communicate()[0].decode(__salt_system_encoding__)
+        if cmd.returncode != 0:
+            log.warning(
+                "Command 'git %s' failed for %s remote '%s':\n%s",
+                " ".join(args),
+                self.role,
+                self.id,
+                output,
+            )
+        return cmd.returncode, output
+
+    def init_shared_objects(self):
+        """
+        Create the object store shared by the git remotes of all the roles if
+        it does not exist, and make the repo borrow its objects. Return True if
+        the alternates of the repo were changed.
+        """
+        store = salt.utils.path.join(self.opts["cachedir"], "git_objects")
+        if not os.path.isdir(salt.utils.path.join(store, "objects")):
+            if not os.path.isdir(store):
+                os.makedirs(store)
+            # Never gc the store, the remotes borrow objects which no ref of
+            # the store may point to anymore.
+            for args in (("init", "--bare", "--quiet"), ("config", "gc.auto", "0")):
+                if self._git(*args, cwd=store)[0] != 0:
+                    raise OSError("Unable to create the store in {}".format(store))
+        self.shared_objects = store
+        objects = salt.utils.path.join(store, "objects")
+        alternates = salt.utils.path.join(self.gitdir, "objects", "info", "alternates")
+        try:
+            with salt.utils.files.fopen(alternates, "r") as fp_:
+                lines = fp_.read().splitlines()
+        except OSError:
+            lines = []
+        if objects in lines:
+            return False
+        lines.append(objects)
+        os.makedirs(os.path.dirname(alternates), exist_ok=True)
+        with salt.utils.files.fopen(alternates, "w") as fp_:
+            fp_.write("\n".join(lines) + "\n")
+        return True
+
+    def shared_refs(self):
+        """
+        Return the commits the refs of the shared object store point to, which
+        are all available to the repo
+        """
+        retcode, output = self._git(
+            "for-each-ref", "--format=%(objectname)", cwd=self.shared_objects
+        )
+        if retcode != 0:
+            return set()
+        return set(output.split())
+
+    def publish_objects(self):
+        """
+        Copy the objects the repo fetched to the shared object store, under
+        refs of its own, and drop the copies of the repo
+        """
+        prefix = "refs/salt/{}/{}".format(self.role, self.cachedir_basename)
+        retcode, _ = self._git(
+            "-c",
+            "gc.auto=0",
+            "fetch",
+            "--quiet",
+            "--prune",
+            "--no-tags",
+            self.gitdir,
+            "+refs/remotes/origin/*:{}/heads/*".format(prefix),
+            "+refs/tags/*:{}/tags/*".format(prefix),
+            cwd=self.shared_objects,
+        )
+        if retcode == 0:
+            # Pack again only the objects the store does not have
+            self._git("repack", "-a", "-d", "-l", "-q")
+
     def clear_lock(self, lock_type="update"):
         """
         Clear update.lk
@@ -817,7 +935,10 @@ class GitProvider:
             with self.gen_lock(lock_type="update"):
                 log.debug("Fetching %s remote '%s'", self.role, self.id)
                 # Run provider-specific fetch code
-                return self._fetch()
+                changed = self._fetch()
+                if changed and self.shared_objects:
+                    self.publish_objects()
+                return changed
         except GitLockError as exc:
             if exc.errno == errno.EEXIST:
                 log.warning(
@@ -1099,6 +1220,140 @@ class GitProvider:
         # No matches found
         return None
 
+    def tree_id(self, tree):
+        """
+        This function must be overridden in a sub-class
+        """
+        raise NotImplementedError()
+
+    def build_tree_index(self, tree):
+        """
+        This function must be overridden in a sub-class
+        """
+        raise NotImplementedError()
+
+    def tree_index(self, tgt_env):
+        """
+        Return the index of the tree of the specified environment, a dict with
+        the path -> [blob id, mode, symlink target] of its files and the list
+        of its dirs. The index of a tree is built once, then kept on disk and
+        in memory until the ref moves to another tree.
+        """
+        tree = self.get_tree(tgt_env)
+        if not tree:
+            return None
+        tree_id = self.tree_id(tree)
+        try:
+            indexes = self._tree_indexes
+        except AttributeError:
+            indexes = self._tree_indexes = OrderedDict()
+        if tree_id in indexes:
+            indexes.move_to_end(tree_id)
+            return indexes[tree_id]
+
+        serial = salt.payload.Serial(self.opts)
+        index_dir = salt.utils.path.join(
+            os.path.dirname(self.cachedir), "tree_index", self.cachedir_basename
+        )
+        index_path = salt.utils.path.join(index_dir, "{}.p".format(tree_id))
+        index = None
+        try:
+            with salt.utils.files.fopen(index_path, "rb") as fp_:
+                index = serial.load(fp_)
+            # Keep the index from being pruned as unused
+            os.utime(index_path)
+        except (OSError, ValueError):
+            pass
+        if not isinstance(index, dict):
+            start = time.time()
+            index = self.build_tree_index(tree)
+            log.debug(
+                "%s remote '%s' indexed tree %s in %s seconds",
+                self.role,
+                self.id,
+                tree_id,
+                time.time() - start,
+            )
+            try:
+                os.makedirs(index_dir, exist_ok=True)
+                with salt.utils.atomicfile.atomic_open(index_path, "wb") as fp_:
+                    fp_.write(serial.dumps(index))
+                # Prune the indexes of the trees no ref used for a day
+                for item in os.listdir(index_dir):
+                    path = salt.utils.path.join(index_dir, item)
+                    if time.time() - os.path.getmtime(path) > 86400:
+                        os.remove(path)
+            except OSError as exc:
+                log.warning(
+                    "Unable to write the tree index of %s remote '%s': %s",
+                    self.role,
+                    self.id,
+                    exc,
+                )
+        indexes[tree_id] = index
+        while len(indexes) > TREE_INDEX_CACHE_SIZE:
+            indexes.popitem(last=False)
+        return index
+
+    def find_blob(self, path, tgt_env):
+        """
+        Return the id and mode of the blob of the specified file in the
+        specified environment from the tree index, following symlinks
+        """
+        index = self.tree_index(tgt_env)
+        if index is None:
+            return None, None
+        for _ in range(SYMLINK_RECURSE_DEPTH):
+            try:
+                blob_id, mode, link_tgt = index["files"][path]
+            except KeyError:
+                return None, None
+            if link_tgt is None:
+                return blob_id, mode
+            path = posixpath.normpath(
+                salt.utils.path.join(
+                    posixpath.dirname(path), link_tgt, use_posixpath=True
+                )
+            )
+        return None, None
+
+    def indexed_file_lists(self, tgt_env):
+        """
+        Return the files, symlinks and dirs of the specified environment from
+        the tree index
+        """
+        files = set()
+        symlinks = {}
+        dirs = set()
+        index = self.tree_index(tgt_env)
+        if index is None:
+            return files, symlinks, dirs
+        root = self.root(tgt_env).strip("/")
+        mountpoint = self.mountpoint(tgt_env)
+
+        def _relpath(path):
+            if not root:
+                return path
+            if path.startswith(root + "/"):
+                return path[len(root) + 1 :]
+            return None
+
+        for path, (_, _, link_tgt) in index["files"].items():
+            relpath = _relpath(path)
+            if relpath is None:
+                continue
+            file_path = salt.utils.path.join(mountpoint, relpath, use_posixpath=True)
+            files.add(file_path)
+            if link_tgt is not None:
+                symlinks[file_path] = link_tgt
+        for path in index["dirs"]:
+            relpath = _relpath(path)
+            if relpath is not None:
+                dirs.add(salt.utils.path.join(mountpoint, relpath, use_posixpath=True))
+        if mountpoint:
+            dirs.add(mountpoint)
+        return files, symlinks, dirs
+
     def get_url(self):
         """
         Examine self.id and assign self.url (and self.branch, for git_pillar)
@@ -1449,6 +1704,31 @@ class GitPython(GitProvider):
             return blob, blob.hexsha, blob.mode
         return None, None, None
 
+    def tree_id(self, tree):
+        """
+        Return the SHA of a git.Tree object
+        """
+        return tree.hexsha
+
+    def build_tree_index(self, tree):
+        """
+        Index the files and dirs of a git.Tree object
+        """
+        files = {}
+        dirs = []
+        for obj in tree.traverse():
+            if isinstance(obj, git.Tree):
+                dirs.append(obj.path)
+            elif isinstance(obj, git.Blob):
+                link_tgt = None
+                if stat.S_ISLNK(obj.mode):
+                    stream = six.BytesIO()
+                    obj.stream_data(stream)
+                    link_tgt = salt.utils.stringutils.to_str(stream.getvalue())
+                    stream.close()
+                files[obj.path] = [obj.hexsha, obj.mode, link_tgt]
+        return {"files": files, "dirs": dirs}
+
     def get_tree_from_branch(self, ref):
         """
         Return a git.Tree object matching a head ref fetched into
@@ -1847,6 +2127,18 @@ class Pygit2(GitProvider):
         local copy was already up-to-date, return False.
         """
         origin = self.repo.remotes[0]
+        seeded_refs = salt.utils.path.join(self.gitdir, "refs", "salt-alternates")
+        if self.shared_objects:
+            # libgit2 does not tell the remote about the commits of the
+            # alternates, point temporary refs to them so that the objects the
+            # shared object store already has are not fetched again
+            os.makedirs(seeded_refs, exist_ok=True)
+            for oid in self.shared_refs():
+                if oid in self.repo:
+                    with salt.utils.files.fopen(
+                        salt.utils.path.join(seeded_refs, oid), "w"
+                    ) as fp_:
+                        fp_.write(oid + "\n")
         refs_pre = self.repo.listall_references()
         fetch_kwargs = {}
         # pygit2 radically changed fetchiing in 0.23.2
@@ -1863,6 +2155,7 @@ class Pygit2(GitProvider):
         try:
             fetch_results = origin.fetch(**fetch_kwargs)
         except GitError as exc:  # pylint: disable=broad-except
+            shutil.rmtree(seeded_refs, ignore_errors=True)
             exc_str = get_error_message(exc).lower()
             if "unsupported url protocol" in exc_str and isinstance(
                 self.credentials, pygit2.Keypair
@@ -1910,6 +2203,7 @@ class Pygit2(GitProvider):
         else:
             log.debug("%s remote '%s' is up-to-date", self.role, self.id)
         refs_post = self.repo.listall_references()
+        shutil.rmtree(seeded_refs, ignore_errors=True)
         cleaned = self.clean_stale_refs(local_refs=refs_post)
         return True if (received_objects or refs_pre != refs_post or cleaned) else None
 
@@ -2015,6 +2309,38 @@ class Pygit2(GitProvider):
             return blob, blob.hex, mode
         return None, None, None
 
+    def tree_id(self, tree):
+        """
+        Return the SHA of a pygit2.Tree object
+        """
+        return tree.hex
+
+    def build_tree_index(self, tree):
+        """
+        Index the files and dirs of a pygit2.Tree object
+        """
+        files = {}
+        dirs = []
+
+        def _traverse(tree, prefix):
+            for entry in iter(tree):
+                if entry.oid not in self.repo:
+                    # Entry is a submodule, skip it
+                    continue
+                obj = self.repo[entry.oid]
+                path = salt.utils.path.join(prefix, entry.name, use_posixpath=True)
+                if isinstance(obj, pygit2.Blob):
+                    link_tgt = None
+                    if stat.S_ISLNK(entry.filemode):
+                        link_tgt = salt.utils.stringutils.to_str(obj.data)
+                    files[path] = [obj.hex, entry.filemode, link_tgt]
+                elif isinstance(obj, pygit2.Tree):
+                    dirs.append(path)
+                    _traverse(obj, path)
+
+        _traverse(tree, "")
+        return {"files": files, "dirs": dirs}
+
     def get_tree_from_branch(self, ref):
         """
         Return a pygit2.Tree object matching a head ref fetched into
@@ -2444,7 +2770,7 @@ class GitBase:
                 pass
         to_remove = []
         for item in cachedir_ls:
-            if item in ("hash", "refs"):
+            if item in ("hash", "refs", "tree_index", "blob_hash"):
                 continue
             path = salt.utils.path.join(self.cache_root, item)
             if os.path.isdir(path):
@@ -2466,6 +2792,28 @@ class GitBase:
                     log.debug("%s removed old cachedir %s", self.role, rdir)
         for fdir in failed:
             to_remove.remove(fdir)
+        if self.opts.get("git_shared_objects", False):
+            # The objects of the removed remotes stay in the shared object
+            # store, but its refs no longer offer them to the other remotes
+            for rdir in to_remove:
+                shutil.rmtree(
+                    salt.utils.path.join(
+                        self.opts["cachedir"],
+                        "git_objects",
+                        "refs",
+                        "salt",
+                        self.role,
+                        os.path.basename(rdir),
+                    ),
+                    ignore_errors=True,
+                )
+        for rdir in to_remove:
+            shutil.rmtree(
+                salt.utils.path.join(
+                    self.cache_root, "tree_index", os.path.basename(rdir)
+                ),
+                ignore_errors=True,
+            )
         ret = bool(to_remove)
         if ret:
             self.write_remote_map()
@@ -2523,28 +2871,36 @@ class GitBase:
             )
             remotes = []
 
-        changed = False
+        def _fetch(repo):
+            try:
+                return repo.fetch()
+            except Exception as exc:  # pylint: disable=broad-except
+                log.error(
+                    "Exception caught while fetching %s remote '%s': %s",
+                    self.role,
+                    repo.id,
+                    exc,
+                    exc_info=True,
+                )
+                return False
+
+        to_fetch = []
         for repo in self.remotes:
             name = getattr(repo, "name", None)
             if not remotes or (repo.id, name) in remotes or name in remotes:
-                try:
-                    if repo.fetch():
-                        # We can't just use the return value from repo.fetch()
-                        # because the data could still have changed if old
-                        # remotes were cleared above. Additionally, we're
-                        # running this in a loop and later remotes without
-                        # changes would override this value and make it
-                        # incorrect.
-                        changed = True
-                except Exception as exc:  # pylint: disable=broad-except
-                    log.error(
-                        "Exception caught while fetching %s remote '%s': %s",
-                        self.role,
-                        repo.id,
-                        exc,
-                        exc_info=True,
-                    )
-        return changed
+                to_fetch.append(repo)
+
+        workers = max(self.opts.get("git_fetch_workers", 1), 1)
+        if workers > 1 and len(to_fetch) > 1:
+            # The remotes have a repo and an update lock of their own, fetch
+            # several of them at once
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_fetch, to_fetch))
+        else:
+            results = [_fetch(repo) for repo in to_fetch]
+        # We can't just use the return value from repo.fetch() because the
+        # data could still have changed if old remotes were cleared above.
+        return any(results)
 
     def lock(self, remote=None):
         """
@@ -2873,6 +3229,8 @@ class GitFS(GitBase):
                 cache_root=cache_root,
                 init_remotes=init_remotes,
             )
+            # Hashes of the blobs served, by (blob id, hash type)
+            obj._blob_hashes = {}
             if not init_remotes:
                 log.debug("Created gitfs object with uninitialized remotes")
             else:
@@ -2970,9 +3328,17 @@ class GitFS(GitBase):
             if repo.root(tgt_env):
                 repo_path = salt.utils.path.join(repo.root(tgt_env), repo_path)
 
-            blob, blob_hexsha, blob_mode = repo.find_file(repo_path, tgt_env)
-            if blob is None:
-                continue
+            if self.opts.get("gitfs_tree_index", False):
+                # Only read the blob if the cached copy is out of date
+                blob = None
+                blob_hexsha, blob_mode = repo.find_blob(repo_path, tgt_env)
+                if blob_hexsha is None:
+                    continue
+            else:
+                blob, blob_hexsha, blob_mode = repo.find_file(repo_path, tgt_env)
+                if blob is None:
+                    continue
+            fnd["blob"] = blob_hexsha
 
             def _add_file_stat(fnd, mode):
                 """
@@ -3009,6 +3375,8 @@ class GitFS(GitBase):
                 except Exception:  # pylint: disable=broad-except
                     pass
             # Write contents of file to their destination in the FS cache
+            if blob is None:
+                blob = repo.find_file(repo_path, tgt_env)[0]
             repo.write_file(blob, dest)
             with salt.utils.files.fopen(blobshadest, "w+") as fp_:
                 fp_.write(blob_hexsha)
@@ -3069,14 +3437,29 @@ class GitFS(GitBase):
         ret = {"hash_type": self.opts["hash_type"]}
         relpath = fnd["rel"]
         path = fnd["path"]
-        hashdest = salt.utils.path.join(
-            self.hash_cachedir,
-            load["saltenv"],
-            "{}.hash.{}".format(relpath, self.opts["hash_type"]),
-        )
+        if self.opts.get("gitfs_tree_index", False) and fnd.get("blob"):
+            # The hash of a blob never changes, share it across envs and paths
+            key = (fnd["blob"], self.opts["hash_type"])
+            if key in self._blob_hashes:
+                ret["hsum"] = self._blob_hashes[key]
+                return ret
+            hashdest = salt.utils.path.join(
+                self.cache_root,
+                "blob_hash",
+                "{}.{}".format(fnd["blob"], self.opts["hash_type"]),
+            )
+        else:
+            key = None
+            hashdest = salt.utils.path.join(
+                self.hash_cachedir,
+                load["saltenv"],
+                "{}.hash.{}".format(relpath, self.opts["hash_type"]),
+            )
         try:
             with salt.utils.files.fopen(hashdest, "rb") as fp_:
                 ret["hsum"] = fp_.read()
+            if key is not None:
+                self._blob_hashes[key] = ret["hsum"]
             return ret
         except OSError as exc:
             if exc.errno != errno.ENOENT:
@@ -3091,6 +3474,8 @@ class GitFS(GitBase):
         ret["hsum"] = salt.utils.hashutils.get_hash(path, self.opts["hash_type"])
         with salt.utils.files.fopen(hashdest, "w+") as fp_:
             fp_.write(ret["hsum"])
+        if key is not None:
+            self._blob_hashes[key] = ret["hsum"]
         return ret
 
     def _file_lists(self, load, form):
@@ -3130,10 +3515,18 @@ class GitFS(GitBase):
                     or repo.fallback
                 ):
                     start = time.time()
-                    repo_files, repo_symlinks = repo.file_list(load["saltenv"])
+                    if self.opts.get("gitfs_tree_index", False):
+                        (
+                            repo_files,
+                            repo_symlinks,
+                            repo_dirs,
+                        ) = repo.indexed_file_lists(load["saltenv"])
+                    else:
+                        repo_files, repo_symlinks = repo.file_list(load["saltenv"])
+                        repo_dirs = repo.dir_list(load["saltenv"])
                     ret["files"].update(repo_files)
                     ret["symlinks"].update(repo_symlinks)
-                    ret["dirs"].update(repo.dir_list(load["saltenv"]))
+                    ret["dirs"].update(repo_dirs)
                     log.profile(
                         "gitfs file_name cache rebuild repo=%s duration=%s seconds",
                         repo.id,
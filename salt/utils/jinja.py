@@ -53,6 +53,9 @@ class SaltCacheLoader(BaseLoader):
 
     _cached_pillar_client = None
     _cached_client = None
+    # When set to a list, the (url, saltenv) of the templates loaded from the
+    # file server are appended to it, so that their changes can be tracked
+    loaded_templates = None
 
     @classmethod
     def shutdown(cls):
@@ -160,6 +163,10 @@ class SaltCacheLoader(BaseLoader):
                 raise TemplateNotFound(template)
 
         self.check_cache(_template)
+        if SaltCacheLoader.loaded_templates is not None and not self.pillar_rend:
+            SaltCacheLoader.loaded_templates.append(
+                (salt.utils.url.create(_template), self.saltenv)
+            )
 
         if environment and template:
             tpldir = os.path.dirname(_template).replace("\\", "/")
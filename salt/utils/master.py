@@ -7,30 +7,41 @@
 """
 
 
+import base64
+import hashlib
+import hmac
 import logging
 import os
 import signal
-from threading import Event, Thread
+import socket
+import time
+from threading import Event, Lock, Thread
 
 import salt.cache
 import salt.client
 import salt.config
+import salt.fileserver
 import salt.log
 import salt.payload
 import salt.pillar
 import salt.utils.atomicfile
 import salt.utils.files
+import salt.utils.json
 import salt.utils.minions
 import salt.utils.platform
+import salt.utils.process
 import salt.utils.stringutils
 import salt.utils.verify
 from salt.exceptions import SaltException
 from salt.utils.cache import CacheCli as cache_cli
-from salt.utils.process import Process
+from salt.utils.process import Process, SignalHandlingProcess
 from salt.utils.zeromq import zmq
 
 log = logging.getLogger(__name__)
 
+# How long a minion can use a token to fetch a file from the sendfile server
+SENDFILE_TOKEN_TTL = 60
+
 
 def get_running_jobs(opts):
     """
@@ -203,10 +214,14 @@ class MasterPillarUtil:
             return mine_data
         if not minion_ids:
             minion_ids = self.cache.list("minions")
+        minion_ids = [
+            minion_id
+            for minion_id in minion_ids
+            if salt.utils.verify.valid_id(self.opts, minion_id)
+        ]
+        cdata = self.cache.fetch_many("minions", minion_ids, "mine")
         for minion_id in minion_ids:
-            if not salt.utils.verify.valid_id(self.opts, minion_id):
-                continue
-            mdata = self.cache.fetch("minions/{}".format(minion_id), "mine")
+            mdata = cdata.get(minion_id)
             if isinstance(mdata, dict):
                 mine_data[minion_id] = mdata
         return mine_data
@@ -223,10 +238,14 @@ class MasterPillarUtil:
             return grains, pillars
         if not minion_ids:
             minion_ids = self.cache.list("minions")
+        minion_ids = [
+            minion_id
+            for minion_id in minion_ids
+            if salt.utils.verify.valid_id(self.opts, minion_id)
+        ]
+        cdata = self.cache.fetch_many("minions", minion_ids, "data")
         for minion_id in minion_ids:
-            if not salt.utils.verify.valid_id(self.opts, minion_id):
-                continue
-            mdata = self.cache.fetch("minions/{}".format(minion_id), "data")
+            mdata = cdata.get(minion_id, {})
             if not isinstance(mdata, dict):
                 log.warning(
                     "cache.fetch should always return a dict. ReturnedType: %s, MinionId: %s",
@@ -839,6 +858,407 @@ class ConnectedCache(Process):
         log.debug("ConCache Shutting down")
 
 
+class MinionDataIndexServer(SignalHandlingProcess):
+    """
+    Keeps the grains and pillar of the minion data cache in an in-memory
+    :py:class:`salt.utils.minions.MinionDataIndex` and answers grain and
+    pillar targeting queries from the MWorkers. The MWorkers push the data
+    they store in the minion data cache to this process, so the index is
+    updated incrementally instead of re-reading the cache.
+    """
+
+    def __init__(self, opts, **kwargs):
+        super().__init__(**kwargs)
+        self.opts = opts
+        self.req_sock = os.path.join(self.opts["sock_dir"], "minion_index.ipc")
+        self.upd_sock = os.path.join(self.opts["sock_dir"], "minion_index_upd.ipc")
+        self.index = salt.utils.minions.MinionDataIndex()
+        self.running = True
+
+    # __setstate__ and __getstate__ are only used on Windows.
+    # We do this so that __init__ will be invoked on Windows in the child
+    # process so that a register_after_fork() equivalent will work on Windows.
+    def __setstate__(self, state):
+        self.__init__(
+            state["opts"],
+            log_queue=state["log_queue"],
+            log_queue_level=state["log_queue_level"],
+        )
+
+    def __getstate__(self):
+        return {
+            "opts": self.opts,
+            "log_queue": self.log_queue,
+            "log_queue_level": self.log_queue_level,
+        }
+
+    def _handle_signals(self, signum, sigframe):
+        self.running = False
+        self.cleanup()
+        super()._handle_signals(signum, sigframe)
+
+    def cleanup(self):
+        """
+        remove sockets on shutdown
+        """
+        for sock in (self.req_sock, self.upd_sock):
+            if os.path.exists(sock):
+                os.remove(sock)
+
+    def load(self):
+        """
+        Index the whole minion data cache
+        """
+        cache = salt.cache.factory(self.opts)
+        try:
+            for minion_id, data in cache.list_with_data("minions", "data"):
+                self.index.update(minion_id, data)
+        except SaltException as exc:
+            # Don't let one unreadable entry leave the index half loaded, go
+            # through the minions one at a time and skip the broken ones.
+            log.warning("Unable to bulk load the minion data cache: %s", exc)
+            for minion_id in cache.list("minions"):
+                try:
+                    data = cache.fetch("minions/{}".format(minion_id), "data")
+                except SaltException as exc:
+                    log.warning(
+                        "Unable to read the minion data cache of %s: %s",
+                        minion_id,
+                        exc,
+                    )
+                    continue
+                self.index.update(minion_id, data)
+        log.info("Minion data index loaded %d minions", len(self.index))
+
+    def handle_update(self, load):
+        """
+        Apply an update sent by a MWorker
+        """
+        if not isinstance(load, dict) or "id" not in load:
+            log.error("Minion data index received a malformed update")
+            return
+        if load.get("cmd") == "update":
+            self.index.update(load["id"], load.get("data"))
+        elif load.get("cmd") == "remove":
+            self.index.remove(load["id"])
+
+    def handle_request(self, load):
+        """
+        Answer a targeting query
+        """
+        if not isinstance(load, dict) or load.pop("cmd", None) != "check":
+            return None
+        if load.get("greedy", True):
+            load["accepted"] = self.ckminions._pki_minions()
+        return self.index.check(**load)
+
+    def run(self):
+        """
+        Load the minion data cache and serve queries until shut down
+        """
+        salt.utils.process.appendproctitle(self.__class__.__name__)
+        serial = salt.payload.Serial(self.opts)
+        self.ckminions = salt.utils.minions.CkMinions(self.opts)
+        self.cleanup()
+
+        context = zmq.Context()
+        # Bind the update socket first so that nothing stored while the cache
+        # is being loaded gets lost
+        upd_in = context.socket(zmq.PULL)
+        upd_in.setsockopt(zmq.LINGER, 100)
+        upd_in.bind("ipc://" + self.upd_sock)
+        os.chmod(self.upd_sock, 0o600)
+
+        self.load()
+
+        # Clients fall back to scanning the cache until this socket exists
+        req_in = context.socket(zmq.REP)
+        req_in.setsockopt(zmq.LINGER, 100)
+        req_in.bind("ipc://" + self.req_sock)
+        os.chmod(self.req_sock, 0o600)
+
+        poller = zmq.Poller()
+        poller.register(req_in, zmq.POLLIN)
+        poller.register(upd_in, zmq.POLLIN)
+
+        while self.running:
+            try:
+                socks = dict(poller.poll(1000))
+            except zmq.ZMQError as exc:
+                log.error("Minion data index ZeroMQ error: %s", exc)
+                break
+
+            # Apply the pending updates before answering queries
+            if socks.get(upd_in) == zmq.POLLIN:
+                while True:
+                    try:
+                        msg = upd_in.recv(zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    self.handle_update(serial.loads(msg))
+
+            if socks.get(req_in) == zmq.POLLIN:
+                try:
+                    ret = self.handle_request(serial.loads(req_in.recv()))
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("Error while querying the minion data index")
+                    ret = None
+                req_in.send(serial.dumps(ret))
+
+        self.cleanup()
+        req_in.close()
+        upd_in.close()
+        context.term()
+
+
+class SharedPillarCache(SignalHandlingProcess):
+    """
+    Master-wide pillar cache used when ``pillar_cache_backend`` is set to
+    ``shared``. The MWorkers store the pillars they compile here and look
+    them up through :py:class:`salt.utils.cache.SharedPillarCacheCli`, so a
+    pillar is only compiled once for all of them. Pillars are kept per
+    minion, saltenv and pillarenv for ``pillar_cache_ttl`` seconds.
+    """
+
+    def __init__(self, opts, **kwargs):
+        super().__init__(**kwargs)
+        self.opts = opts
+        self.cache_sock = os.path.join(self.opts["sock_dir"], "pillar_cache.ipc")
+        self.ttl = self.opts["pillar_cache_ttl"]
+        # (minion_id, saltenv, pillarenv) -> [timestamp, serialized pillar]
+        self.cache = {}
+        self.running = True
+
+    # __setstate__ and __getstate__ are only used on Windows.
+    # We do this so that __init__ will be invoked on Windows in the child
+    # process so that a register_after_fork() equivalent will work on Windows.
+    def __setstate__(self, state):
+        self.__init__(
+            state["opts"],
+            log_queue=state["log_queue"],
+            log_queue_level=state["log_queue_level"],
+        )
+
+    def __getstate__(self):
+        return {
+            "opts": self.opts,
+            "log_queue": self.log_queue,
+            "log_queue_level": self.log_queue_level,
+        }
+
+    def _handle_signals(self, signum, sigframe):
+        self.running = False
+        self.cleanup()
+        super()._handle_signals(signum, sigframe)
+
+    def cleanup(self):
+        """
+        remove sockets on shutdown
+        """
+        if os.path.exists(self.cache_sock):
+            os.remove(self.cache_sock)
+
+    def sweep(self):
+        """
+        Drop the expired pillars
+        """
+        cutoff = time.time() - self.ttl
+        for key in [key for key, val in self.cache.items() if val[0] < cutoff]:
+            del self.cache[key]
+
+    def handle_request(self, frames, serial):
+        """
+        Serve a request of a MWorker, the pillars are stored and returned in
+        their serialized form.
+        """
+        load = serial.loads(frames[0])
+        if not isinstance(load, dict):
+            return b""
+        cmd = load.get("cmd")
+        if cmd == "get":
+            entry = self.cache.get(tuple(load["key"]))
+            if entry is None or entry[0] < time.time() - self.ttl:
+                return b""
+            return entry[1]
+        if cmd == "put" and len(frames) > 1:
+            self.cache[tuple(load["key"])] = [time.time(), frames[1]]
+        elif cmd == "flush":
+            for key in [key for key in self.cache if key[0] == load["id"]]:
+                del self.cache[key]
+        return b""
+
+    def run(self):
+        """
+        Serve the pillar cache until shut down
+        """
+        salt.utils.process.appendproctitle(self.__class__.__name__)
+        serial = salt.payload.Serial(self.opts.get("serial", ""))
+        self.cleanup()
+
+        context = zmq.Context()
+        cache_in = context.socket(zmq.REP)
+        cache_in.setsockopt(zmq.LINGER, 100)
+        cache_in.bind("ipc://" + self.cache_sock)
+        os.chmod(self.cache_sock, 0o600)
+
+        last_sweep = time.time()
+        while self.running:
+            try:
+                ready = cache_in.poll(1000)
+            except zmq.ZMQError as exc:
+                log.error("Shared pillar cache ZeroMQ error: %s", exc)
+                break
+            if ready:
+                try:
+                    ret = self.handle_request(cache_in.recv_multipart(), serial)
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("Error while serving the shared pillar cache")
+                    ret = b""
+                cache_in.send(ret)
+            if time.time() - last_sweep > 60:
+                self.sweep()
+                last_sweep = time.time()
+
+        self.cleanup()
+        cache_in.close()
+        context.term()
+
+
+def sendfile_token(key, saltenv, path, ttl=SENDFILE_TOKEN_TTL):
+    """
+    Return a token, signed with key, which lets a minion fetch the file at the
+    fileserver path of saltenv from the sendfile server for ttl seconds
+    """
+    payload = base64.urlsafe_b64encode(
+        salt.utils.stringutils.to_bytes(
+            salt.utils.json.dumps(
+                {"saltenv": saltenv, "path": path, "expires": int(time.time() + ttl)}
+            )
+        )
+    )
+    signature = hmac.new(key, payload, hashlib.sha256).hexdigest()
+    return "{}.{}".format(salt.utils.stringutils.to_unicode(payload), signature)
+
+
+def check_sendfile_token(key, token):
+    """
+    Return the saltenv and the fileserver path of the file a token signed with
+    key gives access to, or None if the token is invalid or expired
+    """
+    try:
+        payload, signature = salt.utils.stringutils.to_bytes(token).split(b".")
+        expected = salt.utils.stringutils.to_bytes(
+            hmac.new(key, payload, hashlib.sha256).hexdigest()
+        )
+        if not hmac.compare_digest(signature, expected):
+            return None
+        data = salt.utils.json.loads(
+            salt.utils.stringutils.to_unicode(base64.urlsafe_b64decode(payload))
+        )
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("expires", 0) < time.time():
+        return None
+    if not isinstance(data.get("saltenv"), str) or not isinstance(
+        data.get("path"), str
+    ):
+        return None
+    return data["saltenv"], data["path"]
+
+
+class FileserverSendfile(SignalHandlingProcess):
+    """
+    Streams the files matching ``fileserver_sendfile`` to the minions with
+    sendfile, on a dedicated TCP port, so that large transfers do not keep the
+    MWorkers busy. A minion gets a token for a file from an MWorker with the
+    ``_file_sendfile`` command, then sends the token and the offset to start
+    from to this process, which answers with the content of the file. The
+    content is not encrypted, the minion checks it against the hash of the
+    file.
+
+    The tokens are signed with the ``sendfile`` secret of the master, which
+    unlike the AES key is never sent to the minions. The file of a token is
+    looked up in the fileserver again, and must still match
+    ``fileserver_sendfile``.
+    """
+
+    def __init__(self, opts, secrets, **kwargs):
+        super().__init__(**kwargs)
+        self.opts = opts
+        self.secrets = secrets
+        self.fs_ = None
+        self.fs_lock = Lock()
+
+    # __setstate__ and __getstate__ are only used on Windows.
+    # We do this so that __init__ will be invoked on Windows in the child
+    # process so that a register_after_fork() equivalent will work on Windows.
+    def __setstate__(self, state):
+        self.__init__(
+            state["opts"],
+            state["secrets"],
+            log_queue=state["log_queue"],
+            log_queue_level=state["log_queue_level"],
+        )
+
+    def __getstate__(self):
+        return {
+            "opts": self.opts,
+            "secrets": self.secrets,
+            "log_queue": self.log_queue,
+            "log_queue_level": self.log_queue_level,
+        }
+
+    def handle(self, conn, addr):
+        """
+        Stream the file of the token a minion sent
+        """
+        with conn:
+            conn.settimeout(60)
+            request = b""
+            try:
+                while not request.endswith(b"\n"):
+                    data = conn.recv(4096)
+                    if not data or len(request) > 4096:
+                        return
+                    request += data
+                token, loc = salt.utils.stringutils.to_unicode(request).split()
+                loc = int(loc)
+            except (OSError, ValueError):
+                return
+            grant = check_sendfile_token(
+                self.secrets["sendfile"]["secret"].value, token
+            )
+            if grant is None:
+                log.warning("Rejected a bad sendfile token from %s", addr)
+                return
+            with self.fs_lock:
+                if self.fs_ is None:
+                    self.fs_ = salt.fileserver.Fileserver(self.opts)
+                path = self.fs_.sendfile_path({"saltenv": grant[0], "path": grant[1]})
+            if not path:
+                log.warning("Rejected a sendfile token from %s: %s", addr, grant)
+                return
+            try:
+                with salt.utils.files.fopen(path, "rb") as fp_:
+                    conn.sendfile(fp_, offset=loc)
+            except OSError as exc:
+                log.debug("Unable to send %s to %s: %s", path, addr, exc)
+
+    def run(self):
+        """
+        Accept the connections of the minions
+        """
+        salt.utils.process.appendproctitle(self.__class__.__name__)
+        family = socket.AF_INET6 if self.opts.get("ipv6") else socket.AF_INET
+        server = socket.socket(family, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.opts["interface"], self.opts["fileserver_sendfile_port"]))
+        server.listen(128)
+        while True:
+            conn, addr = server.accept()
+            Thread(target=self.handle, args=(conn, addr), daemon=True).start()
+
+
 def ping_all_connected_minions(opts):
     if opts["minion_data_cache"]:
         tgt = list(salt.utils.minions.CkMinions(opts).connected_ids())
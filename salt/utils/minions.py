@@ -8,11 +8,13 @@ import fnmatch
 import logging
 import os
 import re
+import time
 
 import salt.auth.ldap
 import salt.cache
 import salt.payload
 import salt.roster
+import salt.utils.atomicfile
 import salt.utils.data
 import salt.utils.files
 import salt.utils.network
@@ -21,6 +23,8 @@ import salt.utils.versions
 from salt._compat import ipaddress
 from salt.defaults import DEFAULT_TARGET_DELIM
 from salt.exceptions import CommandExecutionError, SaltCacheError
+from salt.utils.odict import OrderedDict
+from salt.utils.zeromq import zmq
 
 HAS_RANGE = False
 try:
@@ -32,6 +36,10 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+# Maximum number of compiled compound expressions and of cached compound term
+# results kept by each CkMinions instance
+COMPOUND_CACHE_SIZE = 1000
+
 TARGET_REX = re.compile(
     r"""(?x)
         (
@@ -197,6 +205,435 @@ def nodegroup_comp(nodegroup, nodegroups, skip=None, first_call=True):
         return ret
 
 
+def _compound_tokens(expr, nodegroups):
+    """
+    Split a compound expression into operators and ``(engine, pattern,
+    delimiter)`` terms, expanding nodegroups in place
+    """
+    opers = ("and", "or", "not", "(", ")")
+    if isinstance(expr, str):
+        words = expr.split()
+    else:
+        # we make a shallow copy in order to not affect the passed in arg
+        words = list(expr)
+
+    tokens = []
+    while words:
+        word = words.pop(0)
+        if word in opers:
+            tokens.append(word)
+            continue
+        target_info = parse_target(word)
+        if target_info and target_info["engine"]:
+            if "N" == target_info["engine"]:
+                # if we encounter a node group, just evaluate it in-place
+                decomposed = nodegroup_comp(target_info["pattern"], nodegroups)
+                if decomposed:
+                    words = decomposed + words
+                continue
+            if target_info["engine"] not in "GPIJLSER":
+                # If an unknown engine is called at any time, fail out
+                log.error(
+                    'Unrecognized target engine "%s" for target expression "%s"',
+                    target_info["engine"],
+                    word,
+                )
+                return None
+            tokens.append(
+                (
+                    target_info["engine"],
+                    target_info["pattern"],
+                    target_info["delimiter"],
+                )
+            )
+        else:
+            tokens.append((None, word, None))
+    return tokens
+
+
+def compile_compound(expr, nodegroups=None):
+    """
+    Compile a compound target expression into a tree of tuples which can be
+    evaluated with set operations:
+
+    - ``("or", <left>, <right>)``
+    - ``("and", <left>, <right>)``
+    - ``("not", <node>)``
+    - ``("term", <engine>, <pattern>, <delimiter>, <ignore_missing>)``
+
+    ``and`` binds tighter than ``or`` and ``not`` applies to the term or the
+    parenthesized group which follows it, as with the compound matcher. A
+    ``not`` which does not follow an operator implies an ``and``, and
+    unclosed parentheses are closed at the end of the expression. Returns
+    ``None`` if the expression is invalid.
+    """
+    tokens = _compound_tokens(expr, nodegroups or {})
+    if tokens is None:
+        return None
+    pos = [0]
+
+    def _peek():
+        return tokens[pos[0]] if pos[0] < len(tokens) else None
+
+    def _next():
+        token = _peek()
+        pos[0] += 1
+        return token
+
+    def _primary():
+        token = _next()
+        if token == "(":
+            node = _or()
+            if _peek() == ")":
+                _next()
+            elif _peek() is not None:
+                raise ValueError("unexpected {!r}".format(_peek()))
+            return node
+        if token is None or isinstance(token, str):
+            raise ValueError("unexpected {!r}".format(token))
+        return ("term",) + token + (False,)
+
+    def _unary():
+        if _peek() == "not":
+            _next()
+            grouped = _peek() == "("
+            node = _primary()
+            if not grouped and node[1] == "L":
+                # ignore missing minions for lists if we exclude them
+                node = node[:4] + (True,)
+            return ("not", node)
+        return _primary()
+
+    def _and():
+        node = _unary()
+        while _peek() in ("and", "not"):
+            if _peek() == "and":
+                _next()
+            node = ("and", node, _unary())
+        return node
+
+    def _or():
+        node = _and()
+        while _peek() == "or":
+            _next()
+            node = ("or", node, _and())
+        return node
+
+    try:
+        if not tokens:
+            raise ValueError("empty expression")
+        compiled = _or()
+        if _peek() is not None:
+            raise ValueError("unexpected {!r}".format(_peek()))
+    except ValueError as exc:
+        log.error("Invalid compound expr %s: %s", expr, exc)
+        return None
+    return compiled
+
+
+class MinionDataIndex:
+    """
+    In-memory inverted index of the grains and pillar data found in the
+    minion data cache.
+
+    Scalar values (and members of lists of scalars) are indexed by their key
+    path, so exact, glob and regex lookups only need to look at the distinct
+    values of a path instead of every minion. Minions whose data cannot be
+    represented that way (a dict at the looked up path, lists holding dicts,
+    non-string keys) are verified with :py:func:`salt.utils.data.subdict_match`
+    against the data held in memory, so the results are the same as a full
+    scan of the minion data cache.
+    """
+
+    SEARCH_TYPES = ("grains", "pillar")
+
+    def __init__(self):
+        # {<minion id>: {"grains": {...}, "pillar": {...}}}
+        self.data = {}
+        # {<search type>: {<path>: {<value>: set(<minion id>)}}}
+        self._values = {search_type: {} for search_type in self.SEARCH_TYPES}
+        # {<search type>: {<path>: set(<minion id>)}}
+        self._dicts = {search_type: {} for search_type in self.SEARCH_TYPES}
+        # {<search type>: {<top level key>: set(<minion id>)}}
+        self._complex = {search_type: {} for search_type in self.SEARCH_TYPES}
+        # {<minion id>: [(<table>, <path>, <value>), ...]}
+        self._entries = {}
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, minion_id):
+        return minion_id in self.data
+
+    def update(self, minion_id, data):
+        """
+        Replace the indexed data of ``minion_id`` with ``data``, the dict
+        stored in the ``data`` key of the ``minions/<minion id>`` cache bank.
+        """
+        self.remove(minion_id)
+        if not data:
+            return
+        self.data[minion_id] = data
+        entries = self._entries[minion_id] = []
+        for search_type in self.SEARCH_TYPES:
+            tree = data.get(search_type)
+            if isinstance(tree, dict):
+                self._walk(minion_id, search_type, (), tree, entries)
+
+    def remove(self, minion_id):
+        """
+        Drop ``minion_id`` from the index
+        """
+        self.data.pop(minion_id, None)
+        for table, path, value in self._entries.pop(minion_id, ()):
+            if value is None:
+                ids = table.get(path)
+                if ids is not None:
+                    ids.discard(minion_id)
+                    if not ids:
+                        del table[path]
+                continue
+            values = table.get(path)
+            if values is None:
+                continue
+            ids = values.get(value)
+            if ids is not None:
+                ids.discard(minion_id)
+                if not ids:
+                    del values[value]
+            if not values:
+                del table[path]
+
+    def _add(self, table, path, value, minion_id, entries):
+        if value is None:
+            table.setdefault(path, set()).add(minion_id)
+        else:
+            table.setdefault(path, {}).setdefault(value, set()).add(minion_id)
+        entries.append((table, path, value))
+
+    def _walk(self, minion_id, search_type, path, node, entries):
+        if isinstance(node, dict):
+            if path:
+                self._add(self._dicts[search_type], path, None, minion_id, entries)
+            for key, val in node.items():
+                if not isinstance(key, str):
+                    # traverse_dict_and_list reaches these by YAML-loading the
+                    # target, leave them to subdict_match
+                    top = path[0] if path else str(key)
+                    self._add(
+                        self._complex[search_type], top, None, minion_id, entries
+                    )
+                    continue
+                self._walk(minion_id, search_type, path + (key,), val, entries)
+        elif isinstance(node, (list, tuple)):
+            if any(isinstance(item, (dict, list, tuple)) for item in node):
+                self._add(
+                    self._complex[search_type], path[0], None, minion_id, entries
+                )
+                return
+            values = self._values[search_type]
+            length = len(node)
+            for idx, item in enumerate(node):
+                value = self._normalize(item)
+                self._add(values, path, value, minion_id, entries)
+                # Positional lookups, i.e. 'ipv4:0' or 'ipv4:-1'
+                self._add(values, path + (str(idx),), value, minion_id, entries)
+                self._add(
+                    values, path + (str(idx - length),), value, minion_id, entries
+                )
+        else:
+            self._add(
+                self._values[search_type],
+                path,
+                self._normalize(node),
+                minion_id,
+                entries,
+            )
+
+    @staticmethod
+    def _normalize(value):
+        try:
+            return str(value).lower()
+        except UnicodeDecodeError:
+            return salt.utils.stringutils.to_unicode(value).lower()
+
+    def match(
+        self,
+        search_type,
+        expr,
+        delimiter=DEFAULT_TARGET_DELIM,
+        regex_match=False,
+        exact_match=False,
+    ):
+        """
+        Return the set of indexed minion ids whose ``search_type`` data
+        matches ``expr``, with the same semantics as
+        :py:func:`salt.utils.data.subdict_match`.
+        """
+        splits = expr.split(delimiter)
+        if len(splits) == 1:
+            return set()
+
+        if splits[0] == "*":
+            # Matching against every top level key, nothing to narrow down
+            verify = set(self.data)
+        else:
+            verify = set(self._complex[search_type].get(splits[0], ()))
+
+        values = self._values[search_type]
+        dicts = self._dicts[search_type]
+        matched = set()
+        for idx in range(len(splits) - 1, 0, -1):
+            path = tuple(splits[:idx])
+            verify.update(dicts.get(path, ()))
+            path_values = values.get(path)
+            if not path_values:
+                continue
+            pattern = self._normalize(delimiter.join(splits[idx:]))
+            if regex_match:
+                try:
+                    regex = re.compile(pattern)
+                except Exception:  # pylint: disable=broad-except
+                    log.error("Invalid regex '%s' in match", pattern)
+                    continue
+                for value, ids in path_values.items():
+                    if regex.match(value):
+                        matched.update(ids)
+            elif exact_match or not any(char in pattern for char in "*?["):
+                matched.update(path_values.get(pattern, ()))
+            else:
+                for value, ids in path_values.items():
+                    if fnmatch.fnmatch(value, pattern):
+                        matched.update(ids)
+
+        verify.difference_update(matched)
+        for minion_id in verify:
+            if salt.utils.data.subdict_match(
+                self.data[minion_id].get(search_type),
+                expr,
+                delimiter=delimiter,
+                regex_match=regex_match,
+                exact_match=exact_match,
+            ):
+                matched.add(minion_id)
+        return matched
+
+    def check(
+        self,
+        search_type,
+        expr,
+        delimiter=DEFAULT_TARGET_DELIM,
+        greedy=True,
+        regex_match=False,
+        exact_match=False,
+        accepted=None,
+    ):
+        """
+        Return the minions matching ``expr`` in the format of
+        :py:meth:`CkMinions._check_cache_minions`.
+
+        If ``greedy``, ``accepted`` is the list of accepted minion ids, and
+        the accepted minions which are not indexed are returned as well.
+        """
+        matched = self.match(
+            search_type,
+            expr,
+            delimiter=delimiter,
+            regex_match=regex_match,
+            exact_match=exact_match,
+        )
+        if greedy:
+            if not self.data:
+                return {"minions": list(accepted or []), "missing": []}
+            minions = [
+                id_ for id_ in accepted or [] if id_ in matched or id_ not in self.data
+            ]
+        else:
+            minions = list(matched)
+        return {"minions": minions, "missing": []}
+
+
+class MinionDataIndexClient:
+    """
+    Connection client for the minion data index process
+    (:py:class:`salt.utils.master.MinionDataIndexServer`)
+    """
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(self.opts)
+        self.req_sock = os.path.join(self.opts["sock_dir"], "minion_index.ipc")
+        self.upd_sock = os.path.join(self.opts["sock_dir"], "minion_index_upd.ipc")
+        self.timeout = self.opts.get("minion_data_index_timeout", 5)
+        self._context = None
+        self._upd_out = None
+
+    @property
+    def context(self):
+        if self._context is None:
+            self._context = zmq.Context()
+        return self._context
+
+    def _push(self, load):
+        if zmq is None:
+            return
+        if self._upd_out is None:
+            self._upd_out = self.context.socket(zmq.PUSH)
+            self._upd_out.setsockopt(zmq.LINGER, 1000)
+            self._upd_out.setsockopt(zmq.SNDHWM, 10000)
+            self._upd_out.connect("ipc://" + self.upd_sock)
+        try:
+            self._upd_out.send(self.serial.dumps(load), zmq.NOBLOCK)
+        except zmq.ZMQError as exc:
+            log.debug("Unable to send update to the minion data index: %s", exc)
+
+    def update(self, minion_id, data):
+        """
+        Send fresh minion data cache contents of ``minion_id`` to the index
+        """
+        self._push({"cmd": "update", "id": minion_id, "data": data})
+
+    def remove(self, minion_id):
+        """
+        Drop ``minion_id`` from the index
+        """
+        self._push({"cmd": "remove", "id": minion_id})
+
+    def check(self, **kwargs):
+        """
+        Query the index, the keyword arguments are passed to
+        :py:meth:`MinionDataIndex.check`. Return ``None`` if the index is not
+        available, so that the caller can fall back to scanning the cache.
+        """
+        if zmq is None or not os.path.exists(self.req_sock):
+            return None
+        sock = self.context.socket(zmq.REQ)
+        sock.setsockopt(zmq.LINGER, 0)
+        try:
+            sock.connect("ipc://" + self.req_sock)
+            sock.send(self.serial.dumps(dict(kwargs, cmd="check")))
+            if not sock.poll(self.timeout * 1000):
+                log.warning(
+                    "Timed out waiting for the minion data index, scanning the "
+                    "minion data cache instead"
+                )
+                return None
+            return self.serial.loads(sock.recv())
+        except zmq.ZMQError as exc:
+            log.error("Error querying the minion data index: %s", exc)
+            return None
+        finally:
+            sock.close()
+
+    def destroy(self):
+        if self._upd_out is not None:
+            self._upd_out.close()
+            self._upd_out = None
+        if self._context is not None:
+            self._context.term()
+            self._context = None
+
+
 class CkMinions:
     """
     Used to check what minions should respond from a target
@@ -211,12 +648,24 @@ class CkMinions:
         self.opts = opts
         self.serial = salt.payload.Serial(opts)
         self.cache = salt.cache.factory(opts)
+        self._index = None
+        self._compiled_compound = OrderedDict()
+        self._compound_terms = OrderedDict()
         # TODO: this is actually an *auth* check
         if self.opts.get("transport", "zeromq") in ("zeromq", "tcp"):
             self.acc = "minions"
         else:
             self.acc = "accepted"
 
+    @property
+    def index(self):
+        """
+        Client of the master's minion data index
+        """
+        if self._index is None:
+            self._index = MinionDataIndexClient(self.opts)
+        return self._index
+
     def _check_nodegroup_minions(self, expr, greedy):  # pylint: disable=unused-argument
         """
         Return minions found by looking at nodegroups
@@ -297,6 +746,18 @@ class CkMinions:
         """
         cache_enabled = self.opts.get("minion_data_cache", False)
 
+        if cache_enabled and self.opts.get("minion_data_index", False):
+            ret = self.index.check(
+                search_type=search_type,
+                expr=expr,
+                delimiter=delimiter,
+                greedy=greedy,
+                regex_match=regex_match,
+                exact_match=exact_match,
+            )
+            if ret is not None:
+                return ret
+
         def list_cached_minions():
             return self.cache.list("minions")
 
@@ -322,10 +783,11 @@ class CkMinions:
             if not cminions:
                 return {"minions": minions, "missing": []}
             minions = set(minions)
+            if greedy:
+                cminions = [id_ for id_ in cminions if id_ in minions]
+            cdata = self.cache.fetch_many("minions", cminions, "data")
             for id_ in cminions:
-                if greedy and id_ not in minions:
-                    continue
-                mdata = self.cache.fetch("minions/{}".format(id_), "data")
+                mdata = cdata.get(id_)
                 if mdata is None:
                     if not greedy:
                         minions.remove(id_)
@@ -413,8 +875,9 @@ class CkMinions:
             proto = "ipv{}".format(tgt.version)
 
             minions = set(minions)
+            cdata = self.cache.fetch_many("minions", cminions, "data")
             for id_ in cminions:
-                mdata = self.cache.fetch("minions/{}".format(id_), "data")
+                mdata = cdata.get(id_)
                 if mdata is None:
                     if not greedy:
                         minions.remove(id_)
@@ -483,147 +946,141 @@ class CkMinions:
         minions = set(self._pki_minions())
         log.debug("minions: %s", minions)
 
-        nodegroups = self.opts.get("nodegroups", {})
+        if not self.opts.get("minion_data_cache", False):
+            return {"minions": list(minions), "missing": []}
 
-        if self.opts.get("minion_data_cache", False):
+        cache_key = expr if isinstance(expr, str) else tuple(expr)
+        try:
+            compiled = self._compiled_compound[cache_key]
+        except KeyError:
+            compiled = compile_compound(expr, self.opts.get("nodegroups", {}))
+            if len(self._compiled_compound) >= COMPOUND_CACHE_SIZE:
+                self._compiled_compound.popitem(last=False)
+            self._compiled_compound[cache_key] = compiled
+        if compiled is None:
+            return {"minions": [], "missing": []}
+
+        missing = []
+        ctx = {
+            "minions": minions,
+            "greedy": greedy,
+            "pillar_exact": pillar_exact,
+            "missing": missing,
+            "stamp": self._compound_stamp(),
+        }
+        log.debug("Evaluating compiled compound matching expr: %s", compiled)
+        return {"minions": list(self._eval_compound(compiled, ctx)), "missing": missing}
+
+    def _eval_compound(self, node, ctx):
+        """
+        Evaluate a compiled compound expression into a set of minion ids
+        """
+        oper = node[0]
+        if oper == "and":
+            return self._eval_compound(node[1], ctx) & self._eval_compound(
+                node[2], ctx
+            )
+        if oper == "or":
+            return self._eval_compound(node[1], ctx) | self._eval_compound(
+                node[2], ctx
+            )
+        if oper == "not":
+            return ctx["minions"] - self._eval_compound(node[1], ctx)
+        return self._check_compound_term(node, ctx)
+
+    def _check_compound_term(self, node, ctx):
+        """
+        Return the set of minions matched by a single compound term, served
+        from the term cache when ``compound_cache`` is enabled
+        """
+        _, engine, pattern, delimiter, ignore_missing = node
+        cache_enabled = self.opts.get("compound_cache", False)
+        if cache_enabled:
+            cache_key = node + (ctx["greedy"], ctx["pillar_exact"])
+            # Only the data based engines depend on the minion data cache
+            stamp = ctx["stamp"]
+            if engine not in ("G", "P", "I", "J", "S"):
+                stamp = stamp[:1]
+            cached = self._compound_terms.get(cache_key)
+            if (
+                cached is not None
+                and cached[0] == stamp
+                and time.time() - cached[1] < self.opts.get("compound_cache_ttl", 60)
+            ):
+                ctx["missing"].extend(cached[2]["missing"])
+                return set(cached[2]["minions"])
+
+        if engine is None:
+            # The match is not explicitly defined, evaluate as a glob
+            ret = self._check_glob_minions(pattern, True)
+        else:
             ref = {
                 "G": self._check_grain_minions,
                 "P": self._check_grain_pcre_minions,
                 "I": self._check_pillar_minions,
                 "J": self._check_pillar_pcre_minions,
                 "L": self._check_list_minions,
-                "N": None,  # nodegroups should already be expanded
                 "S": self._check_ipcidr_minions,
                 "E": self._check_pcre_minions,
                 "R": self._all_minions,
             }
-            if pillar_exact:
+            if ctx["pillar_exact"]:
                 ref["I"] = self._check_pillar_exact_minions
                 ref["J"] = self._check_pillar_exact_minions
+            engine_args = [pattern]
+            if engine in ("G", "P", "I", "J"):
+                engine_args.append(delimiter or ":")
+            engine_args.append(ctx["greedy"])
+            # ignore missing minions for lists if we exclude them with
+            # a 'not'
+            if engine == "L":
+                engine_args.append(ignore_missing)
+            ret = ref[engine](*engine_args)
 
-            results = []
-            unmatched = []
-            opers = ["and", "or", "not", "(", ")"]
-            missing = []
-
-            if isinstance(expr, str):
-                words = expr.split()
-            else:
-                # we make a shallow copy in order to not affect the passed in arg
-                words = expr[:]
-
-            while words:
-                word = words.pop(0)
-                target_info = parse_target(word)
-
-                # Easy check first
-                if word in opers:
-                    if results:
-                        if results[-1] == "(" and word in ("and", "or"):
-                            log.error('Invalid beginning operator after "(": %s', word)
-                            return {"minions": [], "missing": []}
-                        if word == "not":
-                            if not results[-1] in ("&", "|", "("):
-                                results.append("&")
-                            results.append("(")
-                            results.append(str(set(minions)))
-                            results.append("-")
-                            unmatched.append("-")
-                        elif word == "and":
-                            results.append("&")
-                        elif word == "or":
-                            results.append("|")
-                        elif word == "(":
-                            results.append(word)
-                            unmatched.append(word)
-                        elif word == ")":
-                            if not unmatched or unmatched[-1] != "(":
-                                log.error(
-                                    "Invalid compound expr (unexpected "
-                                    "right parenthesis): %s",
-                                    expr,
-                                )
-                                return {"minions": [], "missing": []}
-                            results.append(word)
-                            unmatched.pop()
-                            if unmatched and unmatched[-1] == "-":
-                                results.append(")")
-                                unmatched.pop()
-                        else:  # Won't get here, unless oper is added
-                            log.error("Unhandled oper in compound expr: %s", expr)
-                            return {"minions": [], "missing": []}
-                    else:
-                        # seq start with oper, fail
-                        if word == "not":
-                            results.append("(")
-                            results.append(str(set(minions)))
-                            results.append("-")
-                            unmatched.append("-")
-                        elif word == "(":
-                            results.append(word)
-                            unmatched.append(word)
-                        else:
-                            log.error(
-                                "Expression may begin with" " binary operator: %s", word
-                            )
-                            return {"minions": [], "missing": []}
-
-                elif target_info and target_info["engine"]:
-                    if "N" == target_info["engine"]:
-                        # if we encounter a node group, just evaluate it in-place
-                        decomposed = nodegroup_comp(target_info["pattern"], nodegroups)
-                        if decomposed:
-                            words = decomposed + words
-                        continue
-
-                    engine = ref.get(target_info["engine"])
-                    if not engine:
-                        # If an unknown engine is called at any time, fail out
-                        log.error(
-                            'Unrecognized target engine "%s" for'
-                            ' target expression "%s"',
-                            target_info["engine"],
-                            word,
-                        )
-                        return {"minions": [], "missing": []}
-
-                    engine_args = [target_info["pattern"]]
-                    if target_info["engine"] in ("G", "P", "I", "J"):
-                        engine_args.append(target_info["delimiter"] or ":")
-                    engine_args.append(greedy)
-
-                    # ignore missing minions for lists if we exclude them with
-                    # a 'not'
-                    if "L" == target_info["engine"]:
-                        engine_args.append(results and results[-1] == "-")
-                    _results = engine(*engine_args)
-                    results.append(str(set(_results["minions"])))
-                    missing.extend(_results["missing"])
-                    if unmatched and unmatched[-1] == "-":
-                        results.append(")")
-                        unmatched.pop()
+        if cache_enabled:
+            if len(self._compound_terms) >= COMPOUND_CACHE_SIZE:
+                self._compound_terms.popitem(last=False)
+            self._compound_terms[cache_key] = (stamp, time.time(), ret)
+        ctx["missing"].extend(ret["missing"])
+        return set(ret["minions"])
 
-                else:
-                    # The match is not explicitly defined, evaluate as a glob
-                    _results = self._check_glob_minions(word, True)
-                    results.append(str(set(_results["minions"])))
-                    if unmatched and unmatched[-1] == "-":
-                        results.append(")")
-                        unmatched.pop()
-
-            # Add a closing ')' for each item left in unmatched
-            results.extend([")" for item in unmatched])
-
-            results = " ".join(results)
-            log.debug("Evaluating final compound matching expr: %s", results)
+    def _compound_stamp(self):
+        """
+        Return a token which changes whenever keys are accepted or deleted and
+        whenever the minion data cache is written, used to invalidate the
+        cached compound term results
+        """
+        if not self.opts.get("compound_cache", False):
+            return None
+        stamp = []
+        for path in (
+            os.path.join(self.opts["pki_dir"], self.acc),
+            os.path.join(self.opts["cachedir"], ".minion_data_stamp"),
+        ):
             try:
-                minions = list(eval(results))  # pylint: disable=W0123
-                return {"minions": minions, "missing": missing}
-            except Exception:  # pylint: disable=broad-except
-                log.error("Invalid compound target: %s", expr)
-                return {"minions": [], "missing": []}
+                stat = os.stat(path)
+                stamp.append((stat.st_ino, stat.st_mtime_ns))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
 
-        return {"minions": list(minions), "missing": []}
+    def minion_data_updated(self, minion_id, data):
+        """
+        Notify the targeting caches that ``data`` has been stored in the minion
+        data cache of ``minion_id``
+        """
+        if self.opts.get("minion_data_index", False):
+            self.index.update(minion_id, data)
+        if self.opts.get("compound_cache", False):
+            # Replace the stamp file so that its inode changes even when two
+            # writes land within the resolution of the filesystem timestamps
+            try:
+                with salt.utils.atomicfile.atomic_open(
+                    os.path.join(self.opts["cachedir"], ".minion_data_stamp"), "wb"
+                ) as fp_:
+                    fp_.write(salt.utils.stringutils.to_bytes(minion_id))
+            except OSError as exc:
+                log.error("Unable to update the minion data stamp file: %s", exc)
 
     def connected_ids(self, subset=None, show_ip=False):
         """
@@ -645,16 +1102,25 @@ class CkMinions:
                 addrs.update(set(salt.utils.network.ip_addrs6(include_loopback=False)))
             if subset:
                 search = subset
+            try:
+                cdata = self.cache.fetch_many("minions", search, "data")
+            except SaltCacheError:
+                # A single unreadable data.p file fails the whole bulk fetch,
+                # fall back to fetching minion by minion so it can be skipped.
+                cdata = None
             for id_ in search:
-                try:
-                    mdata = self.cache.fetch("minions/{}".format(id_), "data")
-                except SaltCacheError:
-                    # If a SaltCacheError is explicitly raised during the fetch operation,
-                    # permission was denied to open the cached data.p file. Continue on as
-                    # in the releases <= 2016.3. (An explicit error raise was added in PR
-                    # #35388. See issue #36867 for more information.
-                    continue
-                if mdata is None:
+                if cdata is not None:
+                    mdata = cdata.get(id_)
+                else:
+                    try:
+                        mdata = self.cache.fetch("minions/{}".format(id_), "data")
+                    except SaltCacheError:
+                        # If a SaltCacheError is explicitly raised during the fetch operation,
+                        # permission was denied to open the cached data.p file. Continue on as
+                        # in the releases <= 2016.3. (An explicit error raise was added in PR
+                        # #35388. See issue #36867 for more information.
+                        continue
+                if not mdata:
                     continue
                 grains = mdata.get("grains", {})
                 for ipv4 in grains.get("ipv4", []):
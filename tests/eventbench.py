@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+The eventbench script times the retrieval of pending events by a SaltEvent
+subscribed to many jobs, as LocalClient.get_iter_returns does, against the
+linear scan of the pending events it replaced
+"""
+
+import optparse
+import time
+
+import salt.utils.event
+
+
+def parse():
+    """
+    Parse the cli options
+    """
+    parser = optparse.OptionParser()
+    parser.add_option(
+        "-e",
+        "--events",
+        dest="events",
+        default=10000,
+        type="int",
+        help="The number of pending events",
+    )
+    parser.add_option(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        default=1000,
+        type="int",
+        help="The number of subscribed jobs the events are returns of",
+    )
+    parser.add_option(
+        "-c",
+        "--calls",
+        dest="calls",
+        default=100,
+        type="int",
+        help="The number of events retrieved from the pending events",
+    )
+
+    options, _ = parser.parse_args()
+    return options.__dict__
+
+
+def tags(opts):
+    """
+    Return the subscribed tags and the tags of the pending events
+    """
+    jids = ["2020010100000{:07d}".format(num) for num in range(opts["jobs"])]
+    subscriptions = ["salt/job/{}".format(jid) for jid in jids]
+    events = [
+        "salt/job/{}/ret/minion{}".format(jids[num % len(jids)], num)
+        for num in range(opts["events"])
+    ]
+    return subscriptions, events
+
+
+def run_linear(opts):
+    """
+    Return the time taken to cache the events and to retrieve some of them
+    with the former linear scan of the pending events
+    """
+    subscriptions, events = tags(opts)
+    match = salt.utils.event.SaltEvent._match_tag_startswith
+    pending_tags = [[tag, match] for tag in subscriptions]
+    pending_events = []
+    start = time.time()
+    for tag in events:
+        if any(pmatch(tag, ptag) for ptag, pmatch in pending_tags):
+            pending_events.append({"tag": tag, "data": {}})
+    for num in range(opts["calls"]):
+        tag = subscriptions[num % len(subscriptions)]
+        old_events = pending_events
+        pending_events = []
+        ret = None
+        for evt in old_events:
+            if match(evt["tag"], tag):
+                if ret is None:
+                    ret = evt
+                else:
+                    pending_events.append(evt)
+            elif any(pmatch(evt["tag"], ptag) for ptag, pmatch in pending_tags):
+                pending_events.append(evt)
+    return time.time() - start
+
+
+def run_indexed(opts):
+    """
+    Return the time taken to cache the events and to retrieve some of them
+    with the subscription index of SaltEvent
+    """
+    subscriptions, events = tags(opts)
+    event = salt.utils.event.SaltEvent("master", listen=False)
+    for tag in subscriptions:
+        event.subscribe(tag)
+    start = time.time()
+    for tag in events:
+        event.pending_events.add({"tag": tag, "data": {}})
+    for num in range(opts["calls"]):
+        event._check_pending(subscriptions[num % len(subscriptions)])
+    return time.time() - start
+
+
+def main():
+    opts = parse()
+    print(
+        "{} pending events of {} subscribed jobs, {} retrieved".format(
+            opts["events"], opts["jobs"], opts["calls"]
+        )
+    )
+    print("linear scan: {:.3f}s".format(run_linear(opts)))
+    print("subscription index: {:.3f}s".format(run_indexed(opts)))
+
+
+if __name__ == "__main__":
+    main()
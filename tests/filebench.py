@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+The filebench script times the transfer of a file from a running local master
+by the RemoteClient of a minion whose key the master accepted, with each of the
+passed request_channel_window settings. The file is fetched again on every
+run, so a large file gives the throughput of the transfer.
+"""
+
+import optparse
+import os
+import shutil
+import tempfile
+import time
+
+import salt.config
+import salt.fileclient
+
+
+def parse():
+    """
+    Parse the cli options
+    """
+    parser = optparse.OptionParser(usage="%prog [options] salt://path/to/file")
+    parser.add_option(
+        "-c",
+        "--config-dir",
+        dest="config_dir",
+        default="/etc/salt",
+        help="The config dir of the minion fetching the file",
+    )
+    parser.add_option(
+        "-w",
+        "--windows",
+        dest="windows",
+        default="1,2,4,8,16",
+        help="The comma separated request_channel_window settings to time",
+    )
+    parser.add_option(
+        "-r",
+        "--runs",
+        dest="runs",
+        default=3,
+        type="int",
+        help="The number of transfers to time for each setting",
+    )
+
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error("A salt:// path is required")
+    options.path = args[0]
+    return options.__dict__
+
+
+def run(opts, window):
+    """
+    Return the average duration of a transfer with the passed
+    request_channel_window and the size of the file
+    """
+    minion_opts = salt.config.minion_config(
+        os.path.join(opts["config_dir"], "minion")
+    )
+    minion_opts["request_channel_window"] = window
+    client = salt.fileclient.get_file_client(minion_opts)
+    dest_dir = tempfile.mkdtemp()
+    try:
+        dest = os.path.join(dest_dir, "file")
+        elapsed = 0
+        for _ in range(opts["runs"]):
+            start = time.time()
+            if not client.get_file(opts["path"], dest):
+                raise SystemExit("Unable to fetch {}".format(opts["path"]))
+            elapsed += time.time() - start
+            size = os.path.getsize(dest)
+            os.remove(dest)
+        return elapsed / opts["runs"], size
+    finally:
+        client.destroy()
+        shutil.rmtree(dest_dir, ignore_errors=True)
+
+
+def main():
+    opts = parse()
+    for window in [int(window) for window in opts["windows"].split(",")]:
+        duration, size = run(opts, window)
+        print(
+            "request_channel_window {}: {:.3f}s, {:.1f} MB/s".format(
+                window, duration, size / duration / 1024 / 1024
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+The pubbench script times the encryption and signing of publish payloads by
+the ZeroMQ publish channel: once per publish with a new crypticle and signing
+key as before, once per publish with the cached ones, and once per batch of
+publishes as the publish daemon does when pub_batch_window is set
+"""
+
+import optparse
+import os
+import shutil
+import tempfile
+import time
+
+import salt.config
+import salt.crypt
+import salt.master
+import salt.transport.zeromq
+from tests.support.mock import MagicMock, patch
+
+
+def parse():
+    """
+    Parse the cli options
+    """
+    parser = optparse.OptionParser()
+    parser.add_option(
+        "-p",
+        "--publishes",
+        dest="publishes",
+        default=1000,
+        type="int",
+        help="The number of publishes",
+    )
+    parser.add_option(
+        "-b",
+        "--batch",
+        dest="batch",
+        default=50,
+        type="int",
+        help="The number of publishes collected in a batch",
+    )
+    parser.add_option(
+        "--no-sign",
+        dest="sign",
+        default=True,
+        action="store_false",
+        help="Do not sign the publishes",
+    )
+
+    options, _ = parser.parse_args()
+    return options.__dict__
+
+
+def loads(opts):
+    """
+    Return the loads of the publishes
+    """
+    return [
+        {
+            "fun": "test.ping",
+            "arg": [],
+            "tgt": "*",
+            "tgt_type": "glob",
+            "jid": "2020010100000{:07d}".format(num),
+            "ret": "",
+            "user": "root",
+        }
+        for num in range(opts["publishes"])
+    ]
+
+
+def run_uncached(channel, opts):
+    """
+    Return the time taken to package the publishes with a new crypticle and
+    signing key for each
+    """
+    start = time.time()
+    for load in loads(opts):
+        crypticle = salt.crypt.Crypticle(
+            channel.opts, salt.master.SMaster.secrets["aes"]["secret"].value
+        )
+        payload = {"enc": "aes", "load": crypticle.dumps(load)}
+        if channel.opts["sign_pub_messages"]:
+            payload["sig"] = salt.crypt.sign_message(
+                os.path.join(channel.opts["pki_dir"], "master.pem"), payload["load"]
+            )
+        channel.serial.dumps(payload)
+    return time.time() - start
+
+
+def run_cached(channel, opts):
+    """
+    Return the time taken to package the publishes with the cached crypticle
+    and signing key
+    """
+    start = time.time()
+    for load in loads(opts):
+        channel.serial.dumps(channel._package_pub(load))
+    return time.time() - start
+
+
+def run_batched(channel, opts):
+    """
+    Return the time taken to package the publishes in batches
+    """
+    packages = [{"load": load} for load in loads(opts)]
+    start = time.time()
+    for num in range(0, len(packages), opts["batch"]):
+        channel._batch_packages(packages[num : num + opts["batch"]])
+    return time.time() - start
+
+
+def main():
+    opts = parse()
+    pki_dir = tempfile.mkdtemp()
+    try:
+        salt.crypt.gen_keys(pki_dir, "master", 2048)
+        master_opts = dict(
+            salt.config.DEFAULT_MASTER_OPTS.copy(),
+            pki_dir=pki_dir,
+            sign_pub_messages=opts["sign"],
+        )
+        channel = salt.transport.zeromq.ZeroMQPubServerChannel(master_opts)
+        secret = MagicMock(value=salt.crypt.Crypticle.generate_key_string())
+        with patch.dict(salt.master.SMaster.secrets, {"aes": {"secret": secret}}):
+            print(
+                "{} publishes, signed: {}, batches of {}".format(
+                    opts["publishes"], opts["sign"], opts["batch"]
+                )
+            )
+            for name, run in (
+                ("uncached", run_uncached),
+                ("cached", run_cached),
+                ("batched", run_batched),
+            ):
+                elapsed = run(channel, opts)
+                print(
+                    "{}: {:.3f}s, {:.0f} publishes/s".format(
+                        name, elapsed, opts["publishes"] / elapsed
+                    )
+                )
+    finally:
+        shutil.rmtree(pki_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import salt.ext.tornado.gen
+import salt.ext.tornado.ioloop
+import salt.transport.client
+
+
+class WindowedReqChannel(salt.transport.client.ReqChannel):
+    """
+    A request channel replying to each load after the loads sent after it
+    """
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @salt.ext.tornado.gen.coroutine
+    def send(self, load, tries=3, timeout=60, raw=False):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        yield salt.ext.tornado.gen.sleep(0.01 / load)
+        self.in_flight -= 1
+        raise salt.ext.tornado.gen.Return(load * 10)
+
+
+def test_send_many():
+    io_loop = salt.ext.tornado.ioloop.IOLoop()
+    try:
+        channel = WindowedReqChannel({"request_channel_window": 3})
+        ret = io_loop.run_sync(lambda: channel.send_many(list(range(1, 11))))
+        assert ret == [num * 10 for num in range(1, 11)]
+        assert channel.max_in_flight == 3
+
+        channel = WindowedReqChannel({})
+        ret = io_loop.run_sync(lambda: channel.send_many([1, 2, 3]))
+        assert ret == [10, 20, 30]
+        assert channel.max_in_flight == 1
+
+        ret = io_loop.run_sync(lambda: channel.send_many([1, 2, 3], window=2))
+        assert channel.max_in_flight == 2
+    finally:
+        io_loop.close()
@@ -2,6 +2,7 @@ import socket
 
 import attr
 import pytest
+import salt.config
 import salt.exceptions
 import salt.transport.tcp
 from salt.ext.tornado import concurrent, gen, ioloop
@@ -249,3 +250,50 @@ def test_tcp_pub_server_channel_publish_filtering_str_list(temp_salt_master):
 
         # verify it was correctly calling check_minions
         check_minions.assert_called_with("minion02", tgt_type="list")
+
+
+def test_tcp_pub_server_channel_publish_targets():
+    opts = dict(
+        salt.config.DEFAULT_MASTER_OPTS.copy(),
+        tcp_pub_filtering=True,
+        minion_data_cache=True,
+    )
+    channel = salt.transport.tcp.TCPPubServerChannel(opts)
+    with patch.object(
+        channel.ckminions, "check_minions", return_value={"minions": ["minion01"]}
+    ) as check_minions:
+        for tgt_type in ("glob", "pcre", "grain", "grain_pcre"):
+            load = {"tgt_type": tgt_type, "tgt": "minion0*"}
+            assert channel._publish_targets(load) == ["minion01"]
+            check_minions.assert_called_with("minion0*", tgt_type=tgt_type)
+
+        # the delimiter is passed on when set
+        load = {"tgt_type": "grain", "tgt": "os|Linux", "delimiter": "|"}
+        channel._publish_targets(load)
+        check_minions.assert_called_with("os|Linux", tgt_type="grain", delimiter="|")
+
+        # the other target types are broadcast
+        check_minions.reset_mock()
+        assert channel._publish_targets({"tgt_type": "compound", "tgt": "*"}) is None
+        assert not check_minions.called
+
+        # grains are only resolved from the minion data cache
+        opts["minion_data_cache"] = False
+        assert channel._publish_targets({"tgt_type": "grain", "tgt": "os:*"}) is None
+        assert channel._publish_targets({"tgt_type": "glob", "tgt": "*"}) == [
+            "minion01"
+        ]
+
+        # an empty match is broadcast, except for lists
+        check_minions.return_value = {"minions": []}
+        assert channel._publish_targets({"tgt_type": "glob", "tgt": "*"}) is None
+        assert channel._publish_targets({"tgt_type": "list", "tgt": "m1,m2"}) == []
+
+        # only lists are resolved without tcp_pub_filtering
+        opts["tcp_pub_filtering"] = False
+        assert channel._publish_targets({"tgt_type": "glob", "tgt": "*"}) is None
+        assert channel._publish_targets({"tgt_type": "list", "tgt": ["m1"]}) == ["m1"]
+
+        # the syndics get every publish
+        opts["order_masters"] = True
+        assert channel._publish_targets({"tgt_type": "list", "tgt": ["m1"]}) is None
@@ -3,18 +3,25 @@
 """
 
 import hashlib
+import threading
 
 import salt.config
+import salt.crypt
 import salt.exceptions
 import salt.ext.tornado.gen
 import salt.ext.tornado.ioloop
 import salt.log.setup
+import salt.master
+import salt.payload
 import salt.transport.client
+import salt.transport.mixins.auth
 import salt.transport.server
+import salt.transport.zeromq
 import salt.utils.platform
 import salt.utils.process
 import salt.utils.stringutils
-from salt.transport.zeromq import AsyncReqMessageClientPool
+from salt.transport.zeromq import AsyncReqMessageClient, AsyncReqMessageClientPool
+from salt.utils.zeromq import zmq
 from tests.support.mock import MagicMock, call, patch
 
 
@@ -251,3 +258,105 @@ def test_zeromq_async_pub_channel_filtering_decode_message(
             res = channel._decode_messages(message)
 
     assert res.result()["enc"] == "aes"
+
+
+def test_zeromq_pub_server_channel_batch_packages():
+    """
+    test ZeroMQPubServerChannel _batch_packages groups the loads by target
+    and encrypts each group once
+    """
+    opts = dict(salt.config.DEFAULT_MASTER_OPTS.copy(), sign_pub_messages=False)
+    channel = salt.transport.zeromq.ZeroMQPubServerChannel(opts)
+    packages = [
+        {"load": {"jid": 1}},
+        {"load": {"jid": 2}, "topic_lst": ["minion1"]},
+        {"load": {"jid": 3}},
+        {"payload": b"unbatched"},
+    ]
+    with patch.object(
+        channel, "_package_pub", MagicMock(side_effect=lambda load: load)
+    ) as package_pub:
+        ret = channel._batch_packages(packages)
+    assert package_pub.call_count == 2
+    assert [channel.serial.loads(pkg["payload"]) for pkg in ret[:2]] == [
+        {"__batch__": [{"jid": 1}, {"jid": 3}]},
+        {"jid": 2},
+    ]
+    assert "topic_lst" not in ret[0]
+    assert ret[1]["topic_lst"] == ["minion1"]
+    assert ret[2] == {"payload": b"unbatched"}
+
+
+def test_zeromq_pub_server_channel_package_pub_caches_crypticle():
+    """
+    test ZeroMQPubServerChannel _package_pub builds the crypticle only when
+    the AES key changes
+    """
+    opts = dict(salt.config.DEFAULT_MASTER_OPTS.copy(), sign_pub_messages=False)
+    channel = salt.transport.zeromq.ZeroMQPubServerChannel(opts)
+    secret = MagicMock(value=salt.crypt.Crypticle.generate_key_string())
+    with patch.dict(
+        salt.master.SMaster.secrets, {"aes": {"secret": secret}}
+    ), patch.object(salt.transport.mixins.auth.AESPubServerMixin, "_crypticle", None):
+        channel._package_pub({"jid": 1})
+        crypticle = channel._get_crypticle()
+        payload = channel._package_pub({"jid": 2})
+        assert channel._get_crypticle() is crypticle
+        assert crypticle.loads(payload["load"]) == {"jid": 2}
+        secret.value = salt.crypt.Crypticle.generate_key_string()
+        assert channel._get_crypticle() is not crypticle
+
+
+def test_zeromq_async_pub_channel_split_payload():
+    """
+    test AsyncZeroMQPubChannel _split_payload returns a payload for each load
+    of a batch
+    """
+    channel = salt.transport.mixins.auth.AESPubClientMixin()
+    payload = {"enc": "aes", "load": {"__batch__": [{"jid": 1}, {"jid": 2}]}}
+    assert channel._split_payload(payload) == [
+        {"enc": "aes", "load": {"jid": 1}},
+        {"enc": "aes", "load": {"jid": 2}},
+    ]
+    payload = {"enc": "aes", "load": {"jid": 1}}
+    assert channel._split_payload(payload) == [payload]
+
+
+def test_async_req_message_client_pipeline():
+    """
+    test AsyncReqMessageClient keeps several requests in flight and matches
+    the replies to them when request_channel_window is above 1
+    """
+    opts = {"request_channel_window": 2}
+    serial = salt.payload.Serial(opts)
+    context = zmq.Context()
+    server = context.socket(zmq.ROUTER)
+    server.linger = 0
+    port = server.bind_to_random_port("tcp://127.0.0.1")
+
+    def reply_reversed():
+        requests = [server.recv_multipart() for _ in range(2)]
+        for request in reversed(requests):
+            load = serial.loads(request[-1])
+            server.send_multipart(request[:-1] + [serial.dumps(load["num"] * 10)])
+
+    thread = threading.Thread(target=reply_reversed)
+    thread.start()
+    io_loop = salt.ext.tornado.ioloop.IOLoop()
+    client = AsyncReqMessageClient(
+        opts, "tcp://127.0.0.1:{}".format(port), io_loop=io_loop
+    )
+    try:
+        futures = [client.send({"num": num}, timeout=30) for num in (1, 2)]
+        assert len(client.send_queue) == 2
+        ret = io_loop.run_sync(lambda: salt.ext.tornado.gen.multi(futures))
+        assert ret == [10, 20]
+        assert client.send_queue == []
+        assert client.send_future_map == {}
+        assert client.send_timeout_map == {}
+    finally:
+        thread.join()
+        client.close()
+        io_loop.close()
+        server.close()
+        context.term()
@@ -1,3 +1,9 @@
+import copy
+import os
+
+import pytest
+import salt.utils.data
+import salt.utils.files
 import salt.utils.minions
 import salt.utils.network
 from tests.support.mock import patch
@@ -15,8 +21,343 @@ def test_connected_ids():
     ckminions = salt.utils.minions.CkMinions({"minion_data_cache": True})
     patch_net = patch("salt.utils.network.local_port_tcp", return_value={"127.0.0.1"})
     patch_list = patch("salt.cache.Cache.list", return_value=[minion])
-    patch_fetch = patch("salt.cache.Cache.fetch", return_value=mdata)
+    patch_fetch = patch("salt.cache.Cache.fetch_many", return_value={minion: mdata})
     with patch.dict(ckminions.opts, opts):
         with patch_net, patch_list, patch_fetch:
             ret = ckminions.connected_ids()
             assert ret == {minion}
+
+
+MINION_DATA = {
+    "web1": {
+        "grains": {
+            "os": "Ubuntu",
+            "osrelease": "20.04",
+            "roles": ["web", "proxy"],
+            "ipv4": ["10.0.0.1", "127.0.0.1"],
+            "num_cpus": 4,
+            "virtual": True,
+            "foo": {"bar": "baz", "nested": {"key": "value"}},
+        },
+        "pillar": {"role": "web", "env": {"name": "prod"}},
+    },
+    "web2": {
+        "grains": {
+            "os": "CentOS",
+            "osrelease": "8",
+            "roles": ["web"],
+            "ipv4": ["10.0.0.2"],
+            "num_cpus": 2,
+            "virtual": False,
+            "foo": {"bar": "qux"},
+            "disks": [{"name": "sda"}, {"name": "sdb"}],
+        },
+        "pillar": {"role": "web", "env": {"name": "staging"}, 1: "one"},
+    },
+    "db1": {
+        "grains": {"os": "Ubuntu", "roles": [], "foo": "bar:baz", "colon:key": "x"},
+        "pillar": {"role": "db", "env": "prod"},
+    },
+}
+
+
+def _fetch_many_minion_data(bank_prefix, names, key):
+    return {name: MINION_DATA[name] for name in names if name in MINION_DATA}
+
+
+@pytest.fixture
+def minion_index():
+    index = salt.utils.minions.MinionDataIndex()
+    for minion_id, data in MINION_DATA.items():
+        index.update(minion_id, data)
+    return index
+
+
+@pytest.mark.parametrize(
+    "search_type,expr,delimiter,regex_match,exact_match",
+    [
+        ("grains", "os:Ubuntu", ":", False, False),
+        ("grains", "os:ubuntu", ":", False, True),
+        ("grains", "os:Ub*", ":", False, False),
+        ("grains", "os:(Ubuntu|CentOS)", ":", True, False),
+        ("grains", "roles:web", ":", False, False),
+        ("grains", "roles:0:proxy", ":", False, False),
+        ("grains", "roles:-1:web", ":", False, False),
+        ("grains", "ipv4:10.0.0.*", ":", False, False),
+        ("grains", "num_cpus:4", ":", False, False),
+        ("grains", "virtual:true", ":", False, False),
+        ("grains", "foo:bar:baz", ":", False, False),
+        ("grains", "foo:bar", ":", False, False),
+        ("grains", "foo:*", ":", False, False),
+        ("grains", "foo:nested:key:v*", ":", False, False),
+        ("grains", "disks:name:sdb", ":", False, False),
+        ("grains", "*:Ubuntu", ":", False, False),
+        ("grains", "os", ":", False, False),
+        ("grains", "os,Ubuntu", ",", False, False),
+        ("grains", "colon:key,x", ",", False, False),
+        ("grains", "os:[", ":", True, False),
+        ("pillar", "role:web", ":", False, False),
+        ("pillar", "env:prod", ":", False, False),
+        ("pillar", "env:name:prod", ":", False, False),
+        ("pillar", "env:name:pro.*", ":", True, False),
+        ("pillar", "1:one", ":", False, False),
+    ],
+)
+def test_minion_data_index_match(
+    minion_index, search_type, expr, delimiter, regex_match, exact_match
+):
+    """
+    The index must return the same minions as subdict_match over the cache
+    """
+    expected = {
+        minion_id
+        for minion_id, data in MINION_DATA.items()
+        if salt.utils.data.subdict_match(
+            data[search_type],
+            expr,
+            delimiter=delimiter,
+            regex_match=regex_match,
+            exact_match=exact_match,
+        )
+    }
+    ret = minion_index.match(
+        search_type,
+        expr,
+        delimiter=delimiter,
+        regex_match=regex_match,
+        exact_match=exact_match,
+    )
+    assert ret == expected
+
+
+def test_minion_data_index_update_and_remove(minion_index):
+    assert minion_index.match("grains", "os:Ubuntu") == {"web1", "db1"}
+
+    data = copy.deepcopy(MINION_DATA["db1"])
+    data["grains"]["os"] = "Debian"
+    minion_index.update("db1", data)
+    assert minion_index.match("grains", "os:Ubuntu") == {"web1"}
+    assert minion_index.match("grains", "os:Debian") == {"db1"}
+
+    minion_index.remove("web1")
+    assert "web1" not in minion_index
+    assert minion_index.match("grains", "os:Ubuntu") == set()
+    assert minion_index.match("grains", "roles:proxy") == set()
+    assert ("os",) in minion_index._values["grains"]
+    assert ("foo", "nested", "key") not in minion_index._values["grains"]
+
+    minion_index.update("db1", {})
+    assert "db1" not in minion_index
+    assert minion_index.match("grains", "os:Debian") == set()
+
+
+def test_minion_data_index_check_greedy(minion_index):
+    accepted = ["db1", "new", "web1", "web2"]
+    ret = minion_index.check("grains", "os:Ubuntu", greedy=True, accepted=accepted)
+    assert ret == {"minions": ["db1", "new", "web1"], "missing": []}
+    ret = minion_index.check("grains", "os:Ubuntu", greedy=False)
+    assert sorted(ret["minions"]) == ["db1", "web1"]
+
+
+def test_check_cache_minions_uses_index(tmp_path):
+    opts = {
+        "minion_data_cache": True,
+        "minion_data_index": True,
+        "sock_dir": str(tmp_path),
+    }
+    ckminions = salt.utils.minions.CkMinions(opts)
+    ret = {"minions": ["web1"], "missing": []}
+    patch_check = patch(
+        "salt.utils.minions.MinionDataIndexClient.check", return_value=ret
+    )
+    patch_fetch = patch("salt.cache.Cache.fetch_many")
+    with patch_check as check, patch_fetch as fetch:
+        assert ckminions._check_grain_minions("os:Ubuntu", ":", False) == ret
+    check.assert_called_once_with(
+        search_type="grains",
+        expr="os:Ubuntu",
+        delimiter=":",
+        greedy=False,
+        regex_match=False,
+        exact_match=False,
+    )
+    fetch.assert_not_called()
+
+
+def test_check_cache_minions_index_unavailable(tmp_path):
+    opts = {
+        "minion_data_cache": True,
+        "minion_data_index": True,
+        "sock_dir": str(tmp_path),
+    }
+    ckminions = salt.utils.minions.CkMinions(opts)
+    patch_check = patch(
+        "salt.utils.minions.MinionDataIndexClient.check", return_value=None
+    )
+    patch_list = patch("salt.cache.Cache.list", return_value=["web1", "db1"])
+    patch_fetch = patch(
+        "salt.cache.Cache.fetch_many", side_effect=_fetch_many_minion_data
+    )
+    with patch_check, patch_list, patch_fetch:
+        ret = ckminions._check_grain_minions("roles:web", ":", False)
+    assert ret == {"minions": ["web1"], "missing": []}
+
+
+@pytest.mark.parametrize(
+    "expr,expected",
+    [
+        ("web*", ("term", None, "web*", None, False)),
+        (
+            "G@os:Ubuntu and web*",
+            (
+                "and",
+                ("term", "G", "os:Ubuntu", None, False),
+                ("term", None, "web*", None, False),
+            ),
+        ),
+        (
+            "web1 or web2 and db*",
+            (
+                "or",
+                ("term", None, "web1", None, False),
+                (
+                    "and",
+                    ("term", None, "web2", None, False),
+                    ("term", None, "db*", None, False),
+                ),
+            ),
+        ),
+        (
+            "web* not L@web1",
+            (
+                "and",
+                ("term", None, "web*", None, False),
+                ("not", ("term", "L", "web1", None, True)),
+            ),
+        ),
+        (
+            "not ( L@web1 or G|@os|Ubuntu",
+            (
+                "not",
+                (
+                    "or",
+                    ("term", "L", "web1", None, False),
+                    ("term", "G", "os|Ubuntu", "|", False),
+                ),
+            ),
+        ),
+        (
+            ["N@group1", "and", "web*"],
+            (
+                "and",
+                ("term", "L", "web1,db1", None, False),
+                ("term", None, "web*", None, False),
+            ),
+        ),
+        ("and web*", None),
+        ("web1 web2", None),
+        ("( web1 ) )", None),
+        ("not not web1", None),
+        ("N@unknown", None),
+        ("", None),
+    ],
+)
+def test_compile_compound(expr, expected):
+    nodegroups = {"group1": "L@web1,db1"}
+    assert salt.utils.minions.compile_compound(expr, nodegroups) == expected
+
+
+@pytest.fixture
+def compound_opts(tmp_path):
+    pki_dir = tmp_path / "pki"
+    (pki_dir / "minions").mkdir(parents=True)
+    for minion_id in MINION_DATA:
+        (pki_dir / "minions" / minion_id).touch()
+    cachedir = tmp_path / "cache"
+    cachedir.mkdir()
+    return {
+        "minion_data_cache": True,
+        "pki_dir": str(pki_dir),
+        "cachedir": str(cachedir),
+        "sock_dir": str(tmp_path),
+        "key_cache": "",
+        "transport": "zeromq",
+        "nodegroups": {"webs": "L@web1,web2"},
+    }
+
+
+@pytest.mark.parametrize(
+    "expr,expected,missing",
+    [
+        ("G@os:Ubuntu and web*", ["web1"], []),
+        ("G@os:Ubuntu or I@role:web", ["db1", "web1", "web2"], []),
+        ("web* and not G@os:CentOS", ["web1"], []),
+        ("not N@webs", ["db1"], []),
+        ("L@web1,nope or db1", ["db1", "web1"], ["nope"]),
+        ("* not L@web1,nope", ["db1", "web2"], []),
+        ("E@web[12] and ( I@env:name:prod or G@os:CentOS )", ["web1", "web2"], []),
+        ("web1 web2", [], []),
+    ],
+)
+def test_check_compound_minions(compound_opts, expr, expected, missing):
+    ckminions = salt.utils.minions.CkMinions(compound_opts)
+    patch_list = patch("salt.cache.Cache.list", return_value=list(MINION_DATA))
+    patch_fetch = patch(
+        "salt.cache.Cache.fetch_many", side_effect=_fetch_many_minion_data
+    )
+    with patch_list, patch_fetch:
+        ret = ckminions.check_minions(expr, "compound")
+    assert sorted(ret["minions"]) == expected
+    assert ret["missing"] == missing
+
+
+def test_check_compound_minions_compiled_once(compound_opts):
+    ckminions = salt.utils.minions.CkMinions(compound_opts)
+    patch_list = patch("salt.cache.Cache.list", return_value=list(MINION_DATA))
+    patch_fetch = patch(
+        "salt.cache.Cache.fetch_many", side_effect=_fetch_many_minion_data
+    )
+    patch_compile = patch(
+        "salt.utils.minions.compile_compound",
+        wraps=salt.utils.minions.compile_compound,
+    )
+    with patch_list, patch_fetch, patch_compile as compile_compound:
+        for _ in range(3):
+            ret = ckminions.check_minions("G@os:Ubuntu and web*", "compound")
+            assert ret["minions"] == ["web1"]
+    compile_compound.assert_called_once()
+
+
+def test_check_compound_minions_term_cache(compound_opts):
+    compound_opts["compound_cache"] = True
+    ckminions = salt.utils.minions.CkMinions(compound_opts)
+    minion_data = copy.deepcopy(MINION_DATA)
+    patch_list = patch("salt.cache.Cache.list", return_value=list(MINION_DATA))
+    patch_fetch = patch(
+        "salt.cache.Cache.fetch_many",
+        side_effect=lambda bank_prefix, names, key: {
+            name: minion_data[name] for name in names
+        },
+    )
+    expr = "G@os:Ubuntu and web*"
+    with patch_list, patch_fetch as fetch:
+        assert ckminions.check_minions(expr, "compound")["minions"] == ["web1"]
+        assert fetch.call_count == 1
+        # Served from the term cache
+        assert ckminions.check_minions(expr, "compound")["minions"] == ["web1"]
+        assert fetch.call_count == 1
+
+        # A minion data cache write invalidates the grain term
+        minion_data["web2"]["grains"]["os"] = "Ubuntu"
+        ckminions.minion_data_updated("web2", minion_data["web2"])
+        ret = ckminions.check_minions(expr, "compound")
+        assert sorted(ret["minions"]) == ["web1", "web2"]
+        assert fetch.call_count == 2
+
+        # An accepted key invalidates the glob term
+        pki_dir = os.path.join(compound_opts["pki_dir"], "minions")
+        with salt.utils.files.fopen(os.path.join(pki_dir, "web3"), "w"):
+            pass
+        os.utime(pki_dir, ns=(0, 0))
+        ret = ckminions.check_minions("web*", "compound")
+        assert sorted(ret["minions"]) == ["web1", "web2", "web3"]
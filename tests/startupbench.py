@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+The startupbench script times ``salt-call --local test.ping`` with and
+without loader_file_mapping_cache, to measure the startup time of salt-call
+"""
+# pylint: disable=resource-leakage
+
+import optparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import salt.utils.files
+import salt.utils.yaml
+
+SALT_CALL = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "scripts",
+    "salt-call",
+)
+
+
+def parse():
+    """
+    Parse the cli options
+    """
+    parser = optparse.OptionParser()
+    parser.add_option(
+        "-r",
+        "--runs",
+        dest="runs",
+        default=10,
+        type="int",
+        help="The number of salt-call runs to time for each setting",
+    )
+
+    options, _ = parser.parse_args()
+    return options.__dict__
+
+
+def run(opts, cache):
+    """
+    Return the average duration of a salt-call run with the passed
+    loader_file_mapping_cache
+    """
+    root_dir = tempfile.mkdtemp()
+    try:
+        config = {
+            "root_dir": root_dir,
+            "file_client": "local",
+            "loader_file_mapping_cache": cache,
+        }
+        with salt.utils.files.fopen(os.path.join(root_dir, "minion"), "w") as fp_:
+            salt.utils.yaml.safe_dump(config, fp_)
+        cmd = [sys.executable, SALT_CALL, "-c", root_dir, "--local", "test.ping"]
+        # The first run fills the index
+        subprocess.check_output(cmd)
+        start = time.time()
+        for _ in range(opts["runs"]):
+            subprocess.check_output(cmd)
+        return (time.time() - start) / opts["runs"]
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+
+def main():
+    opts = parse()
+    for cache in (False, True):
+        print(
+            "salt-call --local test.ping, loader_file_mapping_cache {}: "
+            "{:.3f}s".format(cache, run(opts, cache))
+        )
+
+
+if __name__ == "__main__":
+    main()
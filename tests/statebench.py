@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+The statebench script times a highstate of many independent states, one by
+one and with state_concurrency, to measure the gain of running the states
+at the same time
+"""
+# pylint: disable=resource-leakage
+
+import optparse
+import os
+import shutil
+import tempfile
+import time
+
+import salt.config
+import salt.loader
+import salt.state
+import salt.utils.files
+import salt.utils.jid
+
+
+def parse():
+    """
+    Parse the cli options
+    """
+    parser = optparse.OptionParser()
+    parser.add_option(
+        "-s",
+        "--states",
+        dest="states",
+        default=1000,
+        type="int",
+        help="The number of states to run",
+    )
+    parser.add_option(
+        "--sls",
+        dest="sls",
+        default=10,
+        type="int",
+        help="The number of SLS files to spread the states over",
+    )
+    parser.add_option(
+        "-c",
+        "--concurrency",
+        dest="concurrency",
+        default=16,
+        type="int",
+        help="The state_concurrency to compare to the sequential run",
+    )
+    parser.add_option(
+        "--sleep",
+        dest="sleep",
+        default=0.05,
+        type="float",
+        help="The number of seconds each state sleeps for",
+    )
+    parser.add_option(
+        "--chain",
+        dest="chain",
+        default=0,
+        type="int",
+        help="Make every state require the one N states before it",
+    )
+
+    options, _ = parser.parse_args()
+    return options.__dict__
+
+
+def gen_sls(opts, file_root):
+    """
+    Write the SLS files of the benchmark, one cmd.run state per state and no
+    order, and the top file applying them
+    """
+    names = ["bench{}".format(idx) for idx in range(opts["sls"])]
+    with salt.utils.files.fopen(os.path.join(file_root, "top.sls"), "w") as fp_:
+        fp_.write("base:\n  '*':\n")
+        for name in names:
+            fp_.write("    - {}\n".format(name))
+    for idx in range(opts["states"]):
+        sls = names[idx % len(names)]
+        with salt.utils.files.fopen(os.path.join(file_root, sls + ".sls"), "a") as fp_:
+            fp_.write("bench_{}:\n  cmd.run:\n".format(idx))
+            fp_.write("    - name: sleep {}\n".format(opts["sleep"]))
+            if opts["chain"] and idx >= opts["chain"]:
+                fp_.write("    - require:\n")
+                fp_.write("      - cmd: bench_{}\n".format(idx - opts["chain"]))
+
+
+def run(opts, concurrency):
+    """
+    Time one highstate with the passed state_concurrency
+    """
+    root_dir = tempfile.mkdtemp()
+    try:
+        file_root = os.path.join(root_dir, "states")
+        os.makedirs(file_root)
+        gen_sls(opts, file_root)
+        minion_opts = salt.config.minion_config(None)
+        minion_opts.update(
+            {
+                "cachedir": os.path.join(root_dir, "cache"),
+                "file_client": "local",
+                "file_roots": {"base": [file_root]},
+                "state_concurrency": concurrency,
+                "pillar": {},
+            }
+        )
+        minion_opts["grains"] = salt.loader.grains(minion_opts)
+        highstate = salt.state.HighState(
+            minion_opts, jid=salt.utils.jid.gen_jid(minion_opts)
+        )
+        start = time.time()
+        ret = highstate.call_highstate()
+        duration = time.time() - start
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+    if not isinstance(ret, dict):
+        return duration, ret
+    failed = sum(1 for chunk in ret.values() if not chunk["result"])
+    return duration, failed
+
+
+def main():
+    opts = parse()
+    for concurrency in (1, opts["concurrency"]):
+        duration, failed = run(opts, concurrency)
+        print(
+            "{} states, state_concurrency {}: {:.2f}s, {} failed".format(
+                opts["states"], concurrency, duration, failed
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,7 @@ import salt.cache
 
 # Import Salt libs
 import salt.payload
-from tests.support.mock import patch
+from tests.support.mock import MagicMock, patch
 
 # Import Salt Testing libs
 # import integration
@@ -40,6 +40,40 @@ class CacheFunctionsTest(TestCase):
         ret = salt.cache.factory(self.opts)
         self.assertIsInstance(ret, salt.cache.MemCache)
 
+    def test_fetch_many_fallback(self):
+        data = {"minions/web1": {"id": "web1"}, "minions/db1": {}}
+        self.opts["cache"] = "fake_driver"
+        cache = salt.cache.factory(self.opts)
+        with patch("salt.loader.cache", return_value={}), patch(
+            "salt.cache.Cache.fetch", side_effect=lambda bank, key: data[bank]
+        ) as fetch_mock, patch(
+            "salt.cache.Cache.list", return_value=["web1", "db1"]
+        ):
+            ret = cache.fetch_many("minions", ["web1", "db1"], "data")
+            self.assertEqual(ret, {"web1": {"id": "web1"}})
+            self.assertEqual(fetch_mock.call_count, 2)
+            ret = dict(cache.list_with_data("minions", "data"))
+            self.assertEqual(ret, {"web1": {"id": "web1"}})
+
+    def test_fetch_many_driver(self):
+        fetch_many = MagicMock(return_value={"web1": {"id": "web1"}})
+        list_with_data = MagicMock(return_value=iter([("web1", {"id": "web1"})]))
+        self.opts["cache"] = "fake_driver"
+        cache = salt.cache.factory(self.opts)
+        modules = {
+            "fake_driver.fetch_many": fetch_many,
+            "fake_driver.list_with_data": list_with_data,
+        }
+        with patch("salt.loader.cache", return_value=modules), patch(
+            "salt.cache.Cache.fetch"
+        ) as fetch_mock:
+            ret = cache.fetch_many("minions", ["web1", "db1"], "data")
+            self.assertEqual(ret, {"web1": {"id": "web1"}})
+            ret = dict(cache.list_with_data("minions", "data"))
+            self.assertEqual(ret, {"web1": {"id": "web1"}})
+        fetch_many.assert_called_once_with("minions", ["web1", "db1"], "data")
+        fetch_mock.assert_not_called()
+
 
 class MemCacheTest(TestCase):
     """
@@ -93,6 +127,35 @@ class MemCacheTest(TestCase):
         cache_fetch_mock.assert_called_once_with("bank", "key")
         cache_fetch_mock.reset_mock()
 
+    @patch("salt.cache.Cache.store")
+    @patch("salt.cache.Cache.fetch_many", return_value={"b": "fake_data_b"})
+    @patch("salt.loader.cache", return_value={})
+    def test_fetch_many(self, loader_mock, cache_fetch_many_mock, cache_store_mock):
+        with patch("time.time", return_value=0):
+            self.cache.store("bank/a", "key", "fake_data_a")
+        # Only the names missing from the memcache are fetched from the driver
+        with patch("time.time", return_value=1):
+            ret = self.cache.fetch_many("bank", ["a", "b", "c"], "key")
+        self.assertEqual(ret, {"a": "fake_data_a", "b": "fake_data_b"})
+        cache_fetch_many_mock.assert_called_once_with("bank", ["b", "c"], "key")
+        self.assertDictEqual(
+            salt.cache.MemCache.data,
+            {
+                "fake_driver": {
+                    ("bank/a", "key"): [1, "fake_data_a"],
+                    ("bank/b", "key"): [1, "fake_data_b"],
+                    ("bank/c", "key"): [1, {}],
+                }
+            },
+        )
+        cache_fetch_many_mock.reset_mock()
+
+        # Everything is served from the memcache now
+        with patch("time.time", return_value=2):
+            ret = self.cache.fetch_many("bank", ["a", "b", "c"], "key")
+        self.assertEqual(ret, {"a": "fake_data_a", "b": "fake_data_b"})
+        cache_fetch_many_mock.assert_not_called()
+
     @patch("salt.cache.Cache.store")
     @patch("salt.loader.cache", return_value={})
     def test_store(self, loader_mock, cache_store_mock):
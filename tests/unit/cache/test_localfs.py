@@ -156,6 +156,64 @@ class LocalFSTest(TestCase, LoaderModuleMockMixin):
                     localfs.fetch(bank="bank", key="key", cachedir=tmp_dir),
                 )
 
+    # 'fetch_many' and 'list_with_data' function tests: 3
+
+    def _create_tmp_minion_banks(self, tmp_dir, serializer):
+        """
+        Helper function that stores a ``data`` key for a couple of minion banks
+        plus a bank without it.
+        """
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        with patch.dict(localfs.__context__, {"serial": serializer}):
+            localfs.store("minions/web1", "data", {"id": "web1"}, tmp_dir)
+            localfs.store("minions/web2", "data", {"id": "web2"}, tmp_dir)
+            localfs.store("minions/db1", "mine", {"id": "db1"}, tmp_dir)
+
+    def test_fetch_many_success(self):
+        """
+        Tests that fetch_many returns the data of the banks holding the key and
+        leaves out the others.
+        """
+        tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        serializer = salt.payload.Serial(self)
+        self._create_tmp_minion_banks(tmp_dir, serializer)
+
+        with patch.dict(localfs.__context__, {"serial": serializer}):
+            ret = localfs.fetch_many(
+                "minions", ["web1", "db1", "missing"], "data", tmp_dir
+            )
+        self.assertEqual(ret, {"web1": {"id": "web1"}})
+
+    def test_fetch_many_error_reading_cache(self):
+        """
+        Tests that a SaltCacheError is raised when there is a problem reading one of
+        the cache files.
+        """
+        with patch.dict(localfs.__context__, {"serial": salt.payload.Serial(self)}):
+            with patch(
+                "salt.utils.files.fopen",
+                MagicMock(side_effect=OSError(errno.EACCES, "")),
+            ):
+                self.assertRaises(
+                    SaltCacheError, localfs.fetch_many, "minions", ["web1"], "data", ""
+                )
+
+    def test_list_with_data(self):
+        """
+        Tests that list_with_data yields every bank holding the key along with its
+        data, and nothing when the bank doesn't exist.
+        """
+        tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        serializer = salt.payload.Serial(self)
+        self._create_tmp_minion_banks(tmp_dir, serializer)
+
+        with patch.dict(localfs.__context__, {"serial": serializer}):
+            ret = dict(localfs.list_with_data("minions", "data", tmp_dir))
+            self.assertEqual(ret, {"web1": {"id": "web1"}, "web2": {"id": "web2"}})
+            self.assertEqual(
+                list(localfs.list_with_data("nonexistent", "data", tmp_dir)), []
+            )
+
     # 'updated' function tests: 3
 
     def test_updated_return_when_cache_file_does_not_exist(self):
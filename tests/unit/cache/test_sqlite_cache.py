@@ -0,0 +1,167 @@
+"""
+unit tests for the sqlite cache
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+
+import salt.cache.sqlite_cache as sqlite_cache
+import salt.payload
+from salt.exceptions import SaltCacheError
+from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.mock import patch
+from tests.support.runtests import RUNTIME_VARS
+from tests.support.unit import TestCase
+
+
+class SQLiteCacheTest(TestCase, LoaderModuleMockMixin):
+    """
+    Validate the functions in the sqlite cache
+    """
+
+    def setup_loader_modules(self):
+        return {
+            sqlite_cache: {
+                "__opts__": {},
+                "__context__": {"serial": salt.payload.Serial("msgpack")},
+            }
+        }
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.database = sqlite_cache.init_kwargs({"cachedir": tmp_dir})["database"]
+        self.addCleanup(self._close_connections)
+
+    def _close_connections(self):
+        while sqlite_cache._connections:
+            sqlite_cache._connections.popitem()[1].close()
+
+    def test_init_kwargs(self):
+        self.assertEqual(
+            sqlite_cache.init_kwargs({"cachedir": "/var/cache/salt/master"}),
+            {"database": "/var/cache/salt/master/salt_cache.db"},
+        )
+        opts = {"sqlite_cache.database": "/tmp/c.db"}
+        with patch.dict(sqlite_cache.__opts__, opts):
+            self.assertEqual(sqlite_cache.init_kwargs({}), {"database": "/tmp/c.db"})
+
+    def test_store_fetch(self):
+        data = {"grains": {"os": "Ubuntu"}, "bytes": b"\xfe\x99\x00\xff"}
+        sqlite_cache.store("minions/web1", "data", data, self.database)
+        self.assertTrue(os.path.isfile(self.database))
+        ret = sqlite_cache.fetch("minions/web1", "data", self.database)
+        self.assertEqual(ret, data)
+        self.assertEqual(sqlite_cache.fetch("minions/web1", "mine", self.database), {})
+
+        # Overwrite the key
+        sqlite_cache.store("minions/web1", "data", {"id": "web1"}, self.database)
+        self.assertEqual(
+            sqlite_cache.fetch("minions/web1", "data", self.database), {"id": "web1"}
+        )
+
+    def test_threads(self):
+        sqlite_cache.store("minions/web1", "data", {"id": "web1"}, self.database)
+        ret = {}
+
+        def _thread():
+            try:
+                ret["fetch"] = sqlite_cache.fetch("minions/web1", "data", self.database)
+                sqlite_cache.store(
+                    "minions/web2", "data", {"id": "web2"}, self.database
+                )
+            except SaltCacheError as exc:
+                ret["error"] = exc
+            finally:
+                # A connection can only be closed by its own thread
+                conn = sqlite_cache._connections.pop(
+                    (os.getpid(), threading.get_ident(), self.database), None
+                )
+                if conn is not None:
+                    conn.close()
+
+        thread = threading.Thread(target=_thread)
+        thread.start()
+        thread.join()
+        self.assertEqual(ret, {"fetch": {"id": "web1"}})
+        self.assertEqual(
+            sqlite_cache.fetch("minions/web2", "data", self.database), {"id": "web2"}
+        )
+
+    def test_list_contains(self):
+        sqlite_cache.store("minions/web1", "data", {}, self.database)
+        sqlite_cache.store("minions/web1", "mine", {}, self.database)
+        sqlite_cache.store("minions/web2", "data", {}, self.database)
+        sqlite_cache.store("minions", "key", {}, self.database)
+
+        self.assertEqual(
+            sorted(sqlite_cache.list_("minions", self.database)),
+            ["key", "web1", "web2"],
+        )
+        self.assertEqual(
+            sorted(sqlite_cache.list_("minions/web1/", self.database)),
+            ["data", "mine"],
+        )
+        self.assertEqual(sqlite_cache.list_("nonexistent", self.database), [])
+        self.assertTrue(sqlite_cache.contains("minions/web1", None, self.database))
+        self.assertTrue(sqlite_cache.contains("minions/web1", "mine", self.database))
+        self.assertFalse(sqlite_cache.contains("minions/web2", "mine", self.database))
+        self.assertFalse(sqlite_cache.contains("minions/web3", None, self.database))
+
+    def test_updated(self):
+        with patch("time.time", return_value=1600000000.5):
+            sqlite_cache.store("minions/web1", "data", {}, self.database)
+        self.assertEqual(
+            sqlite_cache.updated("minions/web1", "data", self.database), 1600000000
+        )
+        self.assertIsNone(sqlite_cache.updated("minions/web1", "mine", self.database))
+
+    def test_flush(self):
+        sqlite_cache.store("minions/web1", "data", {}, self.database)
+        sqlite_cache.store("minions/web1", "mine", {}, self.database)
+        sqlite_cache.store("minions/web1/sub", "key", {}, self.database)
+        sqlite_cache.store("minions/web10", "data", {}, self.database)
+
+        self.assertTrue(sqlite_cache.flush("minions/web1", "mine", self.database))
+        self.assertFalse(sqlite_cache.flush("minions/web1", "mine", self.database))
+        self.assertEqual(
+            sorted(sqlite_cache.list_("minions/web1", self.database)), ["data", "sub"]
+        )
+
+        self.assertTrue(sqlite_cache.flush("minions/web1", database=self.database))
+        self.assertFalse(sqlite_cache.flush("minions/web1", database=self.database))
+        self.assertEqual(sqlite_cache.list_("minions", self.database), ["web10"])
+        self.assertFalse(
+            sqlite_cache.contains("minions/web1/sub", None, self.database)
+        )
+        self.assertTrue(sqlite_cache.contains("minions/web10", "data", self.database))
+
+    def test_fetch_many_list_with_data(self):
+        sqlite_cache.store("minions/web1", "data", {"id": "web1"}, self.database)
+        sqlite_cache.store("minions/web2", "data", {"id": "web2"}, self.database)
+        sqlite_cache.store("minions/db1", "mine", {"id": "db1"}, self.database)
+        sqlite_cache.store("minions/web1/sub", "data", {"id": "sub"}, self.database)
+
+        with patch.object(sqlite_cache, "_FETCH_MANY_CHUNK", 1):
+            self.assertEqual(
+                sqlite_cache.fetch_many(
+                    "minions", ["web1", "db1", "missing"], "data", self.database
+                ),
+                {"web1": {"id": "web1"}},
+            )
+        self.assertEqual(
+            dict(sqlite_cache.list_with_data("minions", "data", self.database)),
+            {"web1": {"id": "web1"}, "web2": {"id": "web2"}},
+        )
+
+    def test_error_opening_database(self):
+        with patch("sqlite3.connect", side_effect=sqlite_cache.sqlite3.Error):
+            self.assertRaises(
+                SaltCacheError,
+                sqlite_cache.fetch,
+                "minions/web1",
+                "data",
+                self.database,
+            )
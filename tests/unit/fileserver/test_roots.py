@@ -9,6 +9,7 @@ import shutil
 import tempfile
 
 import salt.fileclient
+import salt.fileserver
 import salt.fileserver.roots as roots
 import salt.utils.files
 import salt.utils.hashutils
@@ -180,3 +181,112 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
         self.assertEqual(ret["files"]["changed"], [])
         self.assertEqual(ret["files"]["removed"], [])
         self.assertEqual(ret["files"]["added"], [])
+
+    @skipIf(not roots.HAS_PYINOTIFY, "pyinotify is not installed")
+    def test_watch(self):
+        watch_root = pathlib.Path(tempfile.mkdtemp(dir=RUNTIME_VARS.TMP))
+        self.addCleanup(salt.utils.files.rm_rf, str(watch_root))
+        (watch_root / "init.sls").write_text("foo:\n  test.nop\n")
+        (watch_root / "old").mkdir()
+        (watch_root / "old" / "file").write_text("old")
+        opts = {
+            "file_roots": {"base": [str(watch_root)]},
+            "fileserver_list_cache_time": 0,
+        }
+        with patch.dict(roots.__opts__, opts):
+            watcher = roots._RootsWatcher(roots.__opts__)
+            self.addCleanup(watcher.notifier.stop)
+
+            (watch_root / "new" / "sub").mkdir(parents=True)
+            (watch_root / "new" / "sub" / "file").write_text("new")
+            (watch_root / "new" / "empty").mkdir()
+            (watch_root / "init.sls").write_text("bar:\n  test.nop\n")
+            shutil.rmtree(str(watch_root / "old"))
+            (watch_root / "link").symlink_to(str(watch_root / "init.sls"))
+            while watcher.notifier.check_events(500):
+                watcher.notifier.read_events()
+                watcher.notifier.process_events()
+
+            lists = watcher.file_lists("base")
+            for form in ("files", "dirs", "empty_dirs"):
+                self.assertEqual(
+                    lists[form], roots._file_lists({"saltenv": "base"}, form)
+                )
+            self.assertEqual(
+                lists["links"], roots._file_lists({"saltenv": "base"}, "links")
+            )
+            self.assertIn("new/sub/file", lists["files"])
+            self.assertNotIn("old/file", lists["files"])
+            self.assertEqual(lists["empty_dirs"], ["new/empty"])
+            self.assertEqual(
+                watcher.mtime_map(),
+                salt.fileserver.generate_mtime_map(
+                    roots.__opts__, roots.__opts__["file_roots"]
+                ),
+            )
+
+    @skipIf(not roots.HAS_PYINOTIFY, "pyinotify is not installed")
+    def test_watch_failed(self):
+        """
+        A directory which cannot be watched stops the watcher
+        """
+        watch_root = pathlib.Path(tempfile.mkdtemp(dir=RUNTIME_VARS.TMP))
+        self.addCleanup(salt.utils.files.rm_rf, str(watch_root))
+        (watch_root / "init.sls").write_text("foo:\n  test.nop\n")
+        opts = {"file_roots": {"base": [str(watch_root)]}}
+        with patch.dict(roots.__opts__, opts):
+            watcher = roots._RootsWatcher(roots.__opts__)
+            self.assertFalse(watcher.failed)
+
+            (watch_root / "new").mkdir()
+            with patch.object(
+                watcher.manager, "add_watch", return_value={}
+            ), patch.object(roots, "_WATCHER", watcher), patch.object(
+                roots.log, "error"
+            ) as log_error:
+                watcher.run()
+                self.assertIsNone(roots._WATCHER)
+            self.assertTrue(watcher.failed)
+            log_error.assert_called_once()
+
+            # A watcher which fails on start is not started
+            with patch(
+                "pyinotify.WatchManager.add_watch", return_value={}
+            ), patch.object(roots, "_WATCHER", None), patch.dict(
+                roots.__opts__, {"roots_watch": True}
+            ):
+                self.assertFalse(roots.watch())
+                self.assertIsNone(roots._WATCHER)
+
+    def test_file_hash_index(self):
+        index_root = pathlib.Path(tempfile.mkdtemp(dir=RUNTIME_VARS.TMP))
+        self.addCleanup(salt.utils.files.rm_rf, str(index_root))
+        sls = index_root / "init.sls"
+        sls.write_text("foo:\n  test.nop\n")
+        opts = {"file_roots": {"base": [str(index_root)]}, "roots_hash_index": True}
+        with patch.dict(roots.__opts__, opts):
+            roots.update()
+            index = roots._load_hash_index(refresh=True)
+            self.assertEqual(
+                index[str(sls)][2],
+                salt.utils.hashutils.get_hash(str(sls), self.opts["hash_type"]),
+            )
+            load = {"saltenv": "base", "path": "init.sls"}
+            fnd = roots.find_file("init.sls")
+            with patch("salt.utils.hashutils.get_hash") as get_hash:
+                ret = roots.file_hash(load, fnd)
+            get_hash.assert_not_called()
+            self.assertEqual(ret["hsum"], index[str(sls)][2])
+
+            # A change of size is hashed again without waiting for update()
+            sls.write_text("foo:\n  test.succeed_without_changes\n")
+            ret = roots.file_hash(load, fnd)
+            self.assertEqual(
+                ret["hsum"],
+                salt.utils.hashutils.get_hash(str(sls), self.opts["hash_type"]),
+            )
+            self.assertFalse(
+                os.path.exists(
+                    os.path.join(self.opts["cachedir"], "roots", "hash", "base")
+                )
+            )
@@ -0,0 +1,181 @@
+"""
+Unit tests for the sqlite job cache (sqlite_local_cache).
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+
+import salt.returners.sqlite_local_cache as sqlite_local_cache
+from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.mock import patch
+from tests.support.runtests import RUNTIME_VARS
+from tests.support.unit import TestCase
+
+
+class SQLiteLocalCacheTestCase(TestCase, LoaderModuleMockMixin):
+    """
+    Tests for the sqlite_local_cache returner
+    """
+
+    def setup_loader_modules(self):
+        tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        return {
+            sqlite_local_cache: {
+                "__opts__": {
+                    "cachedir": tmp_dir,
+                    "keep_jobs": 24,
+                    "job_cache_store_endtime": False,
+                }
+            }
+        }
+
+    def setUp(self):
+        self.addCleanup(self._close_connections)
+
+    def _close_connections(self):
+        while sqlite_local_cache._connections:
+            sqlite_local_cache._connections.popitem()[1].close()
+
+    def _save_job(self, jid, fun="test.ping", minions=("minion1", "minion2")):
+        sqlite_local_cache.prep_jid(passed_jid=jid)
+        load = {"fun": fun, "arg": [], "tgt": "*", "tgt_type": "glob", "user": "root"}
+        sqlite_local_cache.save_load(jid, load, minions=list(minions))
+        return load
+
+    def test_prep_jid(self):
+        jid = sqlite_local_cache.prep_jid()
+        self.assertEqual(len(jid), 20)
+        # A generated jid that already exists is not reused
+        with patch("salt.utils.jid.gen_jid", side_effect=[jid, "20200101000000000000"]):
+            self.assertEqual(sqlite_local_cache.prep_jid(), "20200101000000000000")
+        # But a passed one is
+        self.assertEqual(sqlite_local_cache.prep_jid(passed_jid=jid), jid)
+
+    def test_threads(self):
+        jid = "20200101000000000000"
+        self._save_job(jid)
+        ret = {}
+
+        def _thread():
+            try:
+                ret["load"] = sqlite_local_cache.get_load(jid)
+                sqlite_local_cache.returner(
+                    {"jid": jid, "id": "minion1", "return": True}
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                ret["error"] = exc
+            finally:
+                # A connection can only be closed by its own thread
+                for key in list(sqlite_local_cache._connections):
+                    if key[:2] == (os.getpid(), threading.get_ident()):
+                        sqlite_local_cache._connections.pop(key).close()
+
+        thread = threading.Thread(target=_thread)
+        thread.start()
+        thread.join()
+        self.assertNotIn("error", ret)
+        self.assertEqual(ret["load"]["Minions"], ["minion1", "minion2"])
+        self.assertEqual(sqlite_local_cache.get_jid(jid), {"minion1": {"return": True}})
+
+    def test_save_load_get_load(self):
+        jid = "20200101000000000000"
+        load = self._save_job(jid)
+        sqlite_local_cache.save_minions(jid, ["minion3"], syndic_id="syndic")
+        expected = dict(load, Minions=["minion1", "minion2", "minion3"])
+        self.assertEqual(sqlite_local_cache.get_load(jid), expected)
+        self.assertEqual(sqlite_local_cache.get_load("20200101000000000001"), {})
+
+    def test_returner_get_jid(self):
+        jid = "20200101000000000000"
+        self._save_job(jid)
+        sqlite_local_cache.returner(
+            {"jid": jid, "id": "minion1", "return": True, "retcode": 0, "out": "txt"}
+        )
+        sqlite_local_cache.returner({"jid": jid, "id": "minion2", "return": False})
+        # An extra return is dropped
+        self.assertFalse(
+            sqlite_local_cache.returner({"jid": jid, "id": "minion2", "return": True})
+        )
+        self.assertEqual(
+            sqlite_local_cache.get_jid(jid),
+            {
+                "minion1": {"return": True, "retcode": 0, "out": "txt"},
+                "minion2": {"return": False},
+            },
+        )
+
+    def test_returner_nocache(self):
+        jid = sqlite_local_cache.prep_jid(nocache=True)
+        sqlite_local_cache.returner({"jid": jid, "id": "minion1", "return": True})
+        self.assertEqual(sqlite_local_cache.get_jid(jid), {})
+
+    def test_get_jids(self):
+        self._save_job("20200101000000000000")
+        self._save_job("20200102000000000000", fun="saltutil.find_job")
+        self._save_job("20200103000000000000", fun="state.apply")
+
+        ret = sqlite_local_cache.get_jids()
+        self.assertEqual(
+            sorted(ret),
+            ["20200101000000000000", "20200102000000000000", "20200103000000000000"],
+        )
+        self.assertEqual(ret["20200101000000000000"]["Function"], "test.ping")
+        self.assertEqual(
+            ret["20200101000000000000"]["StartTime"], "2020, Jan 01 00:00:00.000000"
+        )
+
+        ret = sqlite_local_cache.get_jids_filter(2)
+        self.assertEqual(
+            [job["JID"] for job in ret],
+            ["20200101000000000000", "20200103000000000000"],
+        )
+        ret = sqlite_local_cache.get_jids_filter(2, filter_find_job=False)
+        self.assertEqual(
+            [job["JID"] for job in ret],
+            ["20200102000000000000", "20200103000000000000"],
+        )
+
+        ret = sqlite_local_cache.get_jids_search(
+            functions=["test.*", "state.[!h]*"]
+        )
+        self.assertEqual(sorted(ret), ["20200101000000000000", "20200103000000000000"])
+        ret = sqlite_local_cache.get_jids_search(
+            start_jid="20200102000000000000", end_jid="20200103000000000000"
+        )
+        self.assertEqual(list(ret), ["20200102000000000000"])
+
+    def test_endtime(self):
+        jid = "20200101000000000000"
+        self._save_job(jid)
+        self.assertFalse(sqlite_local_cache.get_endtime(jid))
+        sqlite_local_cache.update_endtime(jid, "2020, Jan 01 00:00:01.000000")
+        self.assertEqual(
+            sqlite_local_cache.get_endtime(jid), "2020, Jan 01 00:00:01.000000"
+        )
+        with patch.dict(sqlite_local_cache.__opts__, {"job_cache_store_endtime": True}):
+            self.assertEqual(
+                sqlite_local_cache.get_jids()[jid]["EndTime"],
+                "2020, Jan 01 00:00:01.000000",
+            )
+
+    def test_clean_old_jobs(self):
+        with patch("time.time", return_value=1000000):
+            self._save_job("20200101000000000000")
+            sqlite_local_cache.returner(
+                {"jid": "20200101000000000000", "id": "minion1", "return": True}
+            )
+        self._save_job("20200102000000000000")
+
+        sqlite_local_cache.clean_old_jobs()
+        self.assertEqual(list(sqlite_local_cache.get_jids()), ["20200102000000000000"])
+        self.assertEqual(sqlite_local_cache.get_load("20200101000000000000"), {})
+        self.assertEqual(sqlite_local_cache.get_jid("20200101000000000000"), {})
+
+        # keep_jobs set to 0 never removes anything
+        with patch.dict(sqlite_local_cache.__opts__, {"keep_jobs": 0}):
+            with patch("time.time", return_value=10 ** 10):
+                sqlite_local_cache.clean_old_jobs()
+        self.assertEqual(list(sqlite_local_cache.get_jids()), ["20200102000000000000"])
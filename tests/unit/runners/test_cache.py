@@ -6,9 +6,15 @@ unit tests for the cache runner
 # Import Python Libs
 from __future__ import absolute_import, print_function, unicode_literals
 
+import shutil
+import tempfile
+
 # Import Salt Libs
+import salt.cache
+import salt.config
 import salt.runners.cache as cache
 import salt.utils.master
+from salt.exceptions import SaltInvocationError
 from tests.support.mixins import LoaderModuleMockMixin
 from tests.support.mock import patch
 
@@ -52,3 +58,25 @@ class CacheTest(TestCase, LoaderModuleMockMixin):
 
         with patch.object(salt.utils.master, "MasterPillarUtil", MockMaster):
             self.assertEqual(cache.grains(tgt="*"), mock_data)
+
+    def test_migrate(self):
+        """
+        test cache.migrate runner
+        """
+        tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+        opts["cachedir"] = tmp_dir
+        localfs = salt.cache.Cache(opts)
+        localfs.store("minions/web1", "data", {"id": "web1"})
+        localfs.store("minions/web1", "mine", {"foo": "bar"})
+        localfs.store("minions/web2", "data", {"id": "web2"})
+
+        with patch.dict(cache.__opts__, opts):
+            self.assertRaises(SaltInvocationError, cache.migrate, target="localfs")
+            self.assertEqual(cache.migrate(target="sqlite"), 3)
+
+        sqlite = salt.cache.Cache(dict(opts, cache="sqlite"))
+        self.assertEqual(sorted(sqlite.list("minions")), ["web1", "web2"])
+        self.assertEqual(sqlite.fetch("minions/web1", "mine"), {"foo": "bar"})
+        self.assertEqual(sqlite.fetch("minions/web2", "data"), {"id": "web2"})
@@ -13,7 +13,7 @@ import salt.runners.jobs as jobs
 
 # Import Salt Testing Libs
 from tests.support.mixins import LoaderModuleMockMixin
-from tests.support.mock import patch
+from tests.support.mock import MagicMock, patch
 from tests.support.unit import TestCase
 
 
@@ -89,3 +89,51 @@ class JobsTest(TestCase, LoaderModuleMockMixin):
             self.assertEqual(
                 jobs.list_jobs(search_target="non-existant"), returns["non-existant"]
             )
+
+    def test_list_jobs_with_get_jids_search(self):
+        """
+        test jobs.list_jobs runner with a job cache able to search jobs
+        """
+        mock_jobs_cache = {
+            "20160524035503086853": {
+                "Arguments": [],
+                "Function": "test.ping",
+                "StartTime": "2016, May 24 03:55:03.086853",
+                "Target": "node-1-1.com",
+                "Target-type": "glob",
+                "User": "root",
+            },
+        }
+        get_jids_search = MagicMock(return_value=mock_jobs_cache)
+
+        class MockMasterMinion(object):
+
+            returners = {
+                "local_cache.get_jids": MagicMock(),
+                "local_cache.get_jids_search": get_jids_search,
+            }
+
+            def __init__(self, *args, **kwargs):
+                pass
+
+        with patch.object(salt.minion, "MasterMinion", MockMasterMinion):
+            self.assertEqual(
+                jobs.list_jobs(search_function="test.*,pkg.install"), mock_jobs_cache
+            )
+            get_jids_search.assert_called_once_with(
+                functions=["test.*", "pkg.install"]
+            )
+            get_jids_search.reset_mock()
+
+            if jobs.DATEUTIL_SUPPORT:
+                self.assertEqual(
+                    jobs.list_jobs(
+                        start_time="2016, May 24 03:00",
+                        end_time="2016, May 24 03:55:03.086853",
+                    ),
+                    mock_jobs_cache,
+                )
+                get_jids_search.assert_called_once_with(
+                    start_jid="20160524030000000000", end_jid="20160524035503086854"
+                )
+            MockMasterMinion.returners["local_cache.get_jids"].assert_not_called()
@@ -4,11 +4,18 @@ Tests for the salt fileclient
 
 
 import errno
+import hashlib
 import logging
 import os
 import shutil
+import socket
+import tempfile
+import threading
+import time
 
 import salt.utils.files
+import salt.utils.hashutils
+import salt.utils.master
 from salt import fileclient
 from tests.support.mixins import (
     AdaptedConfigurationTestCaseMixin,
@@ -352,6 +359,67 @@ class FileclientCacheTest(
                 log.debug("content = %s", content)
                 self.assertTrue(saltenv in content)
 
+    def test_cache_file_content_addressed(self):
+        """
+        Ensure a file served with the same content in several saltenvs is
+        fetched once and linked to the content addressed cache
+        """
+        patched_opts = {x: y for x, y in self.minion_opts.items()}
+        patched_opts.update(self.MOCKED_OPTS)
+        patched_opts["content_addressed_file_cache"] = True
+        for saltenv in SALTENVS:
+            path = os.path.join(self.FS_ROOT, saltenv, "shared.txt")
+            with salt.utils.files.fopen(path, "w") as fp_:
+                fp_.write("This file is the same in every saltenv.\n")
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            with patch.object(
+                client, "_get_file_windowed", wraps=client._get_file_windowed
+            ) as get_file_windowed:
+                cache_locs = [
+                    client.cache_file("salt://shared.txt", saltenv)
+                    for saltenv in SALTENVS
+                ]
+            self.assertEqual(get_file_windowed.call_count, 1)
+
+        hsum = salt.utils.hashutils.get_hash(
+            cache_locs[0], patched_opts.get("hash_type", "md5")
+        )
+        cas_path = os.path.join(
+            self.CACHE_ROOT,
+            "files_cas",
+            patched_opts.get("hash_type", "md5"),
+            hsum[:2],
+            hsum,
+        )
+        for saltenv, cache_loc in zip(SALTENVS, cache_locs):
+            self.assertEqual(
+                cache_loc,
+                os.path.join(self.CACHE_ROOT, "files", saltenv, "shared.txt"),
+            )
+            self.assertTrue(os.path.samefile(cache_loc, cas_path))
+
+    def test_cache_file_content_addressed_bad_file(self):
+        """
+        Ensure a fetched file which does not match its hash on the master is
+        not added to the content addressed cache
+        """
+        patched_opts = {x: y for x, y in self.minion_opts.items()}
+        patched_opts.update(self.MOCKED_OPTS)
+        patched_opts["content_addressed_file_cache"] = True
+
+        def _get_file_windowed(load, dest, size, hash_server, umask=None):
+            with salt.utils.files.fopen(dest, "w") as fp_:
+                fp_.write("corrupted")
+            return True
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            with patch.object(client, "_get_file_windowed", _get_file_windowed):
+                self.assertTrue(client.cache_file("salt://foo.txt", "base"))
+        self.assertFalse(os.path.exists(os.path.join(self.CACHE_ROOT, "files_cas")))
+
     def test_cache_file_with_alternate_cachedir_and_absolute_path(self):
         """
         Ensure file is cached to correct location when an alternate cachedir is
@@ -455,3 +523,215 @@ class FileclientCacheTest(
             )
 
             _check("/foo/bar", "/foo/bar")
+
+
+class RemoteClientWindowedTest(TestCase):
+    """
+    Tests for the windowed chunk fetching of the RemoteClient
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.dest = os.path.join(self.tmp_dir, "foo.bin")
+        self.content = bytes(range(256)) * 41
+        self.hash_server = {
+            "hsum": hashlib.sha256(self.content).hexdigest(),
+            "hash_type": "sha256",
+        }
+        self.locs = []
+
+        def send_many(loads, raw=False, window=None):
+            self.locs.append([load["loc"] for load in loads])
+            return [
+                {
+                    b"data": self.content[load["loc"] : load["loc"] + 1000],
+                    b"dest": b"foo.bin",
+                }
+                for load in loads
+            ]
+
+        opts = {
+            "extension_modules": "",
+            "cachedir": self.tmp_dir,
+            "request_channel_window": 4,
+        }
+        with patch(
+            "salt.transport.client.ReqChannel.factory", MagicMock()
+        ) as factory, patch("salt.loader.utils", MagicMock()):
+            factory.return_value.send_many = send_many
+            self.client = fileclient.RemoteClient(opts)
+        self.load = {"path": "foo.bin", "saltenv": "base", "cmd": "_serve_file"}
+
+    def _fetch(self):
+        return self.client._get_file_windowed(
+            self.load, self.dest, len(self.content), self.hash_server
+        )
+
+    def _partials(self):
+        try:
+            return os.listdir(os.path.join(self.tmp_dir, "partial"))
+        except FileNotFoundError:
+            return []
+
+    def test_get_file_windowed(self):
+        assert self._fetch() is True
+        with salt.utils.files.fopen(self.dest, "rb") as fp_:
+            assert fp_.read() == self.content
+        # the first chunk alone, then widening windows of chunks
+        assert self.locs[0] == [0]
+        assert self.locs[1] == [1000 * num for num in range(1, 9)]
+        assert sorted(sum(self.locs, [])) == list(range(0, len(self.content), 1000))
+        assert self._partials() == []
+
+    def test_get_file_windowed_resume(self):
+        partial = self.client._partial_path(self.dest, self.hash_server)
+        os.makedirs(os.path.dirname(partial))
+        with salt.utils.files.fopen(partial, "wb") as fp_:
+            fp_.write(self.content[:2500])
+        assert self._fetch() is True
+        with salt.utils.files.fopen(self.dest, "rb") as fp_:
+            assert fp_.read() == self.content
+        assert self.locs[0] == [2500]
+
+    def test_get_file_windowed_concurrent(self):
+        # A second fetch of the same file starts while the first one runs
+        send_many = self.client.channel.send_many
+        threads = []
+
+        def _send_many(loads, raw=False, window=None):
+            if not threads:
+                thread = threading.Thread(target=self._fetch, daemon=True)
+                threads.append(thread)
+                thread.start()
+                time.sleep(0.1)
+            return send_many(loads, raw=raw, window=window)
+
+        self.client.channel.send_many = _send_many
+        assert self._fetch() is True
+        threads[0].join(10)
+        assert not threads[0].is_alive()
+        with salt.utils.files.fopen(self.dest, "rb") as fp_:
+            assert fp_.read() == self.content
+        assert self._partials() == []
+
+    def test_get_file_windowed_foreign_files(self):
+        # Only the partial files of the fetches are cleaned up
+        stale = self.client._partial_path(self.dest, {"hsum": "0" * 64})
+        os.makedirs(os.path.dirname(stale))
+        with salt.utils.files.fopen(stale, "wb") as fp_:
+            fp_.write(b"old")
+        with salt.utils.files.fopen(self.dest + ".partial-user", "wb") as fp_:
+            fp_.write(b"user")
+        os.makedirs(self.dest + ".partial-dir")
+        assert self._fetch() is True
+        assert self._partials() == []
+        assert os.path.isfile(self.dest + ".partial-user")
+        assert os.path.isdir(self.dest + ".partial-dir")
+
+    def test_get_file_windowed_bad_hash(self):
+        self.hash_server["hsum"] = hashlib.sha256(b"other").hexdigest()
+        assert self._fetch() is False
+        assert not os.path.exists(self.dest)
+        assert self._partials() == []
+
+    def test_get_file_windowed_changed_file(self):
+        assert (
+            self.client._get_file_windowed(
+                self.load, self.dest, len(self.content) + 10, self.hash_server
+            )
+            is False
+        )
+        assert self._partials() == []
+
+    def _fetch_sendfile(self, key=b"key", path="foo.bin"):
+        src = os.path.join(self.tmp_dir, "src.bin")
+        with salt.utils.files.fopen(src, "wb") as fp_:
+            fp_.write(self.content)
+        secrets = {
+            "aes": {"secret": Mock(value=b"aes")},
+            "sendfile": {"secret": Mock(value=b"key")},
+        }
+        server = salt.utils.master.FileserverSendfile({}, secrets)
+        server.fs_ = MagicMock()
+        server.fs_.sendfile_path.side_effect = lambda load: (
+            src if load == {"saltenv": "base", "path": "foo.bin"} else ""
+        )
+        listener = socket.socket()
+        self.addCleanup(listener.close)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+
+        def serve():
+            server.handle(*listener.accept())
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        self.client.channel.send = MagicMock(
+            return_value={
+                "token": salt.utils.master.sendfile_token(key, "base", path),
+                "port": listener.getsockname()[1],
+            }
+        )
+        self.client.opts["master_ip"] = "127.0.0.1"
+        ret = self.client._get_file_sendfile(
+            self.load, self.dest, len(self.content), self.hash_server
+        )
+        thread.join(10)
+        return ret
+
+    def test_get_file_sendfile(self):
+        assert self._fetch_sendfile() is True
+        with salt.utils.files.fopen(self.dest, "rb") as fp_:
+            assert fp_.read() == self.content
+        assert self.client.channel.send.call_args[0][0]["cmd"] == "_file_sendfile"
+        assert self._partials() == []
+
+    def test_get_file_sendfile_resume(self):
+        partial = self.client._partial_path(self.dest, self.hash_server)
+        os.makedirs(os.path.dirname(partial))
+        with salt.utils.files.fopen(partial, "wb") as fp_:
+            fp_.write(self.content[:2500])
+        assert self._fetch_sendfile() is True
+        with salt.utils.files.fopen(self.dest, "rb") as fp_:
+            assert fp_.read() == self.content
+
+    def test_get_file_sendfile_concurrent(self):
+        # A windowed fetch of the same file starts while the stream runs
+        threads = []
+        create_connection = socket.create_connection
+
+        def _create_connection(*args, **kwargs):
+            thread = threading.Thread(target=self._fetch, daemon=True)
+            threads.append(thread)
+            thread.start()
+            time.sleep(0.1)
+            return create_connection(*args, **kwargs)
+
+        with patch("socket.create_connection", _create_connection):
+            assert self._fetch_sendfile() is True
+        threads[0].join(10)
+        assert not threads[0].is_alive()
+        with salt.utils.files.fopen(self.dest, "rb") as fp_:
+            assert fp_.read() == self.content
+        assert self._partials() == []
+
+    def test_get_file_sendfile_aes_key(self):
+        # The minions know the AES key, it must not sign tokens
+        assert self._fetch_sendfile(key=b"aes") is False
+        assert not os.path.exists(self.dest)
+
+    def test_get_file_sendfile_not_matched(self):
+        assert self._fetch_sendfile(path="../../etc/passwd") is False
+        assert not os.path.exists(self.dest)
+
+    def test_get_file_sendfile_not_served(self):
+        self.client.channel.send = MagicMock(return_value={})
+        self.client.opts["master_ip"] = "127.0.0.1"
+        assert (
+            self.client._get_file_sendfile(
+                self.load, self.dest, len(self.content), self.hash_server
+            )
+            is False
+        )
+        assert self._partials() == []
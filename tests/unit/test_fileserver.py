@@ -6,10 +6,17 @@
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
 
+import os
+import shutil
+import tempfile
+
+import salt.utils.files
 from salt import fileserver
 
 # Import Salt Testing libs
 from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.mock import patch
+from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase
 
 
@@ -50,3 +57,53 @@ class VCSBackendWhitelistCase(TestCase, LoaderModuleMockMixin):
             "svnfs",
             "roots",
         ], fs.servers.whitelist
+
+
+class SendfilePathTestCase(TestCase, LoaderModuleMockMixin):
+    def setup_loader_modules(self):
+        return {fileserver: {}}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.root = os.path.join(self.tmp_dir, "root")
+        os.makedirs(self.root)
+        for path in (os.path.join(self.root, "foo.iso"), self.tmp_dir + "/bar.iso"):
+            with salt.utils.files.fopen(path, "w") as fp_:
+                fp_.write("iso")
+        os.symlink(self.tmp_dir + "/bar.iso", os.path.join(self.root, "bar.iso"))
+        self.opts = {
+            "fileserver_backend": ["roots"],
+            "extension_modules": "",
+            "cachedir": os.path.join(self.tmp_dir, "cache"),
+            "file_roots": {"base": [self.root]},
+            "fileserver_sendfile": {"base": ["*.iso"]},
+        }
+        self.fs_ = fileserver.Fileserver(self.opts)
+
+    def _sendfile_path(self, path, fnd_path=None, back="roots"):
+        fnd = {"path": fnd_path or os.path.join(self.root, path), "back": back}
+        with patch.object(self.fs_, "find_file", return_value=fnd):
+            return self.fs_.sendfile_path({"saltenv": "base", "path": path})
+
+    def test_sendfile_path(self):
+        assert self._sendfile_path("foo.iso") == os.path.realpath(
+            os.path.join(self.root, "foo.iso")
+        )
+
+    def test_sendfile_path_not_matched(self):
+        assert self._sendfile_path("foo.sls") == ""
+        assert self._sendfile_path("../bar.iso") == ""
+        assert self._sendfile_path(self.tmp_dir + "/bar.iso") == ""
+
+    def test_sendfile_path_outside_roots(self):
+        # Symlinks out of the roots are not sent
+        assert self._sendfile_path("bar.iso") == ""
+        assert self._sendfile_path("foo.iso", back="gitfs") == ""
+        cached = os.path.join(self.opts["cachedir"], "gitfs", "refs", "base")
+        os.makedirs(cached)
+        with salt.utils.files.fopen(os.path.join(cached, "foo.iso"), "w") as fp_:
+            fp_.write("iso")
+        assert self._sendfile_path(
+            "foo.iso", os.path.join(cached, "foo.iso"), back="gitfs"
+        ) == os.path.realpath(os.path.join(cached, "foo.iso"))
@@ -16,6 +16,7 @@ import shutil
 import sys
 import tempfile
 import textwrap
+import time
 
 import salt.config
 import salt.loader
@@ -1754,3 +1755,192 @@ class LazyLoaderRefreshFileMappingTest(TestCase):
         loader = self.__init_loader()
         assert ".pyx" not in loader.suffix_map
         assert ".pyx" not in loader.suffix_order
+
+
+class LoaderFileMappingIndexTest(TestCase):
+    """
+    Test the index of the file mappings of the loaders
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.mod_dir = os.path.join(self.tmp_dir, "modules")
+        os.makedirs(self.mod_dir)
+        self.opts = {
+            "cachedir": os.path.join(self.tmp_dir, "cache"),
+            "optimization_order": [0, 1, 2],
+        }
+        self.add_module("foo")
+        patcher = patch(
+            "salt.loader.FILE_MAPPING_INDEX", salt.loader.FileMappingIndex()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_module(self, name, age=60):
+        with salt.utils.files.fopen(
+            os.path.join(self.mod_dir, "{}.py".format(name)), "w"
+        ) as fp_:
+            fp_.write("def test():\n    return True\n")
+        # Make the directory old enough to be indexed
+        mtime = time.time() - age
+        os.utime(self.mod_dir, (mtime, mtime))
+
+    def get_loader(self):
+        return salt.loader.LazyLoader([self.mod_dir], self.opts, tag="module")
+
+    def test_file_mapping_index(self):
+        walk = salt.loader.LazyLoader._walk_module_dirs
+        with patch.object(
+            salt.loader.LazyLoader, "_walk_module_dirs", autospec=True, side_effect=walk
+        ) as walk_mock:
+            loader = self.get_loader()
+            self.assertEqual(walk_mock.call_count, 1)
+            self.assertIn("foo", loader.file_mapping)
+            self.assertTrue(
+                os.path.isfile(
+                    os.path.join(self.opts["cachedir"], "loader", "file_mapping.p")
+                )
+            )
+
+            # The unchanged module directory is not listed again, by this
+            # process or another one reading the index from the cachedir
+            indexes = (salt.loader.FILE_MAPPING_INDEX, salt.loader.FileMappingIndex())
+            for index in indexes:
+                with patch("salt.loader.FILE_MAPPING_INDEX", index):
+                    loader = self.get_loader()
+                self.assertEqual(walk_mock.call_count, 1)
+                self.assertEqual(
+                    loader.file_mapping["foo"],
+                    (os.path.join(self.mod_dir, "foo.py"), ".py", 0),
+                )
+
+            # A new module changes the mtime of the directory
+            self.add_module("bar", age=30)
+            loader = self.get_loader()
+            self.assertEqual(walk_mock.call_count, 2)
+            self.assertIn("bar", loader.file_mapping)
+
+            # A directory modified right before the walk is not indexed, the
+            # loaders refresh their file mapping twice when they are built
+            self.add_module("baz", age=0)
+            self.get_loader()
+            self.assertEqual(walk_mock.call_count, 4)
+
+            # The index can be disabled
+            self.opts["loader_file_mapping_cache"] = False
+            self.add_module("qux")
+            self.get_loader()
+            self.assertEqual(walk_mock.call_count, 6)
+
+
+class LoaderVirtualIndexTest(TestCase):
+    """
+    Test the index of the outcome of the __virtual__ functions
+    """
+
+    module_template = textwrap.dedent(
+        """
+        __virtualname__ = "{name}"
+
+        def __virtual__():
+            return {ret}
+
+        def test():
+            return True
+        """
+    )
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.mod_dir = os.path.join(self.tmp_dir, "modules")
+        os.makedirs(self.mod_dir)
+        self.opts = {
+            "cachedir": os.path.join(self.tmp_dir, "cache"),
+            "optimization_order": [0, 1, 2],
+            "grains": {"os": "Linux"},
+            "loader_file_mapping_cache": False,
+            "loader_virtual_cache": True,
+        }
+        self.add_module("foo_mod", "foo", "True")
+        self.add_module("bar_mod", "bar", '(False, "bar is not available")')
+        patcher = patch("salt.loader.VIRTUAL_INDEX", salt.loader.VirtualIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_module(self, filename, name, ret):
+        with salt.utils.files.fopen(
+            os.path.join(self.mod_dir, "{}.py".format(filename)), "w"
+        ) as fp_:
+            fp_.write(self.module_template.format(name=name, ret=ret))
+
+    def get_loader(self):
+        return salt.loader.LazyLoader(
+            [self.mod_dir], self.opts, tag="module", virtual_enable=True
+        )
+
+    def test_virtual_index(self):
+        process_virtual = salt.loader.LazyLoader._process_virtual
+        with patch.object(
+            salt.loader.LazyLoader,
+            "_process_virtual",
+            autospec=True,
+            side_effect=process_virtual,
+        ) as virtual_mock:
+            loader = self.get_loader()
+            loader._load_all()
+            self.assertEqual(virtual_mock.call_count, 2)
+            self.assertIn("foo.test", loader)
+            self.assertEqual(loader.missing_modules["bar_mod"], "bar is not available")
+            self.assertTrue(
+                os.path.isfile(
+                    os.path.join(self.opts["cachedir"], "loader", "virtual.p")
+                )
+            )
+
+            # The unavailable module is not imported again, by this process or
+            # another one reading the index from the cachedir
+            indexes = (salt.loader.VIRTUAL_INDEX, salt.loader.VirtualIndex())
+            for index in indexes:
+                virtual_mock.reset_mock()
+                with patch("salt.loader.VIRTUAL_INDEX", index):
+                    loader = self.get_loader()
+                    loader._load_all()
+                self.assertEqual(virtual_mock.call_count, 1)
+                self.assertIn("foo.test", loader)
+                self.assertNotIn("bar.test", loader)
+                self.assertEqual(
+                    loader.missing_modules["bar_mod"], "bar is not available"
+                )
+
+            # The module is found by its virtual name
+            virtual_mock.reset_mock()
+            loader = self.get_loader()
+            self.assertTrue(loader["foo.test"]())
+            self.assertEqual(virtual_mock.call_count, 1)
+
+            # Changing the grains invalidates the index
+            virtual_mock.reset_mock()
+            self.opts["grains"] = {"os": "Windows"}
+            loader = self.get_loader()
+            loader._load_all()
+            self.assertEqual(virtual_mock.call_count, 2)
+
+            # Changing the module invalidates its entry
+            virtual_mock.reset_mock()
+            self.add_module("bar_mod", "bar", "True")
+            loader = self.get_loader()
+            loader._load_all()
+            self.assertEqual(virtual_mock.call_count, 2)
+            self.assertIn("bar.test", loader)
+
+    def test_virtual_index_disabled(self):
+        self.opts["loader_virtual_cache"] = False
+        loader = self.get_loader()
+        loader._load_all()
+        self.assertIn("foo.test", loader)
+        self.assertFalse(
+            os.path.isfile(os.path.join(self.opts["cachedir"], "loader", "virtual.p"))
+        )
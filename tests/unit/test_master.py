@@ -759,3 +759,58 @@ class MaintenanceTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
             self.assertEqual(mocked_handle_presence.call_times, [0, 60, 120, 180])
             self.assertEqual(mocked_handle_key_rotate.call_times, [0, 60, 120, 180])
             self.assertEqual(mocked_check_max_open_files.call_times, [0, 60, 120, 180])
+
+
+class MWorkerPreloadTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
+    """
+    TestCase for the state preloaded by the ReqServer for the MWorkers
+    """
+
+    def setUp(self):
+        self.opts = self.get_temp_config("master", mworker_preload=True)
+
+    def test_preload(self):
+        mminion = MagicMock()
+        fileserver = MagicMock()
+        req_server = salt.master.ReqServer(self.opts, {}, {})
+        with patch("salt.minion.MasterMinion", return_value=mminion), patch(
+            "salt.fileserver.Fileserver", return_value=fileserver
+        ), patch("salt.loader.render") as render:
+            preloaded = req_server._preload()
+        self.assertEqual(preloaded, {"mminion": mminion, "fileserver": fileserver})
+        for loader in (
+            mminion.functions,
+            mminion.returners,
+            mminion.utils,
+            fileserver.servers,
+        ):
+            loader._load_all.assert_called_once_with()
+        # The MWorkers build their renderers per pillar and state run
+        render.assert_not_called()
+
+    def test_aes_funcs_preloaded(self):
+        mminion = MagicMock()
+        fileserver = MagicMock()
+        with patch("salt.minion.MasterMinion") as mminion_mock, patch(
+            "salt.fileserver.Fileserver"
+        ) as fileserver_mock, patch("salt.client.get_local_client"), patch(
+            "salt.utils.event.get_master_event"
+        ), patch(
+            "salt.daemons.masterapi.RemoteFuncs"
+        ):
+            aes_funcs = salt.master.AESFuncs(
+                self.opts, mminion=mminion, fileserver=fileserver
+            )
+        mminion_mock.assert_not_called()
+        fileserver_mock.assert_not_called()
+        self.assertIs(aes_funcs.mminion, mminion)
+        self.assertIs(aes_funcs.fs_, fileserver)
+        self.assertIs(aes_funcs._serve_file, fileserver.serve_file)
+
+    def test_memory_stats(self):
+        worker = salt.master.MWorker(self.opts, {}, {}, [], "MWorker-0")
+        stats = worker._memory_stats()
+        if salt.master.HAS_PSUTIL:
+            self.assertIn("rss", stats)
+        else:
+            self.assertEqual(stats, {})
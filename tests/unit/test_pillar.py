@@ -16,6 +16,7 @@ import textwrap
 import salt.config
 import salt.exceptions
 import salt.fileclient
+import salt.utils.cache
 import salt.utils.stringutils
 from salt.utils.files import fopen
 from tests.support.helpers import with_tempdir
@@ -376,6 +377,55 @@ class PillarTestCase(TestCase):
         finally:
             shutil.rmtree(tempdir, ignore_errors=True)
 
+    def test_ext_pillar_concurrency(self):
+        """
+        test running the ext_pillars in a pool of threads
+        """
+        opts = {
+            "optimization_order": [0, 1, 2],
+            "renderer": "json",
+            "renderer_blacklist": [],
+            "renderer_whitelist": [],
+            "state_top": "",
+            "pillar_roots": {"base": []},
+            "file_roots": {"base": []},
+            "extension_modules": "",
+            "sock_dir": "/tmp",
+            "ext_pillar": [
+                {"first": {"key": "value1"}},
+                {"failing": None},
+                {"second": {"key": "value2"}},
+            ],
+            "ext_pillar_concurrency": 3,
+        }
+
+        def _ext_pillar(minion_id, pillar, **kwargs):
+            # The ext_pillars don't see each other's data
+            assert pillar == {"cli": True}
+            return {"key": kwargs["key"], kwargs["key"]: True}
+
+        ext_pillars = {
+            "first": _ext_pillar,
+            "failing": MagicMock(side_effect=Exception("Oops")),
+            "second": _ext_pillar,
+        }
+        with patch("salt.loader.pillars", MagicMock(return_value=ext_pillars)):
+            pillar = salt.pillar.Pillar(
+                opts, {}, "mocked-minion", "base", pillar_override={"cli": True}
+            )
+        with patch("salt.pillar.Pillar._fire_ext_pillar_event") as fire_event:
+            ret, errors = pillar.ext_pillar({})
+        # The data is merged in the configured order
+        self.assertEqual(
+            ret, {"cli": True, "key": "value2", "value1": True, "value2": True}
+        )
+        self.assertEqual(errors, ["Failed to load ext_pillar failing: Oops"])
+        timings = fire_event.call_args[0][0]
+        self.assertEqual(
+            [(timing["ext_pillar"], timing["success"]) for timing in timings],
+            [("first", True), ("failing", False), ("second", True)],
+        )
+
     def test_dynamic_pillarenv(self):
         opts = {
             "optimization_order": [0, 1, 2],
@@ -644,6 +694,50 @@ class PillarTestCase(TestCase):
         # precedence over glob match.
         _run_test(nodegroup_order=2, glob_order=1, expected="foo")
 
+    @with_tempdir()
+    def test_top_file_cache(self, tempdir):
+        opts = {
+            "optimization_order": [0, 1, 2],
+            "renderer": "yaml",
+            "renderer_blacklist": [],
+            "renderer_whitelist": [],
+            "state_top": "salt://top.sls",
+            "pillar_roots": [],
+            "extension_modules": "",
+            "saltenv": "base",
+            "file_roots": [],
+            "top_file_cache": True,
+        }
+        sls_files = self._setup_test_topfile_sls(tempdir, 1, 2)
+        fc_mock = MockFileclient(
+            cache_file=sls_files["top"]["dest"],
+            list_states=["top", "ssh", "ssh.minion", "generic", "generic.minion"],
+            get_state=sls_files,
+        )
+        hashes = {"salt://top.sls": {"hsum": "abc", "hash_type": "sha256"}}
+        fc_mock.hash_file = lambda url, saltenv: hashes[url]
+
+        with patch.object(
+            salt.fileclient, "get_file_client", MagicMock(return_value=fc_mock)
+        ), patch.object(salt.utils.cache.TopFileCache, "entries", {}), patch(
+            "salt.pillar.compile_template", wraps=salt.pillar.compile_template
+        ) as compile_template:
+            top, errors = salt.pillar.Pillar(
+                opts, {}, "mocked-minion", "base"
+            ).get_top()
+            self.assertEqual(errors, [])
+            self.assertEqual(compile_template.call_count, 1)
+
+            # The top file is only rendered once for all the minions
+            pillar = salt.pillar.Pillar(opts, {}, "other-minion", "base")
+            self.assertEqual(pillar.get_top(), (top, []))
+            self.assertEqual(compile_template.call_count, 1)
+
+            # And rendered again when it changes
+            hashes["salt://top.sls"] = {"hsum": "def", "hash_type": "sha256"}
+            self.assertEqual(pillar.get_top(), (top, []))
+            self.assertEqual(compile_template.call_count, 2)
+
     def _setup_test_topfile_sls_pillar_match(self, tempdir):
         # Write a simple topfile and two pillar state files
         top_file = tempfile.NamedTemporaryFile(dir=tempdir, delete=False)
@@ -1416,3 +1510,79 @@ class PillarCacheTestCase(TestCase):
             expected_cache = {"base": {"foo": "bar"}, "dev": {"foo": "baz"}}
             self.assertIn("mocked_minion", pillar.cache)
             self.assertEqual(pillar.cache["mocked_minion"], expected_cache)
+
+    def test_compile_pillar_shared_cache(self):
+        self.mock_master_default_opts.update(
+            {"pillar_cache_backend": "shared", "pillar_cache_ttl": 3600}
+        )
+
+        pillar = salt.pillar.PillarCache(
+            self.mock_master_default_opts,
+            self.grains,
+            "mocked_minion",
+            "fake_env",
+            pillarenv="base",
+        )
+        self.assertIsInstance(pillar.cache, salt.utils.cache.SharedPillarCacheCli)
+
+        shared = {}
+
+        def _get(minion_id, saltenv, pillarenv):
+            return shared.get((minion_id, saltenv, pillarenv))
+
+        def _put(minion_id, saltenv, pillarenv, data):
+            shared[(minion_id, saltenv, pillarenv)] = data
+
+        def _flush(minion_id):
+            for key in [key for key in shared if key[0] == minion_id]:
+                del shared[key]
+
+        with patch.multiple(
+            "salt.utils.cache.SharedPillarCacheCli",
+            get=MagicMock(side_effect=_get),
+            put=MagicMock(side_effect=_put),
+            flush=MagicMock(side_effect=_flush),
+        ), patch(
+            "salt.pillar.PillarCache.fetch_pillar",
+            side_effect=[{"foo": "bar"}, {"foo": "baz"}, {"foo": "qux"}],
+        ):
+            # Run twice for pillarenv base, the pillar is only compiled once
+            self.assertEqual(pillar.compile_pillar(), {"foo": "bar"})
+            self.assertEqual(pillar.compile_pillar(), {"foo": "bar"})
+            self.assertEqual(
+                shared, {("mocked_minion", "fake_env", "base"): {"foo": "bar"}}
+            )
+
+            # Change the pillarenv
+            pillar.pillarenv = "dev"
+            self.assertEqual(pillar.compile_pillar(), {"foo": "baz"})
+            self.assertEqual(len(shared), 2)
+
+            # A clean_cache request drops all the cached pillars of the minion
+            pillar.clean_cache = True
+            self.assertEqual(pillar.compile_pillar(), {"foo": "qux"})
+            self.assertEqual(
+                shared, {("mocked_minion", "fake_env", "dev"): {"foo": "qux"}}
+            )
+
+    def test_compile_pillar_memory_cache_clean_cache(self):
+        self.mock_master_default_opts.update(
+            {"pillar_cache_backend": "memory", "pillar_cache_ttl": 3600}
+        )
+
+        pillar = salt.pillar.PillarCache(
+            self.mock_master_default_opts,
+            self.grains,
+            "mocked_minion",
+            "fake_env",
+            pillarenv="base",
+        )
+
+        with patch(
+            "salt.pillar.PillarCache.fetch_pillar",
+            side_effect=[{"foo": "bar"}, {"foo": "baz"}],
+        ):
+            self.assertEqual(pillar.compile_pillar(), {"foo": "bar"})
+            pillar.clean_cache = True
+            self.assertEqual(pillar.compile_pillar(), {"foo": "baz"})
+            self.assertEqual(pillar.cache["mocked_minion"], {"base": {"foo": "baz"}})
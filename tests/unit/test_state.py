@@ -9,6 +9,7 @@ import tempfile
 import salt.exceptions
 import salt.state
 import salt.utils.files
+import salt.utils.jinja
 import salt.utils.platform
 from salt.exceptions import CommandExecutionError
 from salt.utils.decorators import state as statedecorators
@@ -645,6 +646,131 @@ class StateCompilerTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
                 self.assertEqual(sub_state["__sls__"], "external")
 
 
+    def test_call_chunks_concurrently(self):
+        """
+        Test that state_concurrency runs the chunks once their requisites are
+        done and keeps the inline chunks out of separate processes
+        """
+
+        def _chunk(id_, order=10000, **kwargs):
+            chunk = {
+                "state": "test",
+                "name": id_,
+                "__id__": id_,
+                "__sls__": "concurrent",
+                "order": order,
+                "fun": "succeed_without_changes",
+            }
+            chunk.update(kwargs)
+            return chunk
+
+        chunks = [
+            _chunk("second", require=[{"test": "first"}]),
+            _chunk("first"),
+            _chunk("other", watch=[{"id": "first"}]),
+            _chunk("sls", onchanges=[{"sls": "concurr*"}]),
+            _chunk("last", order=10001, __sls__="last"),
+        ]
+        called = []
+
+        def _call_chunk(low, running, chunks):
+            called.append((low["__id__"], low.get("parallel", False)))
+            running[salt.state._gen_tag(low)] = {"result": True}
+            return running
+
+        with patch("salt.state.State._gather_pillar"):
+            minion_opts = self.get_temp_config("minion")
+            minion_opts["state_concurrency"] = 4
+            state_obj = salt.state.State(minion_opts)
+        state_obj.jid = "20200101000000000000"
+
+        deps = state_obj._chunk_dependencies(chunks)
+        self.assertEqual(
+            deps[salt.state._gen_tag(chunks[0])], {salt.state._gen_tag(chunks[1])}
+        )
+        self.assertEqual(
+            deps[salt.state._gen_tag(chunks[3])],
+            {salt.state._gen_tag(chunk) for chunk in chunks[:3]},
+        )
+        self.assertEqual(deps[salt.state._gen_tag(chunks[4])], set())
+
+        with patch.object(state_obj, "call_chunk", side_effect=_call_chunk):
+            state_obj.call_chunks(chunks)
+        self.assertEqual(
+            called,
+            [
+                ("first", True),
+                ("second", True),
+                ("other", False),
+                ("sls", True),
+                ("last", True),
+            ],
+        )
+
+    def test_call_chunks_concurrently_auto_order(self):
+        """
+        Test that state_concurrency only waits at the orders set by the user,
+        not at the orders set by state_auto_order
+        """
+
+        def _chunk(id_, order):
+            return {
+                "state": "test",
+                "name": id_,
+                "__id__": id_,
+                "__sls__": "concurrent",
+                "order": order,
+                "fun": "succeed_without_changes",
+            }
+
+        chunks = [
+            _chunk("one", 1),
+            _chunk("two", 2),
+            _chunk("three", 3),
+            _chunk("explicit", 10),
+            _chunk("after", 11),
+        ]
+        # The processes started before each chunk was called
+        started = []
+        polls = []
+
+        def _call_chunk(low, running, chunks):
+            started.append(
+                (low["__id__"], sum(1 for ret in running.values() if "proc" in ret))
+            )
+            running[salt.state._gen_tag(low)] = {"proc": True, "name": low["name"]}
+            polls.clear()
+            return running
+
+        def _reconcile_procs(running):
+            # The processes run until the state run waits for them
+            polls.append(True)
+            if len(polls) < 10:
+                return not any("proc" in ret for ret in running.values())
+            for ret in running.values():
+                if ret.pop("proc", None):
+                    ret["result"] = True
+            return True
+
+        with patch("salt.state.State._gather_pillar"):
+            minion_opts = self.get_temp_config("minion")
+            minion_opts["state_concurrency"] = 4
+            state_obj = salt.state.State(minion_opts)
+        state_obj.jid = "20200101000000000000"
+        state_obj.auto_orders.update(
+            (id_, "test") for id_ in ("one", "two", "three", "after")
+        )
+
+        with patch.object(
+            state_obj, "call_chunk", side_effect=_call_chunk
+        ), patch.object(state_obj, "reconcile_procs", side_effect=_reconcile_procs):
+            state_obj.call_chunks_concurrently(chunks, {}, 4)
+        self.assertEqual(
+            started,
+            [("one", 0), ("two", 1), ("three", 2), ("explicit", 0), ("after", 0)],
+        )
+
+
 class HighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
     def setUp(self):
         root_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
@@ -691,6 +817,27 @@ class HighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
         matches = self.highstate.matches_whitelist(matches, "state2,state3")
         self.assertEqual(matches, {"env": ["state2", "state3"]})
 
+    def test_handle_iorder_auto_orders(self):
+        """
+        Test that the declarations ordered by state_auto_order are tracked
+        without adding anything but the order to the high data
+        """
+        self.highstate.opts["state_auto_order"] = True
+        state = {
+            "first": {"test.succeed_without_changes": []},
+            "second": {"test": ["nop", {"order": 5}]},
+        }
+        ret = self.highstate._handle_iorder(state)
+        self.assertEqual(
+            ret,
+            {
+                "first": {"test.succeed_without_changes": [{"order": 10000}]},
+                "second": {"test": ["nop", {"order": 5}]},
+            },
+        )
+        self.assertEqual(self.highstate.auto_orders, {("first", "test")})
+        self.assertIs(self.highstate.state.auto_orders, self.highstate.auto_orders)
+
     def test_show_state_usage(self):
         # monkey patch sub methods
         self.highstate.avail = {"base": ["state.a", "state.b", "state.c"]}
@@ -739,6 +886,60 @@ class HighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
         self.assertEqual(ret, [("somestuff", "cmd")])
 
 
+    def test_render_state_cache(self):
+        """
+        Test that the renderings of the SLS files are cached with
+        state_render_cache
+        """
+        with salt.utils.files.fopen(
+            os.path.join(self.state_tree_dir, "map.jinja"), "w"
+        ) as fp_:
+            fp_.write("{% set name = 'foo' %}")
+        with salt.utils.files.fopen(
+            os.path.join(self.state_tree_dir, "cached.sls"), "w"
+        ) as fp_:
+            fp_.write(
+                "{% from 'map.jinja' import name %}\n"
+                "{{ name }}:\n  test.succeed_without_changes: []\n"
+            )
+        self.highstate.opts["state_render_cache"] = True
+        # Don't use the file client of another test to load map.jinja
+        salt.utils.jinja.SaltCacheLoader.shutdown()
+        self.addCleanup(salt.utils.jinja.SaltCacheLoader.shutdown)
+
+        def _render():
+            return self.highstate.render_state("cached", "base", set(), {})
+
+        with patch(
+            "salt.state.compile_template", wraps=salt.state.compile_template
+        ) as compile_template:
+            state, errors = _render()
+            self.assertEqual(errors, [])
+            self.assertIn("foo", state)
+            self.assertEqual(compile_template.call_count, 1)
+
+            # The cached rendering is used
+            state, errors = _render()
+            self.assertEqual(errors, [])
+            self.assertIn("foo", state)
+            self.assertEqual(compile_template.call_count, 1)
+
+            # A change of the imported template renders the SLS again
+            with salt.utils.files.fopen(
+                os.path.join(self.state_tree_dir, "map.jinja"), "w"
+            ) as fp_:
+                fp_.write("{% set name = 'bar' %}")
+            state, errors = _render()
+            self.assertIn("bar", state)
+            self.assertEqual(compile_template.call_count, 2)
+
+            # As does a change of the pillar
+            self.highstate.render_cache = None
+            self.highstate.state.opts["pillar"] = {"changed": True}
+            _render()
+            self.assertEqual(compile_template.call_count, 3)
+
+
 class MultiEnvHighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
     def setUp(self):
         root_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
@@ -122,3 +122,34 @@ class IPCMessagePubSubCase(salt.ext.tornado.testing.AsyncTestCase):
         ret2 = client2.read_sync()
         self.assertEqual(ret1, "TEST")
         self.assertEqual(ret2, "TEST")
+
+    def test_tag_filters(self):
+        client1 = self.sub_channel
+        client2 = salt.transport.ipc.IPCMessageSubscriber(
+            socket_path=self.socket_path,
+            io_loop=self.io_loop,
+            tag_filters=["salt/job/"],
+        )
+        client2.connect(callback=self.stop)
+        self.wait()
+        self.addCleanup(client2.close)
+
+        # Wait for the publisher to read the filters of the second client
+        def filters_registered():
+            return len(self.pub_channel.stream_filters) == 1
+
+        while not filters_registered():
+            self.io_loop.call_later(0.01, self.stop)
+            self.wait()
+        self.assertEqual(
+            list(self.pub_channel.stream_filters.values()), [("salt/job/",)]
+        )
+
+        self.pub_channel.publish("KEY", tag="salt/key")
+        self.pub_channel.publish("JOB", tag="salt/job/1/ret/minion")
+        self.pub_channel.publish("UNTAGGED")
+        self.assertEqual(client1.read_sync(), "KEY")
+        self.assertEqual(client1.read_sync(), "JOB")
+        self.assertEqual(client1.read_sync(), "UNTAGGED")
+        self.assertEqual(client2.read_sync(), "JOB")
+        self.assertEqual(client2.read_sync(), "UNTAGGED")
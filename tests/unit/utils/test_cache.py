@@ -23,6 +23,7 @@ import salt.utils.data
 import salt.utils.files
 
 # Import Salt Testing libs
+from tests.support.mock import MagicMock, patch
 from tests.support.unit import TestCase
 
 
@@ -203,3 +204,43 @@ class CacheDiskTestCase(TestCase):
 
         finally:
             shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+class TopFileCacheTestCase(TestCase):
+    def setUp(self):
+        patcher = patch.object(cache.TopFileCache, "entries", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hashes = {"salt://top.sls": "abc", "salt://common.sls": "def"}
+        self.client = MagicMock()
+        self.client.hash_file.side_effect = lambda url, saltenv: (
+            {"hsum": self.hashes[url], "hash_type": "sha256"}
+            if url in self.hashes
+            else {}
+        )
+
+    def _store(self, key, data, sources):
+        top_cache = cache.TopFileCache(self.client)
+        for url in sources:
+            top_cache.track(url, "base")
+        top_cache.store(key, data)
+
+    def test_get_store(self):
+        top = {"base": {"*": ["common"]}}
+        self._store("key", top, ["salt://top.sls", "salt://common.sls"])
+        top_cache = cache.TopFileCache(self.client)
+        self.assertEqual(top_cache.get("key"), top)
+        # A copy is returned
+        top_cache.get("key")["base"]["*"].append("other")
+        self.assertEqual(top_cache.get("key"), top)
+        self.assertIsNone(top_cache.get("other_key"))
+
+    def test_file_changed(self):
+        self._store("key", {"base": {}}, ["salt://top.sls", "salt://common.sls"])
+        self.hashes["salt://common.sls"] = "ghi"
+        self.assertIsNone(cache.TopFileCache(self.client).get("key"))
+        self.assertEqual(cache.TopFileCache.entries, {})
+
+    def test_missing_file_not_cached(self):
+        self._store("key", {"base": {}}, ["salt://top.sls", None])
+        self.assertIsNone(cache.TopFileCache(self.client).get("key"))
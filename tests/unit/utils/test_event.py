@@ -319,6 +319,96 @@ class TestSaltEvent(TestCase):
                 )
 
 
+class TestPendingEvents(TestCase):
+    """
+    Test the events kept by a SaltEvent for its subscriptions
+    """
+
+    def setUp(self):
+        self.event = salt.utils.event.SaltEvent(
+            "master", sock_dir=RUNTIME_VARS.TMP, listen=False
+        )
+        self.pending = self.event.pending_events
+
+    def add(self, *tags):
+        return [self.pending.add({"tag": tag, "data": {}}) for tag in tags]
+
+    def test_subscribed_events(self):
+        self.event.subscribe("salt/job/1")
+        self.event.subscribe("evt", "fnmatch")
+        self.assertEqual(
+            self.add("salt/job/1/ret/a", "salt/job/2/ret/a", "evt", "salt/job/1/b"),
+            [True, False, True, True],
+        )
+        self.assertEqual(len(self.pending), 3)
+
+        # The events are returned once, in the order they were received
+        self.assertEqual(
+            self.event._check_pending("salt/job/1")["tag"], "salt/job/1/ret/a"
+        )
+        self.assertEqual(self.event._check_pending("salt/job/1")["tag"], "salt/job/1/b")
+        self.assertIsNone(self.event._check_pending("salt/job/1"))
+
+        # An unsubscribed tag matches the events kept for other subscriptions
+        self.assertEqual(self.event._check_pending("ev")["tag"], "evt")
+        self.assertEqual(len(self.pending), 0)
+
+    def test_overlapping_subscriptions(self):
+        self.event.subscribe("salt/job/1")
+        self.event.subscribe("salt/job/1/ret")
+        self.add("salt/job/1/ret/a", "salt/job/1/new")
+        self.assertEqual(len(self.pending), 2)
+        self.assertEqual(
+            self.event._check_pending("salt/job/1/ret")["tag"], "salt/job/1/ret/a"
+        )
+        # The event is not returned again for the other subscription
+        self.assertEqual(
+            self.event._check_pending("salt/job/1")["tag"], "salt/job/1/new"
+        )
+        self.assertIsNone(self.event._check_pending("salt/job/1"))
+
+    def test_unsubscribe(self):
+        self.event.subscribe("salt/job/1")
+        self.event.subscribe("salt/job/1")
+        self.event.subscribe("salt/job/")
+        self.add("salt/job/1/ret/a", "salt/job/2/ret/a")
+        self.event.unsubscribe("salt/job/")
+        # The event of the job 1 is kept for its subscription
+        self.assertEqual([evt["tag"] for evt in self.pending], ["salt/job/1/ret/a"])
+        self.event.unsubscribe("salt/job/1")
+        self.assertEqual(len(self.pending), 1)
+        self.event.unsubscribe("salt/job/1")
+        self.assertEqual(len(self.pending), 0)
+        self.assertEqual(self.add("salt/job/1/ret/b"), [False])
+
+    def test_queue_size(self):
+        self.pending.queue_size = 2
+        self.event.subscribe("salt/job/1")
+        self.event.subscribe("salt/job/")
+        self.add("salt/job/1/ret/a", "salt/job/1/ret/b", "salt/job/2/ret/a")
+        # The oldest event was dropped from the queue of salt/job/ but is still
+        # kept for salt/job/1
+        self.assertEqual(len(self.pending), 3)
+        self.assertEqual(
+            self.event._check_pending("salt/job/")["tag"], "salt/job/1/ret/b"
+        )
+        self.assertEqual(
+            self.event._check_pending("salt/job/")["tag"], "salt/job/2/ret/a"
+        )
+        self.assertIsNone(self.event._check_pending("salt/job/"))
+        # The events taken through salt/job/ are not counted for salt/job/1
+        self.add("salt/job/1/ret/c")
+        self.assertEqual(
+            [evt["tag"] for evt in self.pending],
+            ["salt/job/1/ret/a", "salt/job/1/ret/c"],
+        )
+        self.add("salt/job/1/ret/d")
+        self.assertEqual(
+            [evt["tag"] for evt in self.pending],
+            ["salt/job/1/ret/c", "salt/job/1/ret/d"],
+        )
+
+
 class TestAsyncEventPublisher(AsyncTestCase):
     def get_new_ioloop(self):
         return salt.ext.tornado.ioloop.IOLoop()
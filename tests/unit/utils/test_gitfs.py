@@ -6,16 +6,21 @@ any remotes.
 
 import os
 import shutil
+import subprocess
+import tempfile
 from time import time
 
 import salt.fileserver.gitfs
 import salt.utils.files
 import salt.utils.gitfs
+import salt.utils.odict
+import salt.utils.path
 import salt.utils.platform
 import tests.support.paths
 from salt.exceptions import FileserverConfigError
 from tests.support.mixins import AdaptedConfigurationTestCaseMixin
 from tests.support.mock import MagicMock, patch
+from tests.support.runtests import RUNTIME_VARS
 from tests.support.unit import TestCase, skipIf
 
 try:
@@ -108,6 +113,167 @@ class TestGitBase(TestCase, AdaptedConfigurationTestCaseMixin):
         self.assertTrue(self.main_class.remotes[0].fetched)
         self.assertFalse(self.main_class.remotes[1].fetched)
 
+    def _patch_tree_index(self, remote, tree_id, root="", mountpoint=""):
+        index = {
+            "files": {
+                "states/top.sls": ["a" * 40, 0o100644, None],
+                "states/foo/init.sls": ["b" * 40, 0o100644, None],
+                "states/bar.sls": ["c" * 40, 0o120000, "foo/init.sls"],
+                "README": ["d" * 40, 0o100644, None],
+            },
+            "dirs": ["states", "states/foo"],
+        }
+        build_tree_index = MagicMock(return_value=index)
+        for name, value in (
+            ("get_tree", MagicMock(return_value=True)),
+            ("tree_id", MagicMock(return_value=tree_id)),
+            ("build_tree_index", build_tree_index),
+            ("root", MagicMock(return_value=root)),
+            ("mountpoint", MagicMock(return_value=mountpoint)),
+        ):
+            patcher = patch.object(remote, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        remote._tree_indexes = salt.utils.odict.OrderedDict()
+        self.addCleanup(delattr, remote, "_tree_indexes")
+        return build_tree_index
+
+    def test_tree_index(self):
+        remote = self.main_class.remotes[1]
+        tree_id = "{:040x}".format(int(time() * 1000000))
+        build_tree_index = self._patch_tree_index(remote, tree_id)
+        self.assertEqual(
+            remote.find_blob("states/top.sls", "base"), ("a" * 40, 0o100644)
+        )
+        # Symlinks are followed to their target
+        self.assertEqual(
+            remote.find_blob("states/bar.sls", "base"), ("b" * 40, 0o100644)
+        )
+        self.assertEqual(remote.find_blob("states/foo", "base"), (None, None))
+        self.assertEqual(build_tree_index.call_count, 1)
+        # The index is loaded from disk once it left the memory
+        remote._tree_indexes.clear()
+        self.assertEqual(remote.find_blob("README", "base"), ("d" * 40, 0o100644))
+        self.assertEqual(build_tree_index.call_count, 1)
+        self.assertTrue(
+            os.path.isfile(
+                os.path.join(
+                    self.main_class.cache_root,
+                    "tree_index",
+                    remote.cachedir_basename,
+                    "{}.p".format(tree_id),
+                )
+            )
+        )
+
+    def test_indexed_file_lists(self):
+        remote = self.main_class.remotes[1]
+        tree_id = "{:040x}".format(int(time() * 1000000))
+        self._patch_tree_index(remote, tree_id, root="/states/", mountpoint="salt")
+        files, symlinks, dirs = remote.indexed_file_lists("base")
+        self.assertEqual(files, {"salt/top.sls", "salt/foo/init.sls", "salt/bar.sls"})
+        self.assertEqual(symlinks, {"salt/bar.sls": "foo/init.sls"})
+        self.assertEqual(dirs, {"salt", "salt/foo"})
+
+
+@skipIf(not salt.utils.path.which("git"), "git is not installed")
+class TestGitSharedObjects(TestCase, AdaptedConfigurationTestCaseMixin):
+    def setUp(self):
+        class GitCliProvider(
+            salt.utils.gitfs.GitProvider
+        ):  # pylint: disable=abstract-method
+            def __init__(self, *args, **kwargs):
+                self.provider = "gitcli"
+                super().__init__(*args, **kwargs)
+
+            def init_remote(self):
+                self.gitdir = os.path.join(self.cachedir, ".git")
+                self.repo = True
+                if os.path.isdir(self.gitdir):
+                    return False
+                self._git("init", "-q", self.cachedir, cwd=self.cachedir)
+                self._git("remote", "add", "origin", self.url)
+                return True
+
+            def envs(self):
+                return ["base"]
+
+            def _fetch(self):
+                retcode, _ = self._git(
+                    "fetch", "-q", "origin", "+refs/heads/*:refs/remotes/origin/*"
+                )
+                return retcode == 0
+
+        self.tmp_dir = tempfile.mkdtemp(dir=RUNTIME_VARS.TMP)
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        upstream = os.path.join(self.tmp_dir, "upstream")
+        fork = os.path.join(self.tmp_dir, "fork")
+        self._git(self.tmp_dir, "init", "-q", upstream)
+        with salt.utils.files.fopen(os.path.join(upstream, "top.sls"), "w") as fp_:
+            fp_.write("base:\n  '*':\n    - foo\n")
+        self._git(upstream, "add", "top.sls")
+        self._git(upstream, "commit", "-q", "-m", "upstream")
+        self.upstream_sha = self._git(upstream, "rev-parse", "HEAD").strip()
+        self._git(self.tmp_dir, "clone", "-q", upstream, fork)
+        with salt.utils.files.fopen(os.path.join(fork, "foo.sls"), "w") as fp_:
+            fp_.write("foo:\n  test.nop\n")
+        self._git(fork, "add", "foo.sls")
+        self._git(fork, "commit", "-q", "-m", "fork")
+
+        self.opts = self.get_temp_config(
+            "master",
+            cachedir=os.path.join(self.tmp_dir, "cache"),
+            gitfs_remotes=["file://" + upstream, "file://" + fork],
+            verified_gitfs_provider="gitcli",
+            git_shared_objects=True,
+            git_fetch_workers=2,
+        )
+        # Skip the GitFS instance cached for the other tests
+        self.gitfs = salt.utils.gitfs.GitFS(
+            self.opts,
+            self.opts["gitfs_remotes"],
+            git_providers={"gitcli": GitCliProvider},
+            init_remotes=False,
+        )
+        self.gitfs.init_remotes(
+            self.opts["gitfs_remotes"],
+            salt.fileserver.gitfs.PER_REMOTE_OVERRIDES,
+            salt.fileserver.gitfs.PER_REMOTE_ONLY,
+        )
+
+    def tearDown(self):
+        del self.gitfs
+        del self.opts
+
+    def _git(self, cwd, *args):
+        env = dict(
+            os.environ,
+            GIT_AUTHOR_NAME="salt",
+            GIT_AUTHOR_EMAIL="salt@example.com",
+            GIT_COMMITTER_NAME="salt",
+            GIT_COMMITTER_EMAIL="salt@example.com",
+        )
+        return subprocess.check_output(("git",) + args, cwd=cwd, env=env).decode()
+
+    def test_fetch_shared_objects(self):
+        self.assertTrue(self.gitfs.fetch_remotes())
+        store = os.path.join(self.opts["cachedir"], "git_objects")
+        store_refs = self._git(store, "for-each-ref", "--format=%(refname)").split()
+        for repo in self.gitfs.remotes:
+            alternates = os.path.join(repo.gitdir, "objects", "info", "alternates")
+            with salt.utils.files.fopen(alternates) as fp_:
+                self.assertEqual(fp_.read(), os.path.join(store, "objects") + "\n")
+            self.assertIn(
+                "refs/salt/gitfs/{}/heads/master".format(repo.cachedir_basename),
+                store_refs,
+            )
+            # The objects are only in the store, and the repo still reads them
+            self.assertEqual(
+                os.listdir(os.path.join(repo.gitdir, "objects", "pack")), []
+            )
+            self._git(repo.cachedir, "cat-file", "-e", self.upstream_sha)
+            self._git(repo.cachedir, "fsck", "--no-progress")
+
 
 class TestGitFSProvider(TestCase):
     def setUp(self):
@@ -4,6 +4,7 @@
 from __future__ import absolute_import, unicode_literals
 
 # Import Salt Libs
+import salt.payload
 import salt.utils.master
 from tests.support.mock import patch
 
@@ -102,3 +103,73 @@ class MasterPillarUtilTestCase(TestCase):
         with patch_grain, patch_pillar, patch_tgt_list:
             ret = pillar.get_minion_pillar()
         assert minion in ret
+
+
+class SharedPillarCacheTestCase(TestCase):
+    """
+    TestCase for salt.utils.master.SharedPillarCache
+    """
+
+    def setUp(self):
+        self.serial = salt.payload.Serial("msgpack")
+        self.cache = salt.utils.master.SharedPillarCache(
+            {"sock_dir": "/tmp", "pillar_cache_ttl": 60}
+        )
+
+    def _request(self, load, *frames):
+        return self.cache.handle_request(
+            [self.serial.dumps(load)] + list(frames), self.serial
+        )
+
+    def test_get_put_flush(self):
+        pillar = self.serial.dumps({"foo": "bar"})
+        key = ["minion", "base", None]
+        assert self._request({"cmd": "get", "key": key}) == b""
+
+        assert self._request({"cmd": "put", "key": key}, pillar) == b""
+        self._request({"cmd": "put", "key": ["minion", "base", "dev"]}, pillar)
+        self._request({"cmd": "put", "key": ["other", "base", None]}, pillar)
+        assert self._request({"cmd": "get", "key": key}) == pillar
+
+        self._request({"cmd": "flush", "id": "minion"})
+        assert self._request({"cmd": "get", "key": key}) == b""
+        assert list(self.cache.cache) == [("other", "base", None)]
+
+    def test_ttl(self):
+        pillar = self.serial.dumps({"foo": "bar"})
+        key = ["minion", "base", None]
+        with patch("time.time", return_value=1000):
+            self._request({"cmd": "put", "key": key}, pillar)
+        with patch("time.time", return_value=1030):
+            assert self._request({"cmd": "get", "key": key}) == pillar
+            self.cache.sweep()
+            assert len(self.cache.cache) == 1
+        with patch("time.time", return_value=1061):
+            assert self._request({"cmd": "get", "key": key}) == b""
+            self.cache.sweep()
+            assert self.cache.cache == {}
+
+
+class SendfileTokenTestCase(TestCase):
+    """
+    TestCase for the tokens of salt.utils.master.FileserverSendfile
+    """
+
+    def test_token(self):
+        token = salt.utils.master.sendfile_token(b"key", "base", "files/foo.iso")
+        self.assertEqual(
+            salt.utils.master.check_sendfile_token(b"key", token),
+            ("base", "files/foo.iso"),
+        )
+        self.assertIsNone(salt.utils.master.check_sendfile_token(b"other", token))
+        self.assertIsNone(salt.utils.master.check_sendfile_token(b"key", "garbage"))
+        payload = token.split(".")[0]
+        self.assertIsNone(
+            salt.utils.master.check_sendfile_token(b"key", payload + "." + "0" * 64)
+        )
+
+    def test_token_expired(self):
+        token = salt.utils.master.sendfile_token(
+            b"key", "base", "files/foo.iso", ttl=-1
+        )
+        self.assertIsNone(salt.utils.master.check_sendfile_token(b"key", token))